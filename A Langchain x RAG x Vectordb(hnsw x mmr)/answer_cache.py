@@ -0,0 +1,112 @@
+#Semantic answer cache in front of generate_answer
+# Same (or near same) question on an unchanged collection -> stored answer + sources, no chain, no LLM call
+# Invalidated by process_urls, entries also expire after a TTL and the oldest ones get evicted past max_entries
+
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from telemetry import count, span
+
+DEFAULT_THRESHOLD = 0.95   # cosine similarity between query embeddings to count as "same question"
+DEFAULT_TTL_S = 3600
+DEFAULT_MAX_ENTRIES = 256
+
+
+class SemanticAnswerCache:
+    """query embedding -> (answer, sources), tied to one generation of the collection"""
+
+    def __init__(self, embedder, threshold=DEFAULT_THRESHOLD, ttl_s=DEFAULT_TTL_S, max_entries=DEFAULT_MAX_ENTRIES):
+        self.embedder = embedder
+        self.threshold = threshold
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+
+        self.generation = 0  # bumped on every ingestion
+        self._entries = OrderedDict()  # id -> entry, oldest first
+        self._next_id = 0
+        self._matrix = None  # stacked normalized query vectors, rebuilt lazily
+        self._matrix_ids = []
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "expired": 0, "evicted": 0, "invalidations": 0}
+
+    def _embed(self, query):
+        vec = np.asarray(self.embedder.embed_query(query), dtype=np.float32)
+        return vec / (np.linalg.norm(vec) + 1e-12)
+
+    def _drop_expired(self, now):
+        expired = [i for i, e in self._entries.items() if now - e["created"] > self.ttl_s]
+        for i in expired:
+            del self._entries[i]
+        if expired:
+            self._matrix = None
+            self.counters["expired"] += len(expired)
+
+    def _best_match(self, vec):
+        if not self._entries:
+            return None, 0.0
+        if self._matrix is None:
+            self._matrix_ids = list(self._entries)
+            self._matrix = np.stack([self._entries[i]["vec"] for i in self._matrix_ids])
+        # one matrix-vector product instead of comparing entries one by one
+        sims = self._matrix @ vec
+        best = int(np.argmax(sims))
+        return self._matrix_ids[best], float(sims[best])
+
+    def lookup(self, query):
+        """Returns ((answer, sources) or None, query vector, generation the lookup saw)"""
+        with span("cache_lookup"):
+            vec = self._embed(query)
+            with self._lock:
+                self._drop_expired(time.time())
+                entry_id, sim = self._best_match(vec)
+                if entry_id is not None and sim >= self.threshold:
+                    self._entries.move_to_end(entry_id)
+                    self.counters["hits"] += 1
+                    count("rag_answer_cache_total", result="hit")
+                    entry = self._entries[entry_id]
+                    return (entry["answer"], entry["sources"]), vec, self.generation
+                self.counters["misses"] += 1
+                count("rag_answer_cache_total", result="miss")
+                return None, vec, self.generation
+
+    def store(self, query, vec, answer, sources, generation):
+        with self._lock:
+            # collection changed while we were answering -> this answer may already be stale
+            if generation != self.generation:
+                return
+            self._entries[self._next_id] = {
+                "query": query, "vec": vec, "answer": answer, "sources": sources, "created": time.time()
+            }
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.counters["evicted"] += 1
+            self._matrix = None
+
+    def get_or_compute(self, query, compute):
+        """compute() -> (answer, sources), only called on a miss"""
+        cached, vec, generation = self.lookup(query)
+        if cached is not None:
+            return cached
+        answer, sources = compute()
+        self.store(query, vec, answer, sources, generation)
+        return answer, sources
+
+    def invalidate(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._matrix = None
+            self.counters["invalidations"] += 1
+
+    def stats(self):
+        with self._lock:
+            s = dict(self.counters)
+            s["entries"] = len(self._entries)
+            s["generation"] = self.generation
+        total = s["hits"] + s["misses"]
+        s["hit_rate"] = s["hits"] / total if total else 0.0
+        return s
@@ -0,0 +1,391 @@
+#Load / latency benchmark for the rag_fastapi HTTP API, no Groq key and no internet needed
+#   - StubChatGroq: deterministic local stand-in for ChatGroq (fixed latency, streams word by word)
+#   - fixture server: local HTML pages with ETags, so /process_urls runs the real fetch -> parse -> embed path
+#   - load generator: N concurrent aiohttp clients against /ask at each concurrency level
+#
+# Reports req/s + p50/p95/p99 end to end, and per stage (embed, retrieve, MMR, LLM, answer chain, serialization)
+# from timing wrappers around the functions that do the work. The API runs in this process (uvicorn thread),
+# so the client shares the GIL with it -> compare runs with each other, not with production numbers.
+#
+#   python bench_api.py                                   # fake embeddings, 20 pages, concurrency 1 4 16
+#   python bench_api.py --embeddings real --llm-ms 300 --concurrency 1 8 32 --requests 400
+#   python bench_api.py --save baseline.json
+#   python bench_api.py --compare baseline.json --tolerance 0.2   # exit 1 if any p95 got >20% slower
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import aiohttp
+import numpy as np
+import uvicorn
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+import fastapi.routing
+import hybrid_retriever
+import mmr
+import query_engine
+import rag_fastapi
+from embedding_service import get_embedding_service
+from fastapi.responses import JSONResponse
+
+API_PORT = 8765
+TOPICS = ["mortgage", "treasury", "inflation", "housing", "fed funds", "refinance", "equity", "bond"]
+
+
+#  STAGE TIMINGS
+class StageRecorder:
+    """stage -> list of ms, thread safe"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+
+    def add(self, stage, ms):
+        with self._lock:
+            self.samples.setdefault(stage, []).append(ms)
+
+    def reset(self):
+        with self._lock:
+            self.samples = {}
+
+    @contextmanager
+    def span(self, stage):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, (time.perf_counter() - t0) * 1000)
+
+
+stages = StageRecorder()
+
+
+def _wrap(obj, name, stage):
+    original = getattr(obj, name)
+
+    def timed(*args, **kwargs):
+        with stages.span(stage):
+            return original(*args, **kwargs)
+    setattr(obj, name, timed)
+
+
+def _wrap_async(obj, name, stage):
+    original = getattr(obj, name)
+
+    async def timed(*args, **kwargs):
+        with stages.span(stage):
+            return await original(*args, **kwargs)
+    setattr(obj, name, timed)
+
+
+def instrument():
+    # MMR runs inside retrieve on the same thread -> retrieve is reported without it
+    local = threading.local()
+    original_select = mmr.mmr_select
+
+    def timed_select(*args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return original_select(*args, **kwargs)
+        finally:
+            ms = (time.perf_counter() - t0) * 1000
+            local.mmr_ms = getattr(local, "mmr_ms", 0.0) + ms
+            stages.add("mmr", ms)
+    mmr.mmr_select = timed_select
+    hybrid_retriever.mmr_select = timed_select
+
+    original_retrieve = query_engine.QueryEngine.retrieve
+
+    def timed_retrieve(self, *args, **kwargs):
+        local.mmr_ms = 0.0
+        t0 = time.perf_counter()
+        try:
+            return original_retrieve(self, *args, **kwargs)
+        finally:
+            stages.add("retrieve (excl. mmr)", (time.perf_counter() - t0) * 1000 - local.mmr_ms)
+    query_engine.QueryEngine.retrieve = timed_retrieve
+
+    _wrap(query_engine.QueryEngine, "_combine", "answer chain (incl. llm)")
+    _wrap_async(fastapi.routing, "serialize_response", "serialize (encode)")
+    _wrap(JSONResponse, "render", "serialize (render)")
+
+
+#  STUB LLM
+class StubChatGroq(BaseChatModel):
+    """Deterministic ChatGroq stand-in: answer depends only on the prompt, fixed latency per call"""
+
+    latency_ms: float = 0.0
+    stream_words_per_s: float = 0.0  # 0 -> stream as fast as possible
+
+    @property
+    def _llm_type(self):
+        return "stub-chat-groq"
+
+    def get_num_tokens(self, text):
+        # map-reduce counts tokens, default would download the gpt2 tokenizer
+        return len(text.split())
+
+    def _answer(self, messages):
+        prompt = "\n".join(str(m.content) for m in messages)
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8]
+        sources = list(dict.fromkeys(re.findall(r"Source:\s*(\S+)", prompt)))[:3]
+        words = " ".join(prompt.split()[-40:])
+        return f"Stub answer {digest}: {words}\nSOURCES: {', '.join(sources)}"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        with stages.span("llm"):
+            time.sleep(self.latency_ms / 1000)
+            text = self._answer(messages)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        with stages.span("llm"):
+            time.sleep(self.latency_ms / 1000)
+            for word in re.findall(r"\S+\s*", self._answer(messages)):
+                if self.stream_words_per_s:
+                    time.sleep(1 / self.stream_words_per_s)
+                chunk = ChatGenerationChunk(message=AIMessageChunk(content=word))
+                if run_manager:
+                    run_manager.on_llm_new_token(word, chunk=chunk)
+                yield chunk
+
+
+#  HTML FIXTURE SERVER
+def make_page(i, paragraphs):
+    rng = random.Random(i)
+    body = [f"<h1>Market note {i}: {TOPICS[i % len(TOPICS)]}</h1>"]
+    for p in range(paragraphs):
+        topic = rng.choice(TOPICS)
+        rate = rng.uniform(2, 9)
+        body.append(
+            f"<p>On 2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} the {topic} rate moved to {rate:.3f}%. "
+            f"Analysts at desk {rng.randint(1, 40)} expect the {topic} outlook to {rng.choice(['improve', 'worsen', 'hold'])} "
+            f"as {rng.choice(TOPICS)} spreads {rng.choice(['widen', 'tighten'])} by {rng.randint(1, 90)} basis points. "
+            f"Paragraph {p} of note {i} covers regional {topic} data and the weekly survey.</p>"
+        )
+    return f"<html><head><title>Note {i}</title></head><body>{''.join(body)}</body></html>".encode("utf-8")
+
+
+def start_fixture_server(n_pages, paragraphs):
+    pages = {f"/note/{i}.html": make_page(i, paragraphs) for i in range(n_pages)}
+    etags = {path: '"' + hashlib.md5(body).hexdigest() + '"' for path, body in pages.items()}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = pages.get(self.path)
+            if body is None:
+                self.send_response(404)
+                self.end_headers()
+                return
+            if self.headers.get("If-None-Match") == etags[self.path]:
+                self.send_response(304)
+                self.send_header("ETag", etags[self.path])
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", etags[self.path])
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    return server, [base + path for path in pages]
+
+
+#  API SERVER
+def start_api(port):
+    server = uvicorn.Server(uvicorn.Config(rag_fastapi.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise SystemExit(f"API server could not start on port {port}")
+        time.sleep(0.05)
+    return server
+
+
+#  LOAD GENERATOR
+async def run_ingestion(base, urls):
+    async with aiohttp.ClientSession() as session:
+        t0 = time.perf_counter()
+        async with session.post(f"{base}/process_urls", json={"urls": urls}) as resp:
+            job_id = (await resp.json())["job_id"]
+        while True:
+            async with session.get(f"{base}/jobs/{job_id}") as resp:
+                job = await resp.json()
+            if job["status"] in ("done", "failed"):
+                break
+            await asyncio.sleep(0.05)
+    return time.perf_counter() - t0, job
+
+
+async def run_load(base, questions, concurrency, route):
+    latencies, errors = [], 0
+    todo = asyncio.Queue()
+    for q in questions:
+        todo.put_nowait(q)
+
+    async def worker(session):
+        nonlocal errors
+        while True:
+            try:
+                question = todo.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            t0 = time.perf_counter()
+            try:
+                async with session.post(f"{base}{route}", json={"question": question}) as resp:
+                    await resp.read()
+                    ok = resp.status == 200
+            except aiohttp.ClientError:
+                ok = False
+            latencies.append((time.perf_counter() - t0) * 1000)
+            errors += not ok
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker(session) for _ in range(concurrency)))
+        wall = time.perf_counter() - t0
+    return latencies, errors, wall
+
+
+def percentiles(values):
+    if not values:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "n": 0}
+    arr = np.asarray(values)
+    return {
+        "p50": float(np.percentile(arr, 50)),
+        "p95": float(np.percentile(arr, 95)),
+        "p99": float(np.percentile(arr, 99)),
+        "n": len(values),
+    }
+
+
+def make_questions(n, distinct, run):
+    # run goes into the text -> no semantic cache hits across levels / the warm up
+    rng = random.Random(run)
+    pool = [
+        f"What did desk {rng.randint(1, 40)} say about the {rng.choice(TOPICS)} rate in note {i} (run {run})?"
+        for i in range(distinct)
+    ]
+    return [pool[i % distinct] for i in range(n)]
+
+
+def compare(results, baseline_path, tolerance):
+    baseline = json.loads(Path(baseline_path).read_text())
+    failed = False
+    print(f"\nvs {baseline_path} (tolerance {tolerance:.0%} on p95):")
+    for level, current in results["load"].items():
+        before = baseline.get("load", {}).get(level)
+        if not before:
+            continue
+        for stage, stats in {"end to end": current["latency"], **current["stages"]}.items():
+            old = before["latency"] if stage == "end to end" else before["stages"].get(stage)
+            if not old or not old["p95"]:
+                continue
+            change = stats["p95"] / old["p95"] - 1
+            flag = "REGRESSION" if change > tolerance else ""
+            failed |= bool(flag)
+            print(f"  c={level:<4} {stage:<26} p95 {old['p95']:8.2f} -> {stats['p95']:8.2f} ms ({change:+.0%}) {flag}")
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--paragraphs", type=int, default=30)
+    parser.add_argument("--embeddings", choices=["fake", "real"], default="fake",
+                        help="real -> MiniLM via embedding_service (model must be downloadable / cached)")
+    parser.add_argument("--llm-ms", type=float, default=0.0, help="stub LLM latency per call")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=200, help="requests per concurrency level")
+    parser.add_argument("--distinct", type=int, default=None,
+                        help="distinct questions (default = --requests, so no semantic cache hits)")
+    parser.add_argument("--route", default="/ask", choices=["/ask", "/ask/stream"])
+    parser.add_argument("--port", type=int, default=API_PORT)
+    parser.add_argument("--save", help="write results json (baseline for --compare)")
+    parser.add_argument("--compare", help="baseline json from an earlier --save")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    # backend wiring: temp store, stub LLM, chosen embeddings, timing wrappers
+    rag_fastapi.VECTORSTORE_DIR = Path(tempfile.mkdtemp(prefix="bench_api_"))
+    rag_fastapi.llm = StubChatGroq(latency_ms=args.llm_ms)
+    if args.embeddings == "fake":
+        embedder = DeterministicFakeEmbedding(size=384)
+    else:
+        embedder = get_embedding_service(rag_fastapi.EMBEDDING_MODEL)
+    rag_fastapi.get_embedding_service = lambda *a, **kw: embedder
+    instrument()
+    _wrap(type(embedder), "embed_query", "embed query")
+
+    fixtures, urls = start_fixture_server(args.pages, args.paragraphs)
+    api = start_api(args.port)
+    base = f"http://127.0.0.1:{args.port}"
+    results = {"config": vars(args), "ingestion": {}, "load": {}}
+
+    try:
+        # ingestion: first pass embeds everything, second pass should be all 304s
+        for name in ("cold", "unchanged"):
+            stages.reset()
+            wall, job = asyncio.run(run_ingestion(base, urls))
+            if job["status"] != "done":
+                raise SystemExit(f"Ingestion failed: {job['error']}")
+            print(f"ingestion ({name}): {len(urls)} pages in {wall:.2f}s -> {len(urls) / wall:.1f} pages/s | {job['latest']}")
+            results["ingestion"][name] = {"wall_s": wall, "latest": job["latest"]}
+
+        questions = make_questions(10, 10, run="warm-up")
+        asyncio.run(run_load(base, questions, 2, args.route))  # warm up chains / pools
+
+        print(f"\n{args.route}  stub llm {args.llm_ms:.0f} ms, {args.embeddings} embeddings")
+        for level in args.concurrency:
+            stages.reset()
+            questions = make_questions(args.requests, args.distinct or args.requests, run=level)
+            latencies, errors, wall = asyncio.run(run_load(base, questions, level, args.route))
+            lat = percentiles(latencies)
+            stage_stats = {stage: percentiles(v) for stage, v in sorted(stages.samples.items())}
+            results["load"][str(level)] = {
+                "rps": len(latencies) / wall, "errors": errors, "latency": lat, "stages": stage_stats
+            }
+
+            print(f"\nconcurrency {level}: {len(latencies) / wall:8.1f} req/s   errors {errors}   "
+                  f"p50 {lat['p50']:.2f}  p95 {lat['p95']:.2f}  p99 {lat['p99']:.2f} ms")
+            print(f"  {'stage':<26} {'calls':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+            for stage, s in stage_stats.items():
+                print(f"  {stage:<26} {s['n']:>6} {s['p50']:>8.2f} {s['p95']:>8.2f} {s['p99']:>8.2f}")
+    finally:
+        api.should_exit = True
+        fixtures.shutdown()
+
+    # compare first -> --save and --compare can point at the same file
+    regressed = bool(args.compare) and compare(results, args.compare, args.tolerance)
+    if args.save:
+        Path(args.save).write_text(json.dumps(results, indent=2))
+        print(f"\nwrote {args.save}")
+    if regressed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+#Offline cost / quality comparison of the chunkers in chunkers.py
+# For every strategy on the same local corpus:
+#   chunks, avg / max tokens per chunk, % chunks longer than the model window (silently truncated),
+#   embedding time (cold, no cache), Chroma index size on disk, hit-rate@k on a labelled question set
+#
+#   python bench_chunking.py --corpus ./pages --questions questions.jsonl
+#   python bench_chunking.py --corpus ./pages --questions questions.jsonl --configs chars:2000:200 tokens:240:32
+#
+# questions.jsonl, one per line:
+#   {"question": "What was the 30 year fixed rate?", "answer": "6.875%"}
+#   {"question": "...", "answer": "...", "source": "mortgage.html"}   <- optional, chunk must come from that file
+# A question is a hit when any of the top k chunks contains the answer text (case / whitespace insensitive).
+# This label works for every strategy, unlike chunk ids which change with the chunking.
+
+import argparse
+import csv
+import json
+import re
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import chromadb
+import numpy as np
+
+from bench_hnsw import dir_size
+from chunkers import DEFAULT_MODEL, MODEL_MAX_TOKENS, SPECIAL_TOKENS, make_splitter, token_length_function
+from embedding_service import EmbeddingService
+
+DEFAULT_CONFIGS = [
+    "chars:2000:200",    # rag.py today
+    "chars:1000:200",    # ragmmr.py / rag_fastapi.py today
+    "tokens:240:32",
+    "tokens:128:16",
+    "sentences:240:32",
+]
+ADD_BATCH = 1000
+
+
+def load_documents(path):
+    """[(source name, text)] from a folder of .txt / .md / .html files"""
+    docs = []
+    for fpath in sorted(Path(path).rglob("*")):
+        if fpath.suffix.lower() in (".txt", ".md"):
+            docs.append((fpath.name, fpath.read_text(encoding="utf-8", errors="replace")))
+        elif fpath.suffix.lower() in (".html", ".htm"):
+            from unstructured.partition.html import partition_html
+            elements = partition_html(filename=str(fpath))
+            docs.append((fpath.name, "\n\n".join(str(el) for el in elements)))
+    return docs
+
+
+def load_questions(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _norm(text):
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def is_hit(question, chunks, sources):
+    answer = _norm(question["answer"])
+    for chunk, source in zip(chunks, sources):
+        if question.get("source") and question["source"] != source:
+            continue
+        if answer in _norm(chunk):
+            return True
+    return False
+
+
+def run_strategy(config, docs, questions, k, model_name, token_len):
+    strategy, size, overlap = config.split(":")
+    splitter, _ = make_splitter(strategy, int(size), int(overlap), model_name)
+
+    chunks, sources = [], []
+    t0 = time.perf_counter()
+    for source, text in docs:
+        for piece in splitter.split_text(text):
+            chunks.append(piece)
+            sources.append(source)
+    split_s = time.perf_counter() - t0
+
+    lengths = np.array([token_len(c) for c in chunks])
+    window = MODEL_MAX_TOKENS - SPECIAL_TOKENS
+
+    # fresh service without RAM / disk cache -> real model time for every strategy
+    embedder = EmbeddingService(model_name, cache_path=None, lru_size=0)
+    embedder.warm_up()
+    t0 = time.perf_counter()
+    vecs = embedder.embed_documents(chunks)
+    embed_s = time.perf_counter() - t0
+    query_vecs = embedder.embed_documents([q["question"] for q in questions])
+
+    workdir = tempfile.mkdtemp(prefix="bench_chunking_")
+    try:
+        client = chromadb.PersistentClient(path=workdir)
+        collection = client.create_collection(name="bench_chunking", metadata={"hnsw:space": "cosine"})
+        ids = [str(i) for i in range(len(chunks))]
+        for start in range(0, len(ids), ADD_BATCH):
+            end = start + ADD_BATCH
+            collection.add(
+                ids=ids[start:end],
+                embeddings=vecs[start:end],
+                documents=chunks[start:end],
+                metadatas=[{"source": s} for s in sources[start:end]],
+            )
+        index_mb = dir_size(workdir) / 1e6
+
+        hits = 0
+        for question, qvec in zip(questions, query_vecs):
+            res = collection.query(query_embeddings=[qvec], n_results=min(k, len(chunks)),
+                                   include=["documents", "metadatas"])
+            top_sources = [m["source"] for m in res["metadatas"][0]]
+            hits += is_hit(question, res["documents"][0], top_sources)
+        del client
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "config": config,
+        "chunks": len(chunks),
+        "avg_tokens": float(lengths.mean()) if len(lengths) else 0.0,
+        "max_tokens": int(lengths.max()) if len(lengths) else 0,
+        "truncated_pct": float((lengths > window).mean() * 100) if len(lengths) else 0.0,
+        "split_s": split_s,
+        "embed_s": embed_s,
+        "index_mb": index_mb,
+        f"hit_rate@{k}": hits / len(questions) if questions else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", required=True, help="folder of .txt/.md/.html files")
+    parser.add_argument("--questions", required=True, help="labelled questions, jsonl")
+    parser.add_argument("--configs", nargs="+", default=DEFAULT_CONFIGS, help="strategy:size:overlap")
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--csv", help="also write the table to this csv")
+    args = parser.parse_args()
+
+    docs = load_documents(args.corpus)
+    if not docs:
+        raise SystemExit(f"No documents found in {args.corpus}")
+    questions = load_questions(args.questions)
+    token_len = token_length_function(args.model)
+    print(f"{len(docs)} documents, {len(questions)} questions, k={args.k}\n")
+
+    header = (f"{'config':<20} {'chunks':>7} {'avg tok':>8} {'max tok':>8} {'trunc %':>8} "
+              f"{'embed s':>8} {'index MB':>9} {'hit@' + str(args.k):>7}")
+    print(header)
+    print("-" * len(header))
+    rows = []
+    for config in args.configs:
+        row = run_strategy(config, docs, questions, args.k, args.model, token_len)
+        rows.append(row)
+        print(f"{config:<20} {row['chunks']:>7} {row['avg_tokens']:>8.1f} {row['max_tokens']:>8} "
+              f"{row['truncated_pct']:>8.1f} {row['embed_s']:>8.2f} {row['index_mb']:>9.2f} "
+              f"{row[f'hit_rate@{args.k}']:>7.3f}")
+
+    if args.csv:
+        with open(args.csv, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"\nwrote {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
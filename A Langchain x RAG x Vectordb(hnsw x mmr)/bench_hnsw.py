@@ -0,0 +1,185 @@
+#HNSW recall / latency benchmark for the Chroma store
+# Builds a throwaway collection from a LOCAL corpus for every (M, ef_construction, ef_search) in the grid
+# and compares each against exact (brute force cosine) search:
+#   recall@k, p50 / p99 query latency, build time, on disk size
+#
+#   python bench_hnsw.py --corpus ./my_pages --k 5 --m 8 16 32 --ef-construction 64 100 200 --ef-search 10 50 100
+#   python bench_hnsw.py --corpus ./my_pages --csv hnsw_grid.csv
+#
+# Corpus = a folder of .txt / .md / .html files (or one .jsonl with a "text" field per line),
+# chunked exactly like process_urls. Embeddings are computed once and reused for every grid point,
+# so only the index itself is being measured.
+
+import argparse
+import csv
+import itertools
+import json
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import chromadb
+import numpy as np
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from embedding_service import DEFAULT_MODEL, get_embedding_service
+
+CHUNK_SIZE = 1000
+ADD_BATCH = 1000
+
+
+def load_corpus(path):
+    path = Path(path)
+    if path.suffix == ".jsonl":
+        with open(path, "r", encoding="utf-8") as f:
+            return [json.loads(line)["text"] for line in f if line.strip()]
+    texts = []
+    for fpath in sorted(path.rglob("*")):
+        if fpath.suffix.lower() in (".txt", ".md"):
+            texts.append(fpath.read_text(encoding="utf-8", errors="replace"))
+        elif fpath.suffix.lower() in (".html", ".htm"):
+            from unstructured.partition.html import partition_html
+            elements = partition_html(filename=str(fpath))
+            texts.append("\n\n".join(str(el) for el in elements))
+    return texts
+
+
+def chunk(texts, chunk_size):
+    splitter = RecursiveCharacterTextSplitter(separators=["\n\n", "\n", ".", " "], chunk_size=chunk_size)
+    chunks = []
+    for text in texts:
+        chunks.extend(splitter.split_text(text))
+    return chunks
+
+
+def normalize(x):
+    return x / np.maximum(np.linalg.norm(x, axis=1, keepdims=True), 1e-12)
+
+
+def exact_top_k(doc_vecs, query_vecs, k):
+    # brute force cosine = ground truth
+    sims = normalize(query_vecs) @ normalize(doc_vecs).T
+    return np.argsort(-sims, axis=1)[:, :k]
+
+
+def dir_size(path):
+    return sum(f.stat().st_size for f in Path(path).rglob("*") if f.is_file())
+
+
+def run_config(doc_vecs, query_vecs, truth, k, m, ef_construction, ef_search):
+    workdir = tempfile.mkdtemp(prefix="bench_hnsw_")
+    try:
+        client = chromadb.PersistentClient(path=workdir)
+        collection = client.create_collection(
+            name="bench_hnsw",
+            metadata={
+                "hnsw:space": "cosine",
+                "hnsw:M": m,
+                "hnsw:construction_ef": ef_construction,
+                "hnsw:search_ef": ef_search,
+            },
+        )
+
+        ids = [str(i) for i in range(len(doc_vecs))]
+        t0 = time.perf_counter()
+        for start in range(0, len(ids), ADD_BATCH):
+            collection.add(
+                ids=ids[start:start + ADD_BATCH],
+                embeddings=doc_vecs[start:start + ADD_BATCH].tolist(),
+            )
+        build_s = time.perf_counter() - t0
+
+        latencies, hits = [], 0
+        for q, expected in zip(query_vecs, truth):
+            t0 = time.perf_counter()
+            res = collection.query(query_embeddings=[q.tolist()], n_results=k, include=[])
+            latencies.append((time.perf_counter() - t0) * 1000)
+            hits += len({int(i) for i in res["ids"][0]} & set(expected.tolist()))
+
+        size_mb = dir_size(workdir) / 1e6
+        del client
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    latencies = np.array(latencies)
+    return {
+        "M": m,
+        "ef_construction": ef_construction,
+        "ef_search": ef_search,
+        f"recall@{k}": hits / (len(query_vecs) * k),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "build_s": build_s,
+        "disk_mb": size_mb,
+    }
+
+
+def exact_latency(doc_vecs, query_vecs, k):
+    # numpy brute force on the same data, as the "no index" reference line
+    docs = normalize(doc_vecs)
+    latencies = []
+    for q in normalize(query_vecs):
+        t0 = time.perf_counter()
+        sims = docs @ q
+        np.argpartition(-sims, min(k, len(sims) - 1))[:k]
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return float(np.percentile(latencies, 50)), float(np.percentile(latencies, 99))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", required=True, help="folder of .txt/.md/.html files or a .jsonl file")
+    parser.add_argument("--queries", help="optional text file, one question per line (default: sampled chunks)")
+    parser.add_argument("--n-queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--m", type=int, nargs="+", default=[8, 16, 32])
+    parser.add_argument("--ef-construction", type=int, nargs="+", default=[64, 100, 200])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[10, 50, 100])
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--csv", help="also write the table to this csv")
+    args = parser.parse_args()
+
+    chunks = chunk(load_corpus(args.corpus), args.chunk_size)
+    if not chunks:
+        raise SystemExit(f"No text found in {args.corpus}")
+    embedder = get_embedding_service(args.model)
+
+    t0 = time.perf_counter()
+    doc_vecs = np.asarray(embedder.embed_documents(chunks), dtype=np.float32)
+    print(f"{len(chunks)} chunks embedded in {time.perf_counter() - t0:.1f}s (dim {doc_vecs.shape[1]})")
+
+    if args.queries:
+        questions = [q.strip() for q in Path(args.queries).read_text(encoding="utf-8").splitlines() if q.strip()]
+        query_vecs = np.asarray(embedder.embed_documents(questions), dtype=np.float32)
+    else:
+        rng = np.random.default_rng(0)
+        picks = rng.choice(len(doc_vecs), size=min(args.n_queries, len(doc_vecs)), replace=False)
+        # small noise so the query isnt trivially its own chunk
+        query_vecs = doc_vecs[picks] + rng.normal(scale=0.01, size=doc_vecs[picks].shape).astype(np.float32)
+
+    truth = exact_top_k(doc_vecs, query_vecs, args.k)
+    p50, p99 = exact_latency(doc_vecs, query_vecs, args.k)
+    print(f"exact search (numpy brute force): recall 1.000  p50 {p50:.3f} ms  p99 {p99:.3f} ms\n")
+
+    rows = []
+    header = f"{'M':>4} {'ef_c':>6} {'ef_s':>6} {'recall@' + str(args.k):>10} {'p50 ms':>8} {'p99 ms':>8} {'build s':>8} {'disk MB':>8}"
+    print(header)
+    print("-" * len(header))
+    for m, ef_c, ef_s in itertools.product(args.m, args.ef_construction, args.ef_search):
+        row = run_config(doc_vecs, query_vecs, truth, args.k, m, ef_c, ef_s)
+        rows.append(row)
+        print(f"{m:>4} {ef_c:>6} {ef_s:>6} {row[f'recall@{args.k}']:>10.3f} {row['p50_ms']:>8.3f} "
+              f"{row['p99_ms']:>8.3f} {row['build_s']:>8.2f} {row['disk_mb']:>8.2f}")
+
+    if args.csv:
+        with open(args.csv, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"\nwrote {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#Micro benchmark: per query chain construction (old generate_answer) vs the long lived QueryEngine
+# No Groq key / internet needed -> fake LLM + deterministic fake embeddings in an in-memory Chroma,
+# so the numbers are pure framework overhead (retriever + prompt + chain building), not model time
+#
+#   python bench_query_engine.py --queries 200
+
+import argparse
+import statistics
+import time
+
+from langchain.chains import RetrievalQAWithSourcesChain
+from langchain_chroma import Chroma
+from langchain_community.llms.fake import FakeListLLM
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from query_engine import QueryEngine
+
+SEARCH_KWARGS = {"k": 5, "fetch_k": 20, "lambda_mult": 0.5}
+
+
+def build_store(n_chunks):
+    store = Chroma(
+        collection_name="bench_query_engine",
+        embedding_function=DeterministicFakeEmbedding(size=384),
+        collection_metadata={"hnsw:space": "cosine"}
+    )
+    docs = [
+        Document(page_content=f"Chunk {i}: 30 year fixed mortgage rate was {6 + i % 100 / 100:.2f}% in week {i}",
+                 metadata={"source": f"https://example.com/page{i % 10}"})
+        for i in range(n_chunks)
+    ]
+    store.add_documents(docs, ids=[str(i) for i in range(n_chunks)])
+    return store
+
+
+def old_generate_answer(llm, store, query):
+    # exactly what ragmmr.generate_answer did before the engine
+    retriever = store.as_retriever(search_type="mmr", search_kwargs=SEARCH_KWARGS)
+    chain = RetrievalQAWithSourcesChain.from_llm(llm=llm, retriever=retriever)
+    result = chain.invoke({"question": query}, return_only_outputs=True)
+    return result.get("answer", ""), result.get("sources", "")
+
+
+def time_it(fn, queries):
+    times = []
+    for q in queries:
+        t0 = time.perf_counter()
+        fn(q)
+        times.append((time.perf_counter() - t0) * 1000)
+    return times
+
+
+def report(name, times):
+    times = sorted(times)
+    p99 = times[min(len(times) - 1, int(len(times) * 0.99))]
+    print(f"{name:<28} mean {statistics.mean(times):7.2f} ms   p50 {statistics.median(times):7.2f} ms   p99 {p99:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--chunks", type=int, default=500)
+    args = parser.parse_args()
+
+    llm = FakeListLLM(responses=["The rate was 6.5% on 2024-05-02.\nSOURCES: https://example.com/page1"])
+    store = build_store(args.chunks)
+    queries = [f"What was the 30 year fixed mortgage rate in week {i}?" for i in range(args.queries)]
+
+    # warm up both paths once (imports, prompt compilation, Chroma)
+    old_generate_answer(llm, store, queries[0])
+    t0 = time.perf_counter()
+    engine = QueryEngine(llm, store, **SEARCH_KWARGS)
+    build_ms = (time.perf_counter() - t0) * 1000
+    engine.answer(queries[0])
+
+    old = time_it(lambda q: old_generate_answer(llm, store, q), queries)
+    new = time_it(engine.answer, queries)
+
+    # retrieval only, to see how much of each path is the vector search itself
+    retrieval = time_it(lambda q: store.max_marginal_relevance_search(q, **SEARCH_KWARGS), queries)
+
+    t0 = time.perf_counter()
+    engine.answer_many(queries)
+    many_ms = (time.perf_counter() - t0) * 1000
+
+    print(f"{args.queries} queries over {args.chunks} chunks (fake LLM, fake embeddings)\n")
+    report("per query chain (old)", old)
+    report("QueryEngine.answer", new)
+    report("retrieval only", retrieval)
+    print(f"\nengine built once in {build_ms:.2f} ms")
+    print(f"overhead removed per query: {statistics.mean(old) - statistics.mean(new):.2f} ms "
+          f"({(1 - statistics.mean(new) / statistics.mean(old)) * 100:.1f}%)")
+    print(f"answer_many: {many_ms:.1f} ms total, {many_ms / args.queries:.2f} ms per query")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#Sparse BM25 inverted index kept next to the Chroma store
+# MiniLM similarity often misses exact tokens (rate figures like 6.875%, tickers, dates like 2024-05-02),
+# BM25 catches them -> hybrid_retriever.py fuses both lists with reciprocal rank fusion
+#
+# Chunk ids are the same content hashed ids Chroma uses, so process_urls adds / removes chunks in both
+# Persisted as a pickle under resources/vectorstore, loaded once per process
+
+import heapq
+import math
+import os
+import pickle
+import re
+import threading
+from collections import Counter
+from pathlib import Path
+
+K1 = 1.5
+B = 0.75
+MIN_IDF = 0.2  # terms in ~80%+ of chunks add almost nothing but cost a full postings scan
+
+# numbers with decimals / %, dates, hyphenated words, tickers like BRK.B stay one token
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[.\-/:][a-z0-9]+)*%?")
+_PART_RE = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "in", "is", "it",
+    "its", "of", "on", "or", "that", "the", "this", "to", "was", "were", "will", "with", "what", "which",
+}
+
+
+def tokenize(text):
+    """Lowercase tokens, compound tokens ("6.875%", "2024-05-02") plus their parts so both match"""
+    tokens = []
+    for tok in _TOKEN_RE.findall(text.lower()):
+        if tok in STOPWORDS:
+            continue
+        tokens.append(tok)
+        if tok.endswith("%"):
+            tokens.append(tok[:-1])
+        parts = _PART_RE.findall(tok)
+        if len(parts) > 1:
+            tokens.extend(p for p in parts if p not in STOPWORDS)
+    return tokens
+
+
+class BM25Index:
+    """term -> {chunk_id: tf} postings, incremental add / remove"""
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path else None
+        self.postings = {}
+        self.doc_len = {}
+        self.doc_terms = {}  # chunk_id -> unique terms, needed to remove a chunk again
+        self.total_len = 0
+        self._lock = threading.RLock()
+        if self.path and self.path.exists():
+            with open(self.path, "rb") as f:
+                data = pickle.load(f)
+            self.postings = data["postings"]
+            self.doc_len = data["doc_len"]
+            self.doc_terms = data["doc_terms"]
+            self.total_len = sum(self.doc_len.values())
+
+    def __len__(self):
+        return len(self.doc_len)
+
+    def add(self, chunk_id, text):
+        with self._lock:
+            if chunk_id in self.doc_len:
+                self.remove(chunk_id)
+            counts = Counter(tokenize(text))
+            for term, tf in counts.items():
+                self.postings.setdefault(term, {})[chunk_id] = tf
+            length = sum(counts.values())
+            self.doc_len[chunk_id] = length
+            self.doc_terms[chunk_id] = list(counts)
+            self.total_len += length
+
+    def add_many(self, ids, texts):
+        with self._lock:
+            for chunk_id, text in zip(ids, texts):
+                self.add(chunk_id, text)
+
+    def remove(self, chunk_id):
+        with self._lock:
+            if chunk_id not in self.doc_len:
+                return
+            for term in self.doc_terms.pop(chunk_id):
+                docs = self.postings.get(term)
+                if docs is not None:
+                    docs.pop(chunk_id, None)
+                    if not docs:
+                        del self.postings[term]
+            self.total_len -= self.doc_len.pop(chunk_id)
+
+    def remove_many(self, ids):
+        with self._lock:
+            for chunk_id in ids:
+                self.remove(chunk_id)
+
+    def clear(self):
+        with self._lock:
+            self.postings, self.doc_len, self.doc_terms, self.total_len = {}, {}, {}, 0
+        self.save()
+
+    def search(self, query, k=20):
+        """Top k (chunk_id, bm25 score), best first"""
+        with self._lock:
+            n_docs = len(self.doc_len)
+            if n_docs == 0:
+                return []
+            avg_len = self.total_len / n_docs
+            scores = {}
+            for term in set(tokenize(query)):
+                docs = self.postings.get(term)
+                if not docs:
+                    continue
+                idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+                if idf < MIN_IDF:
+                    continue
+                for chunk_id, tf in docs.items():
+                    norm = tf + K1 * (1 - B + B * self.doc_len[chunk_id] / avg_len)
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (K1 + 1) / norm
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def sync_from_store(self, vector_store):
+        """One time backfill for a Chroma collection that was built before the BM25 index existed"""
+        data = vector_store.get(include=["documents"])
+        self.add_many(data["ids"], data["documents"])
+        self.save()
+
+    def save(self):
+        if self.path is None:
+            return
+        with self._lock:
+            payload = {"postings": self.postings, "doc_len": self.doc_len, "doc_terms": self.doc_terms}
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            with open(tmp, "wb") as f:
+                pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self.path)
@@ -0,0 +1,115 @@
+#Pluggable chunkers for process_urls
+#   chars      RecursiveCharacterTextSplitter, size / overlap in characters (what the project always used)
+#   tokens     same recursive splitting but measured in MiniLM word pieces, so a chunk never gets silently
+#              truncated by the model's 256 token window
+#   sentences  whole sentences packed up to chunk_size tokens, overlap = trailing sentences of the previous chunk
+#
+# make_splitter() also returns a key ("tokens:240:32") that goes into the fingerprints -> changing the
+# strategy re-splits every page on the next incremental run, unchanged chunks keep their ids and embeddings
+# bench_chunking.py compares the strategies offline
+
+import re
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter, TextSplitter
+
+STRATEGIES = ("chars", "tokens", "sentences")
+DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+MODEL_MAX_TOKENS = 256  # all-MiniLM-L6-v2 max_seq_length, anything after is cut off before embedding
+SPECIAL_TOKENS = 2  # [CLS] + [SEP]
+SEPARATORS = ["\n\n", "\n", ".", " "]
+
+# end of sentence = . ! ? followed by whitespace + an uppercase letter / digit / quote, but not after
+# common abbreviations or single letters ("U.S.", "Inc.", "e.g.") or inside numbers ("6.875%")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])[\"')\]]*\s+(?=[\"'(\[]?[A-Z0-9])")
+_ABBREVIATIONS = {"mr", "mrs", "ms", "dr", "inc", "ltd", "co", "corp", "jr", "sr", "st", "vs", "etc", "no",
+                  "jan", "feb", "mar", "apr", "jun", "jul", "aug", "sep", "sept", "oct", "nov", "dec", "e.g", "i.e"}
+
+_INITIALISM_RE = re.compile(r"(?:[a-z]\.)+[a-z]")  # "u.s", "u.k"
+
+_tokenizers = {}
+
+
+def get_tokenizer(model_name=DEFAULT_MODEL):
+    # only the tokenizer files, not the model weights
+    if model_name not in _tokenizers:
+        from transformers import AutoTokenizer
+        _tokenizers[model_name] = AutoTokenizer.from_pretrained(model_name)
+    return _tokenizers[model_name]
+
+
+def token_length_function(model_name=DEFAULT_MODEL):
+    tokenizer = get_tokenizer(model_name)
+
+    def length(text):
+        return len(tokenizer.encode(text, add_special_tokens=False))
+    return length
+
+
+def split_sentences(text):
+    """Regex sentence splitter, paragraphs / line breaks always end a sentence"""
+    sentences = []
+    for block in re.split(r"\n\s*\n|\n", text):
+        block = block.strip()
+        if not block:
+            continue
+        start = 0
+        for match in _SENTENCE_END_RE.finditer(block):
+            last_word = block[start:match.start()].rsplit(None, 1)[-1].rstrip(".!?\"')]").lower()
+            if last_word in _ABBREVIATIONS or len(last_word) == 1 or _INITIALISM_RE.fullmatch(last_word):
+                continue
+            sentences.append(block[start:match.end()].strip())
+            start = match.end()
+        sentences.append(block[start:].strip())
+    return [s for s in sentences if s]
+
+
+class SentenceSplitter(TextSplitter):
+    """Packs whole sentences into chunks of at most chunk_size (length_function units)
+    A single sentence longer than chunk_size falls back to the recursive splitter"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._fallback = RecursiveCharacterTextSplitter(
+            separators=SEPARATORS,
+            chunk_size=self._chunk_size,
+            chunk_overlap=self._chunk_overlap,
+            length_function=self._length_function,
+        )
+
+    def split_text(self, text):
+        pieces = []
+        for sentence in split_sentences(text):
+            if self._length_function(sentence) > self._chunk_size:
+                pieces.extend(self._fallback.split_text(sentence))
+            else:
+                pieces.append(sentence)
+        # TextSplitter._merge_splits does the packing + overlap bookkeeping
+        return self._merge_splits(pieces, " ")
+
+
+def make_splitter(strategy="chars", chunk_size=1000, chunk_overlap=0, model_name=DEFAULT_MODEL):
+    """Returns (splitter, splitter_key)
+    chars -> sizes in characters, tokens / sentences -> sizes in model_name word pieces"""
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown chunking strategy {strategy!r}, expected one of {STRATEGIES}")
+    if chunk_overlap >= chunk_size:
+        raise ValueError(f"chunk_overlap ({chunk_overlap}) must be smaller than chunk_size ({chunk_size})")
+
+    if strategy == "chars":
+        splitter = RecursiveCharacterTextSplitter(
+            separators=SEPARATORS,
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap
+        )
+    else:
+        if chunk_size > MODEL_MAX_TOKENS - SPECIAL_TOKENS:
+            raise ValueError(
+                f"chunk_size {chunk_size} tokens would be truncated by the model, "
+                f"max is {MODEL_MAX_TOKENS - SPECIAL_TOKENS}"
+            )
+        length = token_length_function(model_name)
+        cls = RecursiveCharacterTextSplitter if strategy == "tokens" else SentenceSplitter
+        kwargs = {"separators": SEPARATORS} if strategy == "tokens" else {}
+        splitter = cls(chunk_size=chunk_size, chunk_overlap=chunk_overlap, length_function=length, **kwargs)
+
+    return splitter, f"{strategy}:{chunk_size}:{chunk_overlap}"
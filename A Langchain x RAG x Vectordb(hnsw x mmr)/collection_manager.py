@@ -0,0 +1,240 @@
+#Named collections (one per tenant / research desk) instead of one global "financial_data" store
+# Each collection gets its own Chroma collection, fingerprints, BM25 index, answer cache and query engine,
+# all in the same persist dir ({name}_fingerprints.json, {name}_bm25.pkl next to chroma.sqlite3)
+#
+# Collections are loaded lazily on first use and the least recently used idle ones are unloaded past
+# max_loaded. A collection that is being queried / ingested (use() block) is never unloaded.
+# Unloading frees the collection's BM25 index, answer cache and query engine. The HNSW vectors belong to the
+# shared PersistentClient, not the Namespace -> they are only bounded when memory_limit_bytes is set
+# (chroma's LRU segment cache evicts them past that size), which rag.py, ragmmr.py and rag_fastapi.py all do.
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+
+import chromadb
+from chromadb.config import Settings
+from langchain_chroma import Chroma
+
+from answer_cache import SemanticAnswerCache
+from bm25_index import BM25Index
+from ingestion import FingerprintStore
+from telemetry import span
+
+MAX_LOADED = 8
+# chroma's own rules: 3-63 chars, letters / digits / . _ -, starts + ends with a letter or digit
+_NAME_RE = re.compile(r"[a-zA-Z0-9][a-zA-Z0-9._-]{1,61}[a-zA-Z0-9]")
+
+
+class UnknownCollection(KeyError):
+    pass
+
+
+class CollectionExists(ValueError):
+    pass
+
+
+def validate_name(name):
+    if not _NAME_RE.fullmatch(name or "") or ".." in name:
+        raise ValueError(
+            f"Invalid collection name {name!r}: 3-63 characters, letters, digits, '.', '_' or '-', "
+            "starting and ending with a letter or digit"
+        )
+    return name
+
+
+class Namespace:
+    """Everything one collection needs to ingest + answer"""
+
+    def __init__(self, name, vector_store, fingerprints, bm25_index, answer_cache, query_engine):
+        self.name = name
+        self.vector_store = vector_store
+        self.fingerprints = fingerprints
+        self.bm25_index = bm25_index
+        self.answer_cache = answer_cache
+        self.query_engine = query_engine
+        self.ingest_lock = threading.Lock()  # one ingestion per collection at a time
+        self.active = 0  # use() blocks currently holding this namespace
+        self.loaded_at = time.time()
+        self.last_used = time.time()
+
+    def count(self):
+        return self.vector_store._collection.count()
+
+
+class CollectionManager:
+    """name -> Namespace, lazy loading + LRU unloading of idle collections"""
+
+    def __init__(self, persist_dir, embedder, build_engine, hnsw_metadata=None, answer_cache_kwargs=None,
+                 max_loaded=MAX_LOADED, memory_limit_bytes=None):
+        """build_engine(vector_store, bm25_index) -> QueryEngine, so each backend keeps its own search settings
+        memory_limit_bytes -> chroma also evicts HNSW segments from RAM (LRU) past this size"""
+        self.persist_dir = Path(persist_dir)
+        self.embedder = embedder
+        self.build_engine = build_engine
+        self.collection_metadata = {"hnsw:space": "cosine", **(hnsw_metadata or {})}
+        self.answer_cache_kwargs = answer_cache_kwargs or {}
+        self.max_loaded = max_loaded
+
+        settings = Settings(anonymized_telemetry=False)
+        if memory_limit_bytes:
+            settings = Settings(
+                anonymized_telemetry=False,
+                chroma_segment_cache_policy="LRU",
+                chroma_memory_limit_bytes=memory_limit_bytes,
+            )
+        # one client for every collection, they all live in the same sqlite + segment folders
+        self.client = chromadb.PersistentClient(path=str(self.persist_dir), settings=settings)
+
+        self._loaded = OrderedDict()  # name -> Namespace, least recently used first
+        self._lock = threading.RLock()
+        # name -> lock held while that collection loads, outside self._lock -> a cold collection
+        # (chroma store + full BM25 sync) doesnt hold up requests to the other collections
+        self._loading = {}
+        self.counters = {"loads": 0, "unloads": 0}
+
+    # catalogue
+
+    def names(self):
+        return sorted(c.name for c in self.client.list_collections())
+
+    def exists(self, name):
+        return name in self.names()
+
+    def create(self, name, exist_ok=False):
+        validate_name(name)
+        with self._lock:
+            if self.exists(name):
+                if not exist_ok:
+                    raise CollectionExists(f"Collection {name!r} already exists")
+            else:
+                self.client.create_collection(name=name, metadata=self.collection_metadata)
+        return self.info(name)
+
+    def info(self, name):
+        with self._lock:
+            ns = self._loaded.get(name)
+        if ns is not None:
+            return {
+                "name": name, "loaded": True, "chunks": ns.count(), "urls": len(ns.fingerprints.urls()),
+                "active": ns.active, "idle_s": round(time.time() - ns.last_used, 1),
+            }
+        try:
+            count = self.client.get_collection(name).count()
+        except ValueError:
+            raise UnknownCollection(name)
+        return {"name": name, "loaded": False, "chunks": count}
+
+    def list(self):
+        return [self.info(name) for name in self.names()]
+
+    # loading / unloading
+
+    def _load(self, name):
+        with span("load_collection", collection=name):
+            return self._build(name)
+
+    def _build(self, name):
+        vector_store = Chroma(
+            client=self.client,
+            collection_name=name,
+            embedding_function=self.embedder,
+            collection_metadata=self.collection_metadata,
+        )
+        fingerprints = FingerprintStore(self.persist_dir / f"{name}_fingerprints.json")
+
+        # sparse index next to Chroma for exact tokens (rates, tickers, dates)
+        bm25_index = BM25Index(self.persist_dir / f"{name}_bm25.pkl")
+        if len(bm25_index) == 0 and vector_store._collection.count() > 0:
+            bm25_index.sync_from_store(vector_store)
+
+        answer_cache = SemanticAnswerCache(self.embedder, **self.answer_cache_kwargs)
+        query_engine = self.build_engine(vector_store, bm25_index)
+        return Namespace(name, vector_store, fingerprints, bm25_index, answer_cache, query_engine)
+
+    def _evict(self):
+        # oldest idle namespaces first, busy ones stay even if that means going over max_loaded
+        # (the most recent one is about to be used -> never a candidate)
+        for name in list(self._loaded)[:-1]:
+            if len(self._loaded) <= self.max_loaded:
+                break
+            if self._loaded[name].active == 0:
+                self._unload(name)
+
+    def _unload(self, name):
+        ns = self._loaded.pop(name)
+        ns.query_engine.close()
+        self.counters["unloads"] += 1
+
+    def unload(self, name):
+        with self._lock:
+            ns = self._loaded.get(name)
+            if ns is not None and ns.active == 0:
+                self._unload(name)
+                return True
+        return False
+
+    def _touch(self, name, acquire):
+        # caller holds self._lock
+        ns = self._loaded.get(name)
+        if ns is None:
+            return None
+        self._loaded.move_to_end(name)
+        ns.last_used = time.time()
+        if acquire:
+            ns.active += 1  # before _evict, so it cant be unloaded between get() and the use() block
+        self._evict()
+        return ns
+
+    def get(self, name, create=False, acquire=False):
+        """Loaded Namespace for name, loading it (and unloading idle ones) if needed
+        acquire=True -> ns.active is already incremented, for use()"""
+        with self._lock:
+            ns = self._touch(name, acquire)
+            if ns is not None:
+                return ns
+            name_lock = self._loading.setdefault(name, threading.Lock())
+
+        # only requests for this same collection wait here, the first one loads and the rest find it loaded
+        with name_lock:
+            with self._lock:
+                ns = self._touch(name, acquire)
+                if ns is not None:
+                    return ns
+            try:
+                if create:
+                    self.create(name, exist_ok=True)
+                elif not self.exists(name):
+                    raise UnknownCollection(name)
+                ns = self._load(name)
+                with self._lock:
+                    self._loaded[name] = ns
+                    self.counters["loads"] += 1
+                    return self._touch(name, acquire)
+            finally:
+                with self._lock:
+                    self._loading.pop(name, None)
+
+    @contextmanager
+    def use(self, name, create=False):
+        """with manager.use(name) as ns: ... -> ns cant be unloaded while the block runs"""
+        ns = self.get(name, create=create, acquire=True)
+        try:
+            yield ns
+        finally:
+            with self._lock:
+                ns.active -= 1
+                ns.last_used = time.time()
+                self._evict()
+
+    def stats(self):
+        with self._lock:
+            return {
+                **self.counters,
+                "loaded": list(self._loaded),
+                "max_loaded": self.max_loaded,
+                "answer_cache": {name: ns.answer_cache.stats() for name, ns in self._loaded.items()},
+            }
@@ -0,0 +1,269 @@
+#Shared embedding service (one model per process, dynamic batching, LRU + on disk cache)
+# Drop in replacement for HuggingFaceEmbeddings -> works anywhere langchain wants an Embeddings object
+# (Chroma in the RAG backend, FAISS in the FAQ agent)
+# This file is the only copy: the FAQ agents' embedding_service.py loads it by path, so both projects share the code
+# and the .embedding_cache/ below. Keep it importable on its own (no imports from the RAG backend).
+#
+#   ef = get_embedding_service("sentence-transformers/all-MiniLM-L6-v2")
+#   ef.embed_documents([...]) / ef.embed_query("...") / ef.stats()
+
+import hashlib
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+CACHE_PATH = Path(__file__).parent / ".embedding_cache" / "embeddings.sqlite"
+LRU_SIZE = 50_000          # vectors kept in RAM (MiniLM -> 384 floats each)
+MAX_BATCH_SIZE = 64        # texts merged from concurrent callers into one model call
+MAX_WAIT_MS = 5            # how long the batcher waits for more callers before running the model
+
+_services = {}
+_services_lock = threading.Lock()
+
+
+class _Request:
+    __slots__ = ("texts", "done", "vectors", "error")
+
+    def __init__(self, texts):
+        self.texts = texts
+        self.done = threading.Event()
+        self.vectors = None
+        self.error = None
+
+
+class EmbeddingService(Embeddings):
+    """Batched + cached embeddings, keyed by sha256(model name + text)"""
+
+    def __init__(self, model_name=DEFAULT_MODEL, model_kwargs=None, encode_kwargs=None,
+                 cache_path=CACHE_PATH, lru_size=LRU_SIZE,
+                 max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        self.model_name = model_name
+        self.model_kwargs = model_kwargs or {}
+        self.encode_kwargs = encode_kwargs or {}
+        self.lru_size = lru_size
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+
+        self._model = None
+        self._model_lock = threading.Lock()
+
+        self._lru = OrderedDict()
+        self._lru_lock = threading.Lock()
+
+        # on disk cache -> survives restarts, so re-ingesting the same chunks is free
+        self._db = None
+        self._db_lock = threading.Lock()
+        if cache_path:
+            cache_path = Path(cache_path)
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(cache_path), check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vec BLOB)")
+            self._db.commit()
+
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "memory_hits": 0, "disk_hits": 0, "misses": 0,
+            "batches": 0, "batched_texts": 0, "batched_requests": 0,
+            "max_batch_size": 0, "model_seconds": 0.0,
+        }
+
+    # model
+
+    @property
+    def model(self):
+        """Loading the HF model only once, on first real use"""
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    from langchain_huggingface.embeddings import HuggingFaceEmbeddings
+                    self._model = HuggingFaceEmbeddings(
+                        model_name=self.model_name,
+                        model_kwargs=self.model_kwargs,
+                        encode_kwargs=self.encode_kwargs,
+                    )
+        return self._model
+
+    def warm_up(self):
+        self.model.embed_query("warm up")
+
+    # cache
+
+    def _key(self, text):
+        return hashlib.sha256(f"{self.model_name}\x00{text}".encode("utf-8")).hexdigest()
+
+    def _lru_get(self, key):
+        with self._lru_lock:
+            vec = self._lru.get(key)
+            if vec is not None:
+                self._lru.move_to_end(key)
+            return vec
+
+    def _lru_put(self, key, vec):
+        with self._lru_lock:
+            self._lru[key] = vec
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+
+    def _disk_get_many(self, keys):
+        if self._db is None or not keys:
+            return {}
+        found = {}
+        with self._db_lock:
+            # sqlite caps the number of ? per statement, so going in slices
+            for i in range(0, len(keys), 500):
+                part = keys[i:i + 500]
+                rows = self._db.execute(
+                    f"SELECT key, vec FROM embeddings WHERE key IN ({','.join('?' * len(part))})", part
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+        return found
+
+    def _disk_put_many(self, items):
+        if self._db is None or not items:
+            return
+        rows = [(key, np.asarray(vec, dtype=np.float32).tobytes()) for key, vec in items]
+        with self._db_lock:
+            self._db.executemany("INSERT OR REPLACE INTO embeddings (key, vec) VALUES (?, ?)", rows)
+            self._db.commit()
+
+    # dynamic batcher
+
+    def _ensure_worker(self):
+        if self._worker is None:
+            with self._worker_lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._batch_loop, daemon=True)
+                    self._worker.start()
+
+    def _batch_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            n_texts = len(batch[0].texts)
+            deadline = time.monotonic() + self.max_wait
+
+            # collecting whatever other callers send within the wait window
+            while n_texts < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    req = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(req)
+                n_texts += len(req.texts)
+
+            unique = list(dict.fromkeys(t for req in batch for t in req.texts))
+            try:
+                t0 = time.perf_counter()
+                vectors = self.model.embed_documents(unique)
+                elapsed = time.perf_counter() - t0
+            except Exception as e:
+                for req in batch:
+                    req.error = e
+                    req.done.set()
+                continue
+
+            by_text = dict(zip(unique, vectors))
+            for req in batch:
+                req.vectors = [by_text[t] for t in req.texts]
+                req.done.set()
+
+            with self._stats_lock:
+                self._stats["batches"] += 1
+                self._stats["batched_texts"] += len(unique)
+                self._stats["batched_requests"] += len(batch)
+                self._stats["max_batch_size"] = max(self._stats["max_batch_size"], len(unique))
+                self._stats["model_seconds"] += elapsed
+
+    def _embed_uncached(self, texts):
+        self._ensure_worker()
+        req = _Request(texts)
+        self._queue.put(req)
+        req.done.wait()
+        if req.error is not None:
+            raise req.error
+        return req.vectors
+
+    # langchain Embeddings interface
+
+    def embed_documents(self, texts):
+        texts = list(texts)
+        keys = [self._key(t) for t in texts]
+        out = [None] * len(texts)
+
+        memory_hits = 0
+        pending = {}  # key -> indexes still missing
+        for i, key in enumerate(keys):
+            vec = self._lru_get(key)
+            if vec is not None:
+                out[i] = vec
+                memory_hits += 1
+            else:
+                pending.setdefault(key, []).append(i)
+
+        disk = self._disk_get_many(list(pending))
+        disk_hits = 0
+        for key, vec in disk.items():
+            self._lru_put(key, vec)
+            for i in pending.pop(key):
+                out[i] = vec
+                disk_hits += 1
+
+        misses = sum(len(idx) for idx in pending.values())
+        if pending:
+            miss_keys = list(pending)
+            miss_texts = [texts[pending[k][0]] for k in miss_keys]
+            vectors = self._embed_uncached(miss_texts)
+            for key, vec in zip(miss_keys, vectors):
+                self._lru_put(key, vec)
+                for i in pending[key]:
+                    out[i] = vec
+            self._disk_put_many(list(zip(miss_keys, vectors)))
+
+        with self._stats_lock:
+            self._stats["memory_hits"] += memory_hits
+            self._stats["disk_hits"] += disk_hits
+            self._stats["misses"] += misses
+        return out
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+    # metrics
+
+    def stats(self):
+        with self._stats_lock:
+            s = dict(self._stats)
+        lookups = s["memory_hits"] + s["disk_hits"] + s["misses"]
+        s["lookups"] = lookups
+        s["hit_rate"] = (s["memory_hits"] + s["disk_hits"]) / lookups if lookups else 0.0
+        s["avg_batch_size"] = s["batched_texts"] / s["batches"] if s["batches"] else 0.0
+        s["avg_requests_per_batch"] = s["batched_requests"] / s["batches"] if s["batches"] else 0.0
+        with self._lru_lock:
+            s["lru_entries"] = len(self._lru)
+        return s
+
+
+def get_embedding_service(model_name=DEFAULT_MODEL, **kwargs):
+    """One EmbeddingService per model name per process"""
+    with _services_lock:
+        service = _services.get(model_name)
+        if service is None:
+            service = EmbeddingService(model_name=model_name, **kwargs)
+            _services[model_name] = service
+        return service
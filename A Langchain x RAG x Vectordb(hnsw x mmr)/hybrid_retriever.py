@@ -0,0 +1,73 @@
+#Hybrid retrieval: BM25 (exact tokens) + HNSW (semantic) fused with reciprocal rank fusion, then MMR
+#   dense  = Chroma top fetch_k by cosine (with embeddings)
+#   sparse = BM25 top fetch_k
+#   RRF    = sum over both lists of 1 / (RRF_K + rank)  -> rank based, so no score scaling between the two
+#   MMR    = fused RRF score as relevance, embeddings for redundancy
+
+import numpy as np
+
+from mmr import mmr_select, to_documents
+from telemetry import span
+
+RRF_K = 60  # the usual constant from the RRF paper, dampens the weight of the very top ranks
+
+
+def reciprocal_rank_fusion(*ranked_lists, rrf_k=RRF_K):
+    """ranked id lists -> [(id, fused score)] best first"""
+    scores = {}
+    for ranked in ranked_lists:
+        for rank, chunk_id in enumerate(ranked, start=1):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+def hybrid_search(vector_store, sparse_index, query, k=5, fetch_k=20, lambda_mult=0.5, query_vec=None):
+    """k Documents from the fused candidate pool, lambda_mult=None -> plain fused top k (no MMR)"""
+    if query_vec is None:
+        with span("embed_query"):
+            query_vec = vector_store.embeddings.embed_query(query)
+
+    with span("chroma_query", fetch_k=fetch_k):
+        dense = vector_store._collection.query(
+            query_embeddings=[query_vec],
+            n_results=fetch_k,
+            include=["documents", "metadatas", "embeddings"],
+        )
+    candidates = {
+        chunk_id: (text, meta, emb)
+        for chunk_id, text, meta, emb in zip(
+            dense["ids"][0], dense["documents"][0], dense["metadatas"][0], dense["embeddings"][0]
+        )
+    }
+    with span("bm25", fetch_k=fetch_k):
+        sparse_ids = [chunk_id for chunk_id, _ in sparse_index.search(query, k=fetch_k)]
+
+    fused = reciprocal_rank_fusion(dense["ids"][0], sparse_ids)[:fetch_k]
+    if not fused:
+        return []
+
+    # BM25 only hits -> one Chroma get for their text + embeddings
+    missing = [chunk_id for chunk_id, _ in fused if chunk_id not in candidates]
+    if missing:
+        with span("chroma_get", chunks=len(missing)):
+            extra = vector_store._collection.get(ids=missing, include=["documents", "metadatas", "embeddings"])
+        for chunk_id, text, meta, emb in zip(extra["ids"], extra["documents"], extra["metadatas"], extra["embeddings"]):
+            candidates[chunk_id] = (text, meta, emb)
+        # ids the sparse index knows but Chroma doesnt (shouldnt happen, but dont crash on it)
+        fused = [(chunk_id, score) for chunk_id, score in fused if chunk_id in candidates]
+
+    ids = [chunk_id for chunk_id, _ in fused]
+    texts = [candidates[i][0] for i in ids]
+    metadatas = [candidates[i][1] for i in ids]
+    # scaled to 0..1 so lambda_mult weighs it like a cosine similarity
+    rrf = np.array([score for _, score in fused], dtype=np.float32)
+    relevance = rrf / rrf.max()
+
+    if lambda_mult is None:
+        picked = list(range(min(k, len(ids))))
+        return to_documents(texts, metadatas, picked, relevance[picked].tolist(), [1.0] * len(picked), 1.0)
+
+    embeddings = np.asarray([candidates[i][2] for i in ids], dtype=np.float32)
+    with span("mmr", candidates=len(ids)):
+        picked, rel, div = mmr_select(query_vec, embeddings, k=k, lambda_mult=lambda_mult, relevance=relevance)
+    return to_documents(texts, metadatas, picked, rel, div, lambda_mult)
@@ -0,0 +1,325 @@
+#Incremental URL ingestion (content hashed chunk ids + per URL fingerprints)
+# Shared by rag.py, ragmmr.py and rag_fastapi.py so a re-ingest only pays for pages that changed
+# Pipeline: async HTTP pool (fetch) -> process pool (HTML parsing, CPU bound) -> splitter + embedder
+# pages flow into the splitter as soon as they finish, so a batch takes ~ the time of the slowest page
+
+import asyncio
+import hashlib
+import io
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import aiohttp
+from langchain_core.documents import Document
+
+from telemetry import count, record_stage, span
+
+FETCH_CONCURRENCY = 8
+FETCH_TIMEOUT = 30
+PARSE_WORKERS = min(4, os.cpu_count() or 1)
+
+_parse_pool = None
+_DONE = object()
+
+
+def chunk_id(url, text):
+    """Stable id for a chunk -> same url + same text always gives same id"""
+    return hashlib.sha256(f"{url}\n{text}".encode("utf-8")).hexdigest()
+
+
+def content_digest(docs):
+    """Digest of the whole page text, used to detect pages that did not change"""
+    h = hashlib.sha256()
+    for doc in docs:
+        h.update(doc.page_content.encode("utf-8"))
+    return h.hexdigest()
+
+
+class FingerprintStore:
+    """Small JSON file next to the Chroma store: url -> etag, last_modified, digest, chunk_ids"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.records = {}
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.records = json.load(f)
+
+    def get(self, url):
+        return self.records.get(url)
+
+    def put(self, url, record):
+        self.records[url] = record
+
+    def remove(self, url):
+        return self.records.pop(url, None)
+
+    def urls(self):
+        return list(self.records)
+
+    def clear(self):
+        self.records = {}
+        self.save()
+
+    def save(self):
+        # write to a temp file first so a crash mid write doesnt corrupt the fingerprints
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.records, f, indent=2)
+        os.replace(tmp, self.path)
+
+
+def is_not_modified(record, remote):
+    """True only when the server validators match what we stored last time
+    (for servers that ignore If-None-Match and send a 200 anyway)"""
+    if not record or not remote:
+        return False
+    if remote.get("etag") and remote["etag"] == record.get("etag"):
+        return True
+    if remote.get("last_modified") and remote["last_modified"] == record.get("last_modified"):
+        return True
+    return False
+
+
+def sync_url(vector_store, fingerprints, url, splitter, data, remote, splitter_key=None, sparse_index=None):
+    """Upsert / delete only the chunks of one url that differ, returns (added, deleted)"""
+    record = fingerprints.get(url)
+    digest = content_digest(data)
+
+    # same body AND same chunking settings -> nothing to re-embed
+    if record and record.get("digest") == digest and record.get("splitter") == splitter_key:
+        # page body identical, only refresh the validators
+        record.update({k: v for k, v in remote.items() if v})
+        fingerprints.put(url, record)
+        return 0, 0
+
+    with span("split", url=url):
+        docs = splitter.split_documents(data)
+
+    # duplicated chunks inside one page collapse into one id
+    new_docs = {}
+    for doc in docs:
+        new_docs.setdefault(chunk_id(url, doc.page_content), doc)
+
+    old_ids = set(record["chunk_ids"]) if record else set()
+    to_delete = [i for i in old_ids if i not in new_docs]
+    to_add = [i for i in new_docs if i not in old_ids]
+
+    if to_delete:
+        with span("chroma_delete", chunks=len(to_delete)):
+            vector_store.delete(ids=to_delete)
+    if to_add:
+        texts = [new_docs[i].page_content for i in to_add]
+        # embedding + write done separately (not add_documents) so the two show up as their own stages
+        with span("embed", chunks=len(to_add)):
+            vectors = vector_store.embeddings.embed_documents(texts)
+        with span("chroma_write", chunks=len(to_add)):
+            vector_store._collection.upsert(
+                ids=to_add,
+                embeddings=vectors,
+                documents=texts,
+                metadatas=[new_docs[i].metadata for i in to_add],
+            )
+
+    # BM25 index uses the same chunk ids -> same diff applied there
+    if sparse_index is not None:
+        with span("bm25_update"):
+            sparse_index.remove_many(to_delete)
+            sparse_index.add_many(to_add, [new_docs[i].page_content for i in to_add])
+
+    collection = vector_store._collection.name
+    count("rag_chunks_total", len(to_add), op="added", collection=collection)
+    count("rag_chunks_total", len(to_delete), op="deleted", collection=collection)
+
+    fingerprints.put(url, {
+        "etag": remote.get("etag"),
+        "last_modified": remote.get("last_modified"),
+        "digest": digest,
+        "splitter": splitter_key,
+        "chunk_ids": list(new_docs),
+    })
+    return len(to_add), len(to_delete)
+
+
+def remove_url(vector_store, fingerprints, url, sparse_index=None):
+    """Drop every chunk of a url that is no longer part of the batch"""
+    record = fingerprints.remove(url)
+    if record and record["chunk_ids"]:
+        vector_store.delete(ids=record["chunk_ids"])
+        if sparse_index is not None:
+            sparse_index.remove_many(record["chunk_ids"])
+        return len(record["chunk_ids"])
+    return 0
+
+
+# FETCH + PARSE PIPELINE
+
+def parse_page(body, content_type, url):
+    """Runs inside the process pool -> bytes to plain text (same as UnstructuredURLLoader mode="single")"""
+    if "html" in (content_type or "html"):
+        from unstructured.partition.html import partition_html
+        elements = partition_html(text=body.decode("utf-8", errors="replace"))
+    else:
+        # pdf / docx etc. -> let unstructured sniff it
+        from unstructured.partition.auto import partition
+        elements = partition(file=io.BytesIO(body), content_type=content_type)
+    return "\n\n".join(str(el) for el in elements)
+
+
+def _get_parse_pool():
+    # one pool per process, spinning workers up on every click is slower than parsing itself
+    global _parse_pool
+    if _parse_pool is None:
+        _parse_pool = ProcessPoolExecutor(max_workers=PARSE_WORKERS)
+    return _parse_pool
+
+
+async def _fetch_one(session, url, headers, record, out_q, pool):
+    page = {"url": url, "status": "ok", "text": "", "etag": None, "last_modified": None,
+            "fetch_s": 0.0, "parse_s": 0.0, "error": None}
+
+    # conditional GET -> server answers 304 with no body when the page didnt change
+    req_headers = dict(headers)
+    if record:
+        if record.get("etag"):
+            req_headers["If-None-Match"] = record["etag"]
+        if record.get("last_modified"):
+            req_headers["If-Modified-Since"] = record["last_modified"]
+
+    t0 = time.perf_counter()
+    try:
+        async with session.get(url, headers=req_headers, allow_redirects=True) as resp:
+            page["etag"] = resp.headers.get("ETag")
+            page["last_modified"] = resp.headers.get("Last-Modified")
+            if resp.status == 304:
+                page["status"] = "not_modified"
+            elif resp.status >= 400:
+                page["status"] = "error"
+                page["error"] = f"HTTP {resp.status}"
+            else:
+                body = await resp.read()
+                content_type = resp.headers.get("Content-Type", "text/html")
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        page["status"] = "error"
+        page["error"] = repr(e)
+    page["fetch_s"] = time.perf_counter() - t0
+
+    if page["status"] == "ok" and is_not_modified(record, page):
+        page["status"] = "not_modified"
+
+    if page["status"] == "ok":
+        t1 = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            page["text"] = await loop.run_in_executor(pool, parse_page, body, content_type, url)
+        except Exception as e:
+            page["status"] = "error"
+            page["error"] = f"parse failed: {e!r}"
+        page["parse_s"] = time.perf_counter() - t1
+
+    out_q.put(page)
+
+
+def _run_fetcher(urls, headers, records, out_q, pool, concurrency, timeout):
+    async def main():
+        # one session + bounded connector -> keep-alive connections get reused across urls
+        connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=concurrency)
+        client_timeout = aiohttp.ClientTimeout(total=timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=client_timeout) as session:
+            await asyncio.gather(*(
+                _fetch_one(session, url, headers, records.get(url), out_q, pool) for url in urls
+            ))
+
+    try:
+        asyncio.run(main())
+    finally:
+        out_q.put(_DONE)
+
+
+def iter_pages(urls, headers, records=None, concurrency=FETCH_CONCURRENCY, timeout=FETCH_TIMEOUT):
+    """Yields one page dict per url in completion order (fastest page first)"""
+    out_q = queue.Queue()
+    fetcher = threading.Thread(
+        target=_run_fetcher,
+        args=(urls, headers, records or {}, out_q, _get_parse_pool(), concurrency, timeout),
+        daemon=True,
+    )
+    fetcher.start()
+    while True:
+        page = out_q.get()
+        if page is _DONE:
+            break
+        yield page
+    fetcher.join()
+
+
+def ingest_urls(vector_store, fingerprints, urls, headers, splitter, splitter_key=None, sparse_index=None):
+    """Generator yielding per url status + timings, used by process_urls"""
+    urls = list(dict.fromkeys(urls))
+
+    for url in fingerprints.urls():
+        if url not in urls:
+            deleted = remove_url(vector_store, fingerprints, url, sparse_index)
+            fingerprints.save()
+            yield f"Removed {deleted} chunks of {url}"
+
+    # only send validators when the chunking settings match, otherwise we must re-split anyway
+    records = {}
+    for url in urls:
+        record = fingerprints.get(url)
+        if record and record.get("splitter") == splitter_key:
+            records[url] = record
+
+    yield f"Fetching {len(urls)} urls ({FETCH_CONCURRENCY} connections, {PARSE_WORKERS} parse workers)..."
+    t_batch = time.perf_counter()
+    total_added = total_deleted = 0
+
+    collection = vector_store._collection.name
+    for n, page in enumerate(iter_pages(urls, headers, records), start=1):
+        url = page["url"]
+        prefix = f"[{n}/{len(urls)}] {url}"
+        timings = f"fetch {page['fetch_s']:.2f}s, parse {page['parse_s']:.2f}s"
+        # fetch + parse ran in the async / process pools, their timings come back with the page
+        record_stage("fetch", page["fetch_s"], url=url, status=page["status"])
+        if page["parse_s"]:
+            record_stage("parse", page["parse_s"], url=url)
+        count("rag_pages_total", status=page["status"], collection=collection)
+
+        if page["status"] == "not_modified":
+            yield f"{prefix}: unchanged (not modified), {timings}"
+            continue
+        if page["status"] == "error" or not page["text"].strip():
+            # fetch failed -> keep whatever we had before instead of wiping it
+            yield f"{prefix}: could not load ({page['error'] or 'empty page'}), keeping previous chunks"
+            continue
+
+        data = [Document(page_content=page["text"], metadata={"source": url})]
+        remote = {"etag": page["etag"], "last_modified": page["last_modified"]}
+
+        t0 = time.perf_counter()
+        added, deleted = sync_url(
+            vector_store, fingerprints, url, splitter, data, remote, splitter_key, sparse_index
+        )
+        embed_s = time.perf_counter() - t0
+        # saving after every url so a crash halfway keeps the finished pages
+        fingerprints.save()
+
+        total_added += added
+        total_deleted += deleted
+        if added == 0 and deleted == 0:
+            yield f"{prefix}: unchanged (same content), {timings}"
+        else:
+            yield f"{prefix}: added {added}, deleted {deleted} chunks, {timings}, embed {embed_s:.2f}s"
+
+    if sparse_index is not None:
+        with span("bm25_save"):
+            sparse_index.save()
+
+    yield (f"Done: {len(urls)} urls in {time.perf_counter() - t_batch:.2f}s "
+           f"(added {total_added}, deleted {total_deleted} chunks)")
@@ -1,5 +1,11 @@
+import time
 import streamlit as st
-from rag import process_urls, generate_answer
+from startup import start_warmup
+
+t0 = time.perf_counter()
+
+# rag (langchain, chroma, HF) is imported + warmed up on a background thread, the page renders right away
+warmup = start_warmup("rag")
 
 st.title("⚡ SUSNATA'S Real estate Research Tool")
 
@@ -21,7 +27,9 @@ if process_url_button:
     if len(urls) == 0:
         placeholder.text("You must provide at least one valid url")
     else:
-        for status in process_urls(urls):
+        with st.spinner("Loading models..."):
+            backend = warmup.backend()
+        for status in backend.process_urls(urls):
             placeholder.text(status)
 
 
@@ -29,7 +37,9 @@ if process_url_button:
 query = placeholder.text_input("Question")
 if query:
     try:
-        answer, sources = generate_answer(query)
+        with st.spinner("Loading models..."):
+            backend = warmup.backend()
+        answer, sources = backend.generate_answer(query)
         st.header("Answer:")
         st.write(answer)
 
@@ -41,3 +51,4 @@ if query:
         placeholder.text("You must process urls first")
 
 
+st.sidebar.caption(f"{warmup.status()} | page {time.perf_counter() - t0:.2f}s")
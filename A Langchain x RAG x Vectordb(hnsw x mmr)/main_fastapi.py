@@ -1,15 +1,26 @@
+import time
+
 import streamlit as st
 import requests
 
 # Health Check
 try:
-    health = requests.get("http://127.0.0.1:8001/health")
+    health = requests.get("http://127.0.0.1:8001/health", timeout=5)
     st.sidebar.success(f"Backend: {health.json().get('status')} 🟢")
 except:
     st.sidebar.error("Backend NOT reachable ❌")
 
 st.title("⚡ Susnata's Real Estate Research Tool")
 
+# Collection (one per desk / tenant), created on the backend if it doesnt exist yet
+collection = st.sidebar.text_input("Collection", value="financial_data").strip()
+if st.sidebar.button("Create collection"):
+    created = requests.post("http://127.0.0.1:8001/collections", json={"name": collection}, timeout=10)
+    if created.status_code == 200:
+        st.sidebar.success(f"Created {collection}")
+    else:
+        st.sidebar.warning(created.json().get("detail"))
+
 # PROCESSING URLS
 st.subheader("🌐 Please Add URLs for RAG Ingestion")
 
@@ -23,12 +34,28 @@ if st.button("Process URLs"):
     st.write("⏳ Processing URLs... Please wait...")
 
     response = requests.post(
-        "http://127.0.0.1:8001/process_urls",
+        f"http://127.0.0.1:8001/collections/{collection}/process_urls",
         json={"urls": urls}
     )
+    if response.status_code != 200:
+        st.error(response.json().get("detail"))
+        st.stop()
+    job_id = response.json()["job_id"]
 
+    # Polling the ingestion job until the backend says done / failed
     st.write("###  Status:")
-    st.write(response.json())
+    status_box = st.empty()
+    while True:
+        job = requests.get(f"http://127.0.0.1:8001/jobs/{job_id}").json()
+        status_box.text("\n".join(m["message"] for m in job["messages"]) or job["status"])
+        if job["status"] in ("done", "failed"):
+            break
+        time.sleep(0.5)
+
+    if job["status"] == "failed":
+        st.error(f"Ingestion failed: {job['error']}")
+    else:
+        st.success(f"Ingestion finished in {job['elapsed_s']}s")
 
 
 
@@ -41,7 +68,7 @@ if st.button("Ask"):
         st.warning("Please enter a question!")
     else:
         response = requests.post(
-            "http://127.0.0.1:8001/ask",
+            f"http://127.0.0.1:8001/collections/{collection}/ask",
             json={"question": question}
         )
 
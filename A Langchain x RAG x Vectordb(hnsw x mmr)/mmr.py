@@ -0,0 +1,94 @@
+#Local vectorized MMR re-ranker
+# Chroma returns the fetch_k HNSW hits WITH their embeddings in one query, then MMR runs here in NumPy:
+#   relevance  = cos(query, chunk)            -> one matrix-vector product for all candidates
+#   redundancy = max cos(chunk, already picked) -> updated incrementally, one matvec per pick
+#   score      = lambda * relevance - (1 - lambda) * redundancy
+# Cost is O(k * fetch_k * dim), so fetch_k in the hundreds stays cheap
+# (langchain's helper recomputes similarity against every selected chunk on every step)
+
+import numpy as np
+from langchain_core.documents import Document
+
+from telemetry import span
+
+
+def _normalize(x):
+    x = np.asarray(x, dtype=np.float32)
+    norms = np.linalg.norm(x, axis=-1, keepdims=True)
+    return x / np.maximum(norms, 1e-12)
+
+
+def mmr_select(query_vec, cand_vecs, k=5, lambda_mult=0.5, relevance=None):
+    """Greedy MMR over candidate embeddings
+    Returns (picked indexes, relevance of each pick, diversity of each pick), diversity = 1 - redundancy
+    Picks the same chunks as langchain's maximal_marginal_relevance
+    relevance -> optional precomputed score per candidate (hybrid search passes fused RRF scores)"""
+    cands = _normalize(cand_vecs)
+    n = cands.shape[0]
+    if n == 0 or k <= 0:
+        return [], [], []
+    k = min(k, n)
+
+    if relevance is None:
+        relevance = cands @ _normalize(query_vec)
+    else:
+        relevance = np.asarray(relevance, dtype=np.float32)
+    available = np.ones(n, dtype=bool)
+
+    # first pick is simply the most relevant chunk (nothing to be redundant with yet)
+    best = int(np.argmax(relevance))
+    picked, picked_rel, picked_div = [best], [float(relevance[best])], [1.0]
+    available[best] = False
+    redundancy = cands @ cands[best]  # max sim to anything picked so far
+
+    for _ in range(k - 1):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+
+        picked.append(best)
+        picked_rel.append(float(relevance[best]))
+        picked_div.append(float(1 - redundancy[best]))
+        available[best] = False
+
+        # only the newly picked chunk can raise anyone's redundancy
+        np.maximum(redundancy, cands @ cands[best], out=redundancy)
+
+    return picked, picked_rel, picked_div
+
+
+def mmr_search(vector_store, query, k=5, fetch_k=20, lambda_mult=0.5, query_vec=None):
+    """HNSW top fetch_k (with embeddings) from Chroma -> local MMR -> k Documents
+    Each returned doc carries mmr_relevance / mmr_diversity / mmr_score in its metadata"""
+    if query_vec is None:
+        with span("embed_query"):
+            query_vec = vector_store.embeddings.embed_query(query)
+
+    with span("chroma_query", fetch_k=fetch_k):
+        res = vector_store._collection.query(
+            query_embeddings=[query_vec],
+            n_results=fetch_k,
+            include=["documents", "metadatas", "embeddings"],
+        )
+    texts = res["documents"][0]
+    if not texts:
+        return []
+    metadatas = res["metadatas"][0]
+    embeddings = np.asarray(res["embeddings"][0], dtype=np.float32)
+
+    with span("mmr", candidates=len(texts)):
+        picked, rel, div = mmr_select(query_vec, embeddings, k=k, lambda_mult=lambda_mult)
+    return to_documents(texts, metadatas, picked, rel, div, lambda_mult)
+
+
+def to_documents(texts, metadatas, picked, rel, div, lambda_mult):
+    docs = []
+    for i, r, d in zip(picked, rel, div):
+        metadata = dict(metadatas[i] or {})
+        metadata.update({
+            "mmr_relevance": round(r, 4),
+            "mmr_diversity": round(d, 4),
+            "mmr_score": round(lambda_mult * r - (1 - lambda_mult) * (1 - d), 4),
+        })
+        docs.append(Document(page_content=texts[i], metadata=metadata))
+    return docs
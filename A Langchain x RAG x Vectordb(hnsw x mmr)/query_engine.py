@@ -0,0 +1,115 @@
+#Long lived query engine -> prompts + chains are built ONCE in initialize_components, not on every question
+# answer()       one question, k / fetch_k / lambda_mult can be overridden per request
+# answer_many()  many questions, retrieval runs in parallel, LLM calls go out as one batch
+#
+# Thread safe: nothing on the engine is mutated after __init__, overrides are passed per call
+
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain.chains import RetrievalQAWithSourcesChain
+from langchain.chains.qa_with_sources.loading import load_qa_with_sources_chain
+from langchain_core.callbacks import BaseCallbackHandler
+
+from mmr import mmr_search
+from hybrid_retriever import hybrid_search
+from telemetry import LLMTelemetryCallback, span
+
+MAX_WORKERS = 8
+
+
+class _TokenCallback(BaseCallbackHandler):
+    def __init__(self, on_token):
+        self.on_token = on_token
+
+    def on_llm_new_token(self, token, **kwargs):
+        self.on_token(token)
+
+
+class QueryEngine:
+    """Retrieval + RetrievalQAWithSourcesChain built once, reused by every request"""
+
+    def __init__(self, llm, vector_store, search_type="mmr", k=5, fetch_k=20, lambda_mult=0.5,
+                 max_workers=MAX_WORKERS, sparse_index=None):
+        self.llm = llm
+        self.vector_store = vector_store
+        self.sparse_index = sparse_index  # BM25Index -> hybrid BM25 + HNSW retrieval
+        self.search_type = search_type
+        self.defaults = {"k": k, "fetch_k": fetch_k, "lambda_mult": lambda_mult}
+
+        # same chain generate_answer used to build per query (map-reduce over the retrieved chunks)
+        self.chain = RetrievalQAWithSourcesChain.from_llm(
+            llm=llm,
+            retriever=vector_store.as_retriever(search_type=search_type, search_kwargs=self._search_kwargs())
+        )
+        # one "stuff" LLM call -> every streamed token is final answer text
+        self.stream_chain = load_qa_with_sources_chain(llm, chain_type="stuff")
+
+        self.max_workers = max_workers
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="query-engine")
+
+    def _search_kwargs(self, k=None, fetch_k=None, lambda_mult=None):
+        kw = dict(self.defaults)
+        if k is not None:
+            kw["k"] = k
+        if fetch_k is not None:
+            kw["fetch_k"] = fetch_k
+        if lambda_mult is not None:
+            kw["lambda_mult"] = lambda_mult
+        if self.search_type != "mmr":
+            kw = {"k": kw["k"]}
+        return kw
+
+    def retrieve(self, query, k=None, fetch_k=None, lambda_mult=None):
+        with span("retrieve", search_type=self.search_type):
+            return self._retrieve(query, k, fetch_k, lambda_mult)
+
+    def _retrieve(self, query, k=None, fetch_k=None, lambda_mult=None):
+        kw = self._search_kwargs(k, fetch_k, lambda_mult)
+        if self.sparse_index is not None and len(self.sparse_index):
+            # BM25 + HNSW fused with RRF, then MMR (similarity mode -> fused top k only)
+            if self.search_type != "mmr":
+                kw = {"k": kw["k"], "fetch_k": self.defaults["fetch_k"], "lambda_mult": None}
+            return hybrid_search(self.vector_store, self.sparse_index, query, **kw)
+        if self.search_type == "mmr":
+            # local NumPy MMR over the HNSW hits, docs come back with mmr_relevance / mmr_diversity
+            return mmr_search(self.vector_store, query, **kw)
+        return self.vector_store.similarity_search(query, **kw)
+
+    def _combine(self, query, docs):
+        # what RetrievalQAWithSourcesChain._call does after the retriever call
+        docs = self.chain._reduce_tokens_below_limit(docs)
+        with span("llm_chain", chunks=len(docs)):
+            output = self.chain.combine_documents_chain.invoke(
+                {"input_documents": docs, "question": query},
+                config={"callbacks": [LLMTelemetryCallback()]}
+            )
+        return self.chain._split_sources(output["output_text"])
+
+    def close(self):
+        # collection unloaded -> let the retrieval threads go, running calls still finish
+        self.pool.shutdown(wait=False)
+
+    def answer(self, query, k=None, fetch_k=None, lambda_mult=None):
+        """Returns (answer, sources)"""
+        docs = self.retrieve(query, k, fetch_k, lambda_mult)
+        return self._combine(query, docs)
+
+    def answer_many(self, queries, k=None, fetch_k=None, lambda_mult=None):
+        """Parallel retrieval for all queries, then one batched call through the combine chain"""
+        docs_per_query = list(self.pool.map(lambda q: self.retrieve(q, k, fetch_k, lambda_mult), queries))
+        outputs = self.chain.combine_documents_chain.batch(
+            [{"input_documents": self.chain._reduce_tokens_below_limit(docs), "question": q}
+             for q, docs in zip(queries, docs_per_query)],
+            config={"max_concurrency": self.max_workers, "callbacks": [LLMTelemetryCallback()]}
+        )
+        return [self.chain._split_sources(out["output_text"]) for out in outputs]
+
+    def answer_streaming(self, query, on_token, k=None, fetch_k=None, lambda_mult=None):
+        """on_token(str) is called for every LLM token, returns (answer, sources) at the end"""
+        docs = self.retrieve(query, k, fetch_k, lambda_mult)
+        with span("llm_chain", chunks=len(docs)):
+            output = self.stream_chain.invoke(
+                {"input_documents": docs, "question": query},
+                config={"callbacks": [_TokenCallback(on_token), LLMTelemetryCallback()]}
+            )
+        return self.chain._split_sources(output["output_text"])
@@ -3,130 +3,386 @@
 #  uvicorn rag_fastapi:app --reload --port 8001
 # Swagger: http://127.0.0.1:8001/docs
 
+import asyncio
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from uuid import uuid4
 from dotenv import load_dotenv
 from pathlib import Path
-from fastapi import FastAPI, BackgroundTasks
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 
-from langchain.chains import RetrievalQAWithSourcesChain
-from langchain_community.document_loaders import UnstructuredURLLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_chroma import Chroma
 from langchain_groq import ChatGroq
-from langchain_huggingface.embeddings import HuggingFaceEmbeddings
+from ingestion import ingest_urls
+from chunkers import make_splitter
+from embedding_service import get_embedding_service
+from query_engine import QueryEngine
+from telemetry import count, render_prometheus, span
+from collection_manager import CollectionExists, CollectionManager, UnknownCollection
 
 # Load environment variables
 load_dotenv()
 
+# span timings (trace=... span=ingest/embed ms=...) go to the log, same numbers are on /metrics
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+
 #  CONFIG
+# chunking: "chars" (sizes in characters), "tokens" / "sentences" (sizes in MiniLM tokens, max 254)
+# bench_chunking.py compares them, changing any of these re-splits every page on the next ingestion
+CHUNK_STRATEGY = "chars"
 CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200  # the splitter's old implicit default
 EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
 VECTORSTORE_DIR = Path(__file__).parent / "resources/vectorstore"
-COLLECTION_NAME = "financial_data"
+COLLECTION_NAME = "financial_data"  # default collection, process_urls / generate_answer take any other name
+MAX_LOADED_COLLECTIONS = 4  # idle collections past this get unloaded (least recently used first)
+CHROMA_MEMORY_LIMIT_BYTES = 2 * 1024 ** 3  # chroma also drops HNSW segments from RAM (LRU) past this
+# HNSW index settings (Chroma defaults), only applied when the collection is created -> reset to change them
+# bench_hnsw.py measures recall / latency / size for a grid of these
+HNSW_M = 16  # graph links per node, more = better recall + bigger index
+HNSW_EF_CONSTRUCTION = 100  # candidate list while building, more = better graph + slower build
+HNSW_EF_SEARCH = 10  # candidate list while querying, more = better recall + slower queries
+ANSWER_CACHE_THRESHOLD = 0.95  # cosine sim between two questions to reuse the answer
+ANSWER_CACHE_TTL_S = 3600
+ANSWER_CACHE_SIZE = 256
+QUERY_WORKERS = 8
+INGEST_WORKERS = 2  # different collections ingest in parallel, the same collection one job at a time
+MAX_JOBS = 100  # finished ingestion jobs kept around for /jobs/{id}
 
 llm = None
-vector_store = None
+collections = None  # CollectionManager -> Chroma store + fingerprints + BM25 + answer cache + engine per collection
+
+# blocking retrieval + LLM calls run here, never on the event loop
+query_pool = ThreadPoolExecutor(max_workers=QUERY_WORKERS, thread_name_prefix="rag-query")
+# each collection has its own ingest lock -> no two jobs write the same collection at once
+ingest_pool = ThreadPoolExecutor(max_workers=INGEST_WORKERS, thread_name_prefix="rag-ingest")
+
+jobs = {}
+jobs_lock = threading.Lock()
 
 app = FastAPI()
 
 
 # INITIALIZATION
-def initialize_components():
-    global llm, vector_store
+def initialize_components(hnsw_m=HNSW_M, hnsw_ef_construction=HNSW_EF_CONSTRUCTION, hnsw_ef_search=HNSW_EF_SEARCH):
+    """Initializing LLM and the collection manager once, collections themselves load lazily"""
+    global llm, collections
 
     if llm is None:
         llm = ChatGroq(
             model="llama-3.3-70b-versatile",
             temperature=0.9,
-            max_tokens=500
+            max_tokens=500,
+            streaming=True  # needed for /ask/stream, invoke() still returns the full message
         )
 
-    if vector_store is None:
-        ef = HuggingFaceEmbeddings(
-            model_name=EMBEDDING_MODEL,
+    if collections is None:
+        # shared batched + cached embedder, same model is loaded once per process
+        ef = get_embedding_service(
+            EMBEDDING_MODEL,
             model_kwargs={"trust_remote_code": True}
         )
 
-        vector_store = Chroma(
-            collection_name=COLLECTION_NAME,
-            embedding_function=ef,
-            persist_directory=str(VECTORSTORE_DIR),
-            collection_metadata={"hnsw:space": "cosine"}
+        collections = CollectionManager(
+            VECTORSTORE_DIR, ef,
+            # chain + prompts built once per collection, generate_answer just calls it
+            build_engine=lambda store, bm25: QueryEngine(
+                llm, store,
+                search_type="mmr",
+                k=5,  # final chunks given to LLM
+                fetch_k=20,  # chunks MMR considers before reranking
+                lambda_mult=0.5,  # 1 = pure relevance, 0 = max diversity
+                sparse_index=bm25  # hybrid BM25 + HNSW candidates
+            ),
+            hnsw_metadata={
+                "hnsw:M": hnsw_m,
+                "hnsw:construction_ef": hnsw_ef_construction,
+                "hnsw:search_ef": hnsw_ef_search,
+            },
+            answer_cache_kwargs={
+                "threshold": ANSWER_CACHE_THRESHOLD,
+                "ttl_s": ANSWER_CACHE_TTL_S,
+                "max_entries": ANSWER_CACHE_SIZE,
+            },
+            max_loaded=MAX_LOADED_COLLECTIONS,
+            memory_limit_bytes=CHROMA_MEMORY_LIMIT_BYTES
         )
+        # default collection always exists, like the single store it replaces
+        collections.create(COLLECTION_NAME, exist_ok=True)
 
 
 # URL INGESTION
-def process_urls(urls):
+def process_urls(urls, incremental=True, collection=COLLECTION_NAME):
     yield "Initializing components..."
-    initialize_components()
-
-    vector_store.reset_collection()
+    with span("init_components"):
+        initialize_components()
 
-    yield "Loading URLs..."
     headers = {"User-Agent": "Mozilla/5.0"}
 
-    loader = UnstructuredURLLoader(urls=urls, headers=headers)
-    data = loader.load()
+    splitter, splitter_key = make_splitter(CHUNK_STRATEGY, CHUNK_SIZE, CHUNK_OVERLAP)
+
+    with collections.use(collection, create=True) as ns, ns.ingest_lock, \
+            span("ingest", collection=collection, urls=len(urls), incremental=incremental):
+        if not incremental:
+            # full rebuild -> wipe only this collection + its fingerprints, other collections are untouched
+            ns.vector_store.reset_collection()
+            ns.fingerprints.clear()
+            ns.bm25_index.clear()
+
+        # answers cached before this ingestion may be wrong now
+        ns.answer_cache.invalidate()
+        yield from ingest_urls(
+            ns.vector_store, ns.fingerprints, urls, headers, splitter,
+            splitter_key=splitter_key,
+            sparse_index=ns.bm25_index
+        )
+        ns.answer_cache.invalidate()
 
-    yield "Splitting text into chunks..."
-    splitter = RecursiveCharacterTextSplitter(
-        separators=["\n\n", "\n", ".", " "],
-        chunk_size=CHUNK_SIZE,
-    )
-    docs = splitter.split_documents(data)
 
-    yield f"Adding {len(docs)} chunks to vector DB..."
-    uuids = [str(uuid4()) for _ in range(len(docs))]
-    vector_store.add_documents(docs, ids=uuids)
+#  QUERY FUNCTION
+def generate_answer(query, k=None, fetch_k=None, lambda_mult=None, collection=COLLECTION_NAME):
+    initialize_components()
+    count("rag_questions_total", collection=collection)
+    with span("answer", collection=collection), collections.use(collection) as ns:
+        if ns.count() == 0:
+            raise RuntimeError(f"Collection {collection!r} is empty")
 
+        # custom MMR settings -> different chunks, so the cached answer doesnt apply
+        if k is not None or fetch_k is not None or lambda_mult is not None:
+            return ns.query_engine.answer(query, k=k, fetch_k=fetch_k, lambda_mult=lambda_mult)
 
-#  QUERY FUNCTION
-def generate_answer(query):
-    if vector_store is None:
-        raise RuntimeError("Vector store not initialized")
+        # repeated / near identical questions come straight from the semantic cache, no chain + LLM call
+        return ns.answer_cache.get_or_compute(query, lambda: ns.query_engine.answer(query))
 
-    retriever = vector_store.as_retriever(
-        search_type="mmr",
-        search_kwargs={"k": 5, "fetch_k": 20, "lambda_mult": 0.5}
-    )
 
-    chain = RetrievalQAWithSourcesChain.from_llm(
-        llm=llm,
-        retriever=retriever
-    )
 
-    result = chain.invoke({"question": query}, return_only_outputs=True)
-    return result.get("answer", ""), result.get("sources", "")
+def generate_answer_streaming(query, on_token, k=None, fetch_k=None, lambda_mult=None, collection=COLLECTION_NAME):
+    """Same retrieval as generate_answer but one "stuff" LLM call, so every streamed token is final answer text
+    (from_llm uses map-reduce -> the per chunk map calls would stream too)"""
+    initialize_components()
+    count("rag_questions_total", collection=collection)
+    with span("answer", collection=collection), collections.use(collection) as ns:
+        if ns.count() == 0:
+            raise RuntimeError(f"Collection {collection!r} is empty")
+
+        return ns.query_engine.answer_streaming(query, on_token, k=k, fetch_k=fetch_k, lambda_mult=lambda_mult)
+
+
+#  JOB TRACKING
+def _new_job(urls, collection=COLLECTION_NAME):
+    job_id = str(uuid4())
+    job = {
+        "id": job_id,
+        "status": "queued",
+        "collection": collection,
+        "urls": urls,
+        "messages": [],
+        "created_at": time.time(),
+        "started_at": None,
+        "finished_at": None,
+        "error": None,
+    }
+    with jobs_lock:
+        jobs[job_id] = job
+        # dropping the oldest finished jobs so the dict cant grow forever
+        finished = [j for j in jobs.values() if j["status"] in ("done", "failed")]
+        for old in sorted(finished, key=lambda j: j["created_at"])[:max(0, len(jobs) - MAX_JOBS)]:
+            jobs.pop(old["id"], None)
+    return job
+
+
+def _run_ingestion(job, incremental=True):
+    job["status"] = "running"
+    job["started_at"] = time.time()
+    try:
+        # every status string from the generator becomes visible on /jobs/{id}
+        for message in process_urls(job["urls"], incremental=incremental, collection=job["collection"]):
+            job["messages"].append({"t": round(time.time() - job["started_at"], 3), "message": message})
+        job["status"] = "done"
+    except Exception as e:
+        job["status"] = "failed"
+        job["error"] = repr(e)
+    finally:
+        job["finished_at"] = time.time()
+
+
+# _manager() / _require_collection() can load the embedding model on first call and always hit chroma's sqlite
+# -> only from plain def routes (fastapi runs those in its threadpool) or through run_in_executor
+def _manager():
+    initialize_components()
+    return collections
+
+
+def _require_collection(name):
+    if not _manager().exists(name):
+        raise HTTPException(status_code=404, detail=f"Unknown collection {name}")
 
 
 #  REQUEST MODELS
 class URLRequest(BaseModel):
     urls: list[str]
+    incremental: bool = True  # False -> wipe + rebuild this collection only
 
 
 class QueryRequest(BaseModel):
     question: str
+    # optional per request MMR settings, defaults are k=5, fetch_k=20, lambda_mult=0.5
+    k: int | None = None
+    fetch_k: int | None = None
+    lambda_mult: float | None = None
+
+
+class CollectionRequest(BaseModel):
+    name: str
 
 
-# API ROUTES
+#  ROUTE HELPERS (shared by the default collection routes and /collections/{name}/...)
+def _submit_ingestion(request, collection):
+    job = _new_job(request.urls, collection)
+    ingest_pool.submit(_run_ingestion, job, request.incremental)
+    return {"status": job["status"], "job_id": job["id"], "collection": collection}
+
+
+async def _ask(request, collection):
+    loop = asyncio.get_running_loop()
+    try:
+        answer, sources = await loop.run_in_executor(
+            query_pool, generate_answer,
+            request.question, request.k, request.fetch_k, request.lambda_mult, collection
+        )
+    except UnknownCollection:
+        raise HTTPException(status_code=404, detail=f"Unknown collection {collection}")
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=f"{e}. Process URLs first.")
+    return {"answer": answer, "sources": sources, "collection": collection}
+
+
+def _ask_stream(request, collection):
+    """Server sent events: `token` events while the LLM writes, then one `done` (answer + sources) or `error`"""
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+
+    def emit(kind, data):
+        # called from the worker thread -> hand over to the event loop thread safely
+        loop.call_soon_threadsafe(events.put_nowait, (kind, data))
+
+    def run():
+        try:
+            answer, sources = generate_answer_streaming(
+                request.question, lambda tok: emit("token", tok),
+                k=request.k, fetch_k=request.fetch_k, lambda_mult=request.lambda_mult, collection=collection
+            )
+            emit("done", {"answer": answer, "sources": sources})
+        except UnknownCollection:
+            emit("error", f"Unknown collection {collection}")
+        except Exception as e:
+            emit("error", str(e))
+
+    loop.run_in_executor(query_pool, run)
+
+    async def event_stream():
+        while True:
+            kind, data = await events.get()
+            yield f"event: {kind}\ndata: {json.dumps(data)}\n\n"
+            if kind in ("done", "error"):
+                break
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+# API ROUTES (default collection)
 @app.post("/process_urls")
-async def process_urls_api(request: URLRequest, background_tasks: BackgroundTasks):
-    background_tasks.add_task(_run_ingestion, request.urls)
-    return {"status": "processing"}
+async def process_urls_api(request: URLRequest):
+    return _submit_ingestion(request, COLLECTION_NAME)
 
 
-def _run_ingestion(urls):
-    for _ in process_urls(urls):
-        pass
+@app.get("/jobs/{job_id}")
+async def job_status_api(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+    return {
+        **job,
+        "latest": job["messages"][-1]["message"] if job["messages"] else None,
+        "elapsed_s": round((job["finished_at"] or time.time()) - (job["started_at"] or time.time()), 3),
+    }
 
 
 @app.post("/ask")
 async def ask_api(request: QueryRequest):
-    answer, sources = generate_answer(request.question)
-    return {"answer": answer, "sources": sources}
+    return await _ask(request, COLLECTION_NAME)
 
 
-@app.get("/")
+@app.post("/ask/stream")
+async def ask_stream_api(request: QueryRequest):
+    return _ask_stream(request, COLLECTION_NAME)
+
+
+# API ROUTES (named collections, one per tenant / desk)
+@app.post("/collections")
+def create_collection_api(request: CollectionRequest):
+    try:
+        return _manager().create(request.name)
+    except CollectionExists as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/collections")
+def list_collections_api():
+    manager = _manager()
+    return {"collections": manager.list(), "memory": manager.stats()}
+
+
+@app.get("/collections/{name}")
+def collection_info_api(name: str):
+    try:
+        return _manager().info(name)
+    except UnknownCollection:
+        raise HTTPException(status_code=404, detail=f"Unknown collection {name}")
+
+
+@app.post("/collections/{name}/process_urls")
+def collection_process_urls_api(name: str, request: URLRequest):
+    _require_collection(name)
+    return _submit_ingestion(request, name)
+
+
+@app.post("/collections/{name}/ask")
+async def collection_ask_api(name: str, request: QueryRequest):
+    return await _ask(request, name)
+
+
+@app.post("/collections/{name}/ask/stream")
+async def collection_ask_stream_api(name: str, request: QueryRequest):
+    # async because _ask_stream needs the running loop, the chroma lookup goes to a thread
+    await asyncio.get_running_loop().run_in_executor(None, _require_collection, name)
+    return _ask_stream(request, name)
+
+
+@app.get("/health")
 async def health():
-    return {"status": "ok"}
\ No newline at end of file
+    with jobs_lock:
+        running = sum(1 for j in jobs.values() if j["status"] in ("queued", "running"))
+    return {
+        "status": "ok",
+        "collections_ready": collections is not None,
+        "ingestion_jobs_running": running,
+        "collections": collections.stats() if collections else None,
+    }
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text format: per stage duration histograms, chunk / page / token / question counters"""
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/")
+async def root():
+    return {"status": "ok"}
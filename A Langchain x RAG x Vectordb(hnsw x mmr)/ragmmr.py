@@ -1,33 +1,48 @@
 #RAG Backend (with MMR + HNSW)
 
 
-from uuid import uuid4
 from dotenv import load_dotenv
 from pathlib import Path
-from langchain.chains import RetrievalQAWithSourcesChain
-from langchain_community.document_loaders import UnstructuredURLLoader
 # from langchain_community.document_loaders import PlaywrightURLLoader   # fallback if my  headers fail to spoof
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_chroma import Chroma
 from langchain_groq import ChatGroq
-from langchain_huggingface.embeddings import HuggingFaceEmbeddings
+from ingestion import ingest_urls
+from chunkers import make_splitter
+from embedding_service import get_embedding_service
+from query_engine import QueryEngine
+from telemetry import count, span
+from collection_manager import CollectionManager
 
 
 # Load environment variables
 load_dotenv()
 
 # Constants
+# chunking: "chars" (sizes in characters), "tokens" / "sentences" (sizes in MiniLM tokens, max 254)
+# bench_chunking.py compares them, changing any of these re-splits every page on the next ingestion
+CHUNK_STRATEGY = "chars"
 CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200  # the splitter's old implicit default
 EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
 VECTORSTORE_DIR = Path(__file__).parent / "resources/vectorstore"
-COLLECTION_NAME = "financial_data"
+COLLECTION_NAME = "financial_data"  # default collection, process_urls / generate_answer take any other name
+MAX_LOADED_COLLECTIONS = 4  # idle collections past this get unloaded (least recently used first)
+CHROMA_MEMORY_LIMIT_BYTES = 2 * 1024 ** 3  # chroma also drops HNSW segments from RAM (LRU) past this
+# HNSW index settings (Chroma defaults), only applied when the collection is created -> reset to change them
+# bench_hnsw.py measures recall / latency / size for a grid of these
+HNSW_M = 16  # graph links per node, more = better recall + bigger index
+HNSW_EF_CONSTRUCTION = 100  # candidate list while building, more = better graph + slower build
+HNSW_EF_SEARCH = 10  # candidate list while querying, more = better recall + slower queries
+ANSWER_CACHE_THRESHOLD = 0.95  # cosine sim between two questions to reuse the answer
+ANSWER_CACHE_TTL_S = 3600
+ANSWER_CACHE_SIZE = 256
 
 # Global vars
 llm = None
-vector_store = None
+collections = None  # CollectionManager -> Chroma store + fingerprints + BM25 + answer cache + engine per collection
 
-def initialize_components():
-    global llm, vector_store
+def initialize_components(hnsw_m=HNSW_M, hnsw_ef_construction=HNSW_EF_CONSTRUCTION, hnsw_ef_search=HNSW_EF_SEARCH):
+    """Initializing LLM and the collection manager once, collections themselves load lazily"""
+    global llm, collections
 
     if llm is None:
         llm = ChatGroq(
@@ -36,30 +51,49 @@ def initialize_components():
             max_tokens=500
         )
 
-    if vector_store is None:
-        ef = HuggingFaceEmbeddings(
-            model_name=EMBEDDING_MODEL,
+    if collections is None:
+        # shared batched + cached embedder, same model is loaded once per process
+        ef = get_embedding_service(
+            EMBEDDING_MODEL,
             model_kwargs={"trust_remote_code": True}
         )
 
-        vector_store = Chroma(
-            collection_name=COLLECTION_NAME,
-            embedding_function=ef,
-            persist_directory=str(VECTORSTORE_DIR),
-            collection_metadata={"hnsw:space": "cosine"}
+        collections = CollectionManager(
+            VECTORSTORE_DIR, ef,
+            # chain + prompts built once per collection, generate_answer just calls it
+            build_engine=lambda store, bm25: QueryEngine(
+                llm, store,
+                search_type="mmr",
+                k=5,  # final chunks given to LLM
+                fetch_k=20,  # chunks MMR considers before reranking
+                lambda_mult=0.5,  # balance between relevance & diversity where 1 is rigid relevance best for accuracy no penalty
+                # if repeated chunks
+                # and 0 is diversity best for broder summary Can select less relevant documents if they add new information
+                sparse_index=bm25  # hybrid BM25 + HNSW candidates
+            ),
+            hnsw_metadata={
+                "hnsw:M": hnsw_m,
+                "hnsw:construction_ef": hnsw_ef_construction,
+                "hnsw:search_ef": hnsw_ef_search,
+            },
+            answer_cache_kwargs={
+                "threshold": ANSWER_CACHE_THRESHOLD,
+                "ttl_s": ANSWER_CACHE_TTL_S,
+                "max_entries": ANSWER_CACHE_SIZE,
+            },
+            max_loaded=MAX_LOADED_COLLECTIONS,
+            memory_limit_bytes=CHROMA_MEMORY_LIMIT_BYTES
         )
-
+        # default collection always exists, like the single store it replaces
+        collections.create(COLLECTION_NAME, exist_ok=True)
 
 
 # Process URLs  (GLOBAL FUNCTION)
 
-def process_urls(urls):
+def process_urls(urls, incremental=True, collection=COLLECTION_NAME):
     yield ("Initializing components...")
-    initialize_components()
-
-    vector_store.reset_collection()
-
-    yield ("Loading data...")
+    with span("init_components"):
+        initialize_components()
 
     headers = {
         "User-Agent": (
@@ -69,44 +103,35 @@ def process_urls(urls):
         )
     }
 
-    loader = UnstructuredURLLoader(urls=urls, headers=headers)
-    data = loader.load()
-
-    yield ("Splitting text...")
-    splitter = RecursiveCharacterTextSplitter(
-        separators=["\n\n", "\n", ".", " "],
-        chunk_size=CHUNK_SIZE,
-    )
-    docs = splitter.split_documents(data)
-
-    yield (f"Adding {len(docs)} chunks...")
-    uuids = [str(uuid4()) for _ in range(len(docs))]
-    vector_store.add_documents(docs, ids=uuids)
+    splitter, splitter_key = make_splitter(CHUNK_STRATEGY, CHUNK_SIZE, CHUNK_OVERLAP)
+
+    with collections.use(collection, create=True) as ns, ns.ingest_lock, \
+            span("ingest", collection=collection, urls=len(urls), incremental=incremental):
+        if not incremental:
+            # full rebuild -> wipe only this collection + its fingerprints, other collections are untouched
+            ns.vector_store.reset_collection()
+            ns.fingerprints.clear()
+            ns.bm25_index.clear()
+
+        # answers cached before this ingestion may be wrong now
+        ns.answer_cache.invalidate()
+        yield from ingest_urls(
+            ns.vector_store, ns.fingerprints, urls, headers, splitter,
+            splitter_key=splitter_key,
+            sparse_index=ns.bm25_index
+        )
+        ns.answer_cache.invalidate()
 
 
 
 # Generate Answer  (GLOBAL FUNCTION)
 
-def generate_answer(query):
-    if vector_store is None:
-        raise RuntimeError("Vector database is not initialized")
-
-    retriever = vector_store.as_retriever(
-        search_type="mmr",
-        search_kwargs={
-            "k": 5,  # final chunks given to LLM
-            "fetch_k": 20, # chunks MMR considers before reranking
-            "lambda_mult": 0.5 # balance between relevance & diversity where 1 is rigid relevance best for accuracy no penalty
-            # if repeated chunks
-            # and 0 is diversity best for broder summary Can select less relevant documents if they add new information
-        }
-    )
-
-    chain = RetrievalQAWithSourcesChain.from_llm(
-        llm=llm,
-        retriever=retriever
-    )
-
-    result = chain.invoke({"question": query}, return_only_outputs=True)
-
-    return result.get("answer", ""), result.get("sources", "")
\ No newline at end of file
+def generate_answer(query, collection=COLLECTION_NAME):
+    initialize_components()
+    count("rag_questions_total", collection=collection)
+    with span("answer", collection=collection), collections.use(collection) as ns:
+        if ns.count() == 0:
+            raise RuntimeError(f"Collection {collection!r} is empty")  ##raising exception if no urls given
+
+        # repeated / near identical questions come straight from the semantic cache, no chain + LLM call
+        return ns.answer_cache.get_or_compute(query, lambda: ns.query_engine.answer(query))
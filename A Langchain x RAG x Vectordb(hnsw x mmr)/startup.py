@@ -0,0 +1,84 @@
+#Fast cold start for the Streamlit apps (main.py, main_mmr_hnsw.py)
+# importing rag / ragmmr pulls in langchain, chroma and the HF stack before Streamlit can draw anything,
+# and the embedding model used to load only on the first "Process URLs" click.
+# start_warmup("rag") returns at once, a daemon thread then does the slow parts in order:
+#   import     the backend module (langchain, chroma, ...)
+#   init       initialize_components() -> LLM + collection manager (chroma client)
+#   embedder   loads the sentence-transformers model with one dummy embed
+#   chroma     opens the default collection (vector store, BM25 index, query engine)
+# The page renders right away, backend() waits for whatever is left when the user actually needs it.
+
+import importlib
+import logging
+import threading
+import time
+
+logger = logging.getLogger("rag.startup")
+
+_warmups = {}  # module name -> Warmup, Streamlit reruns the script but this module stays imported
+_lock = threading.Lock()
+
+
+class Warmup:
+    def __init__(self, module_name):
+        self.module_name = module_name
+        self.timings = {}  # step -> seconds, in the order they ran
+        self.error = None
+        self.module = None
+        self._done = threading.Event()
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name=f"warmup-{module_name}", daemon=True)
+        self._thread.start()
+
+    def _step(self, name, fn):
+        t0 = time.perf_counter()
+        result = fn()
+        self.timings[name] = time.perf_counter() - t0
+        logger.info("warm-up %s %s: %.2f s", self.module_name, name, self.timings[name])
+        return result
+
+    def _run(self):
+        try:
+            backend = self._step("import", lambda: importlib.import_module(self.module_name))
+            self._step("init", backend.initialize_components)
+            self._step("embedder", backend.collections.embedder.warm_up)
+            self._step("chroma", lambda: backend.collections.get(backend.COLLECTION_NAME))
+            self.module = backend
+        except Exception as e:
+            # e.g. no GROQ_API_KEY -> the page still renders, the error shows up on first use
+            self.error = e
+            logger.exception("warm-up of %s failed", self.module_name)
+        finally:
+            self.timings["total"] = time.perf_counter() - self._started
+            self._done.set()
+
+    @property
+    def ready(self):
+        return self._done.is_set()
+
+    def backend(self, timeout=None):
+        """The imported + initialised backend module, blocks until warm-up is over"""
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"{self.module_name} still warming up")
+        if self.error is not None:
+            raise self.error
+        return self.module
+
+    def status(self):
+        steps = ", ".join(f"{k} {v:.1f}s" for k, v in self.timings.items())
+        if not self.ready:
+            return f"Warming up ({steps or 'import'}...)"
+        if self.error is not None:
+            return f"Warm-up failed: {self.error}"
+        return f"Ready ({steps})"
+
+
+def start_warmup(module_name):
+    """Warmup for module_name, started once per process, and again on the next call if the last one failed"""
+    with _lock:
+        warmup = _warmups.get(module_name)
+        # a failed warm-up (missing GROQ_API_KEY, network blip) isnt kept for the life of the process,
+        # the next Streamlit rerun retries it, so fixing the cause doesnt need a restart
+        if warmup is None or (warmup.ready and warmup.error is not None):
+            warmup = _warmups[module_name] = Warmup(module_name)
+        return warmup
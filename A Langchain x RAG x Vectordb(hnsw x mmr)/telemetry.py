@@ -0,0 +1,166 @@
+#Lightweight tracing + metrics for ingestion and answering, no extra dependency
+#   with span("retrieve", collection="desk-a"):   -> duration into rag_stage_seconds{stage="retrieve"} + one log line
+#   count("rag_chunks_total", 12, op="added")      -> counter
+#   render_prometheus()                            -> everything in Prometheus text format (rag_fastapi /metrics)
+#
+# Spans opened inside another span share its trace id, so the log lines of one question / one ingestion
+# can be grepped together:  trace=3f2a9c1e span=answer/retrieve/mmr ms=0.41 collection=desk-a
+
+import contextvars
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+logger = logging.getLogger("rag.telemetry")
+
+# seconds, covers a 1 ms MMR up to a slow 30 s ingestion page
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_current = contextvars.ContextVar("rag_span", default=None)  # (trace id, span path)
+_lock = threading.Lock()
+_counters = {}    # (name, labels) -> value
+_histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+_help = {
+    "rag_stage_seconds": "Duration of each ingestion / answering stage",
+    "rag_chunks_total": "Chunks added to / deleted from the vector store",
+    "rag_pages_total": "Pages seen by ingestion, by outcome",
+    "rag_llm_calls_total": "LLM calls",
+    "rag_llm_tokens_total": "LLM tokens, prompt and completion",
+    "rag_questions_total": "Questions answered, by collection",
+    "rag_answer_cache_total": "Semantic answer cache lookups, hit or miss",
+}
+
+
+def _key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def count(name, value=1, **labels):
+    with _lock:
+        key = (name, _key(labels))
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name, seconds, **labels):
+    with _lock:
+        key = (name, _key(labels))
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = [0] * len(BUCKETS) + [0.0, 0]
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                hist[i] += 1
+        hist[-2] += seconds
+        hist[-1] += 1
+
+
+def record_stage(stage, seconds, **fields):
+    """For durations measured elsewhere (e.g. fetch / parse times from the ingestion pipeline)"""
+    observe("rag_stage_seconds", seconds, stage=stage)
+    trace_id, path = _current.get() or (None, None)
+    _log(trace_id, f"{path}/{stage}" if path else stage, seconds, fields)
+
+
+def _log(trace_id, path, seconds, fields):
+    if logger.isEnabledFor(logging.INFO):
+        extra = " ".join(f"{k}={v}" for k, v in fields.items())
+        logger.info("trace=%s span=%s ms=%.2f %s", trace_id or "-", path, seconds * 1000, extra)
+
+
+@contextmanager
+def span(stage, **fields):
+    """Times the block, nested spans share the trace id of the outermost one
+    fields only go to the log line, the histogram is labelled by stage alone (bounded cardinality)"""
+    parent = _current.get()
+    trace_id = parent[0] if parent else uuid.uuid4().hex[:8]
+    path = f"{parent[1]}/{stage}" if parent else stage
+    token = _current.set((trace_id, path))
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - t0
+        _current.reset(token)
+        observe("rag_stage_seconds", seconds, stage=stage)
+        _log(trace_id, path, seconds, fields)
+
+
+class LLMTelemetryCallback(BaseCallbackHandler):
+    """Per LLM call duration + token usage (ChatGroq reports it in llm_output / usage_metadata)"""
+
+    def __init__(self):
+        self._started = {}
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        t0 = self._started.pop(run_id, None)
+        if t0 is not None:
+            record_stage("llm", time.perf_counter() - t0)
+        count("rag_llm_calls_total")
+
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        prompt_tokens = usage.get("prompt_tokens", 0)
+        completion_tokens = usage.get("completion_tokens", 0)
+        if not usage:
+            # streaming responses only carry usage on the message itself
+            for gens in response.generations:
+                for gen in gens:
+                    meta = getattr(getattr(gen, "message", None), "usage_metadata", None) or {}
+                    prompt_tokens += meta.get("input_tokens", 0)
+                    completion_tokens += meta.get("output_tokens", 0)
+        if prompt_tokens:
+            count("rag_llm_tokens_total", prompt_tokens, type="prompt")
+        if completion_tokens:
+            count("rag_llm_tokens_total", completion_tokens, type="completion")
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._started.pop(run_id, None)
+
+
+def _labels(key):
+    if not key:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in key) + "}"
+
+
+def render_prometheus():
+    """Counters + histograms in the Prometheus text exposition format"""
+    with _lock:
+        counters = dict(_counters)
+        histograms = {k: list(v) for k, v in _histograms.items()}
+
+    lines = []
+    for name in sorted({n for n, _ in counters}):
+        lines.append(f"# HELP {name} {_help.get(name, name)}")
+        lines.append(f"# TYPE {name} counter")
+        for (n, key), value in sorted(counters.items()):
+            if n == name:
+                lines.append(f"{name}{_labels(key)} {value}")
+
+    for name in sorted({n for n, _ in histograms}):
+        lines.append(f"# HELP {name} {_help.get(name, name)}")
+        lines.append(f"# TYPE {name} histogram")
+        for (n, key), hist in sorted(histograms.items()):
+            if n != name:
+                continue
+            for bound, bucket in zip(BUCKETS, hist):
+                lines.append(f"{name}_bucket{_labels(key + (('le', str(bound)),))} {bucket}")
+            lines.append(f"{name}_bucket{_labels(key + (('le', '+Inf'),))} {hist[-1]}")
+            lines.append(f"{name}_sum{_labels(key)} {hist[-2]:.6f}")
+            lines.append(f"{name}_count{_labels(key)} {hist[-1]}")
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
@@ -0,0 +1,21 @@
+#Shared embedding service for the FAQ agents, loaded from the RAG project instead of a copy of it
+# ../A Langchain x RAG x Vectordb(hnsw x mmr)/embedding_service.py is the one implementation: both apps run the
+# same batching / caching code and share its .embedding_cache/embeddings.sqlite, so a text embedded by one is a
+# disk hit for the other. Import it from here as before:
+#
+#   from embedding_service import get_embedding_service
+
+import importlib.util
+from pathlib import Path
+
+RAG_DIR = Path(__file__).resolve().parent.parent / "A Langchain x RAG x Vectordb(hnsw x mmr)"
+SHARED_MODULE = RAG_DIR / "embedding_service.py"
+
+_spec = importlib.util.spec_from_file_location("_shared_embedding_service", SHARED_MODULE)
+_shared = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(_shared)
+
+DEFAULT_MODEL = _shared.DEFAULT_MODEL
+CACHE_PATH = _shared.CACHE_PATH
+EmbeddingService = _shared.EmbeddingService
+get_embedding_service = _shared.get_embedding_service
@@ -0,0 +1,182 @@
+# Persistent FAQ index for the agents: built offline, memory mapped at startup, updated row by row
+#   python faq_index.py              build faq_index/ from susnata_qna.csv, or apply the CSV edits since the last build
+#   python faq_index.py --rebuild    re-embed everything
+#   python faq_index.py --status     is the index in sync with the CSV?
+#
+# faq_index/
+#   index.faiss     IndexIDMap2(IndexFlatL2), same L2 search as FAISS.from_documents, but with stable ids per chunk
+#   manifest.json   csv sha256, embedding model + splitter settings, and per CSV row: content hash, chunk ids + texts
+#
+# load_faq_store() checks the CSV hash against the manifest. Same hash -> index.faiss is memory mapped read only
+# (nothing embedded, pages shared between processes / Streamlit reruns). Different hash -> only rows whose
+# content changed are embedded and added, rows that disappeared are removed by id, then the files are rewritten.
+# Different model / splitter settings -> full rebuild.
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+from collections import defaultdict
+from pathlib import Path
+from typing import List
+
+import faiss
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+CSV_PATH = "./susnata_qna.csv"
+INDEX_DIR = Path("./faq_index")
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 0
+MANIFEST_VERSION = 1
+
+# zero copy mmap of the flat codes (faiss >= 1.10), older builds copy them in with IO_FLAG_MMAP
+MMAP_FLAGS = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+
+
+def load_faq_csv(path: str) -> List[Document]:
+    docs = []
+    with open(path, "r", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            q = row["question"].strip()
+            a = row["answer"].strip()
+            docs.append(Document(page_content=f"Q: {q}\nA: {a}"))
+    return docs
+
+
+def file_sha256(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _settings(emb):
+    return {
+        "version": MANIFEST_VERSION,
+        "model": getattr(emb, "model_name", type(emb).__name__),
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+    }
+
+
+def _read_manifest(index_dir):
+    path = Path(index_dir) / "manifest.json"
+    if not path.exists() or not (Path(index_dir) / "index.faiss").exists():
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write(index, manifest, index_dir):
+    # tmp file + rename -> a process starting meanwhile sees the old or the new files, never half of one
+    index_dir = Path(index_dir)
+    index_dir.mkdir(parents=True, exist_ok=True)
+    faiss.write_index(index, str(index_dir / "index.faiss.tmp"))
+    with open(index_dir / "manifest.json.tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(index_dir / "index.faiss.tmp", index_dir / "index.faiss")
+    os.replace(index_dir / "manifest.json.tmp", index_dir / "manifest.json")
+
+
+def sync_index(csv_path=CSV_PATH, emb=None, index_dir=INDEX_DIR, rebuild=False):
+    """Bring index_dir in line with the CSV -> {"added", "removed", "kept"} row counts"""
+    csv_hash = file_sha256(csv_path)
+    settings = _settings(emb)
+    manifest = None if rebuild else _read_manifest(index_dir)
+    if manifest is not None and any(manifest.get(k) != v for k, v in settings.items()):
+        manifest = None  # other model / chunking -> the stored vectors are useless
+
+    if manifest is not None and manifest["csv_sha256"] == csv_hash:
+        return {"added": 0, "removed": 0, "kept": len(manifest["rows"])}
+
+    if manifest is None:
+        index, old_rows, next_id = None, [], 0
+    else:
+        index = faiss.read_index(str(Path(index_dir) / "index.faiss"))  # private copy, the mmapped one is read only
+        old_rows, next_id = manifest["rows"], manifest["next_id"]
+
+    # rows matched by content, so reordering costs nothing and an edited row is one remove + one add
+    unused = defaultdict(list)
+    for row in old_rows:
+        unused[row["key"]].append(row)
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    rows, new_chunks = [], []  # new_chunks: (row, chunk text)
+    added = 0
+    for doc in load_faq_csv(csv_path):
+        key = hashlib.sha256(doc.page_content.encode("utf-8")).hexdigest()
+        if unused[key]:
+            rows.append(unused[key].pop())
+            continue
+        row = {"key": key, "chunks": []}
+        rows.append(row)
+        added += 1
+        new_chunks.extend((row, chunk.page_content) for chunk in splitter.split_documents([doc]))
+
+    stale = [row for left in unused.values() for row in left]
+    if stale and index is not None:
+        index.remove_ids(np.array([i for row in stale for i, _ in row["chunks"]], dtype=np.int64))
+
+    if new_chunks:
+        vectors = np.asarray(emb.embed_documents([text for _, text in new_chunks]), dtype=np.float32)
+        if index is None:
+            index = faiss.IndexIDMap2(faiss.IndexFlatL2(vectors.shape[1]))
+        ids = np.arange(next_id, next_id + len(new_chunks), dtype=np.int64)
+        index.add_with_ids(vectors, ids)
+        for (row, text), i in zip(new_chunks, ids):
+            row["chunks"].append([int(i), text])
+        next_id += len(new_chunks)
+
+    if index is None:
+        raise ValueError(f"{csv_path} has no FAQ rows")
+    _write(index, {**settings, "csv_sha256": csv_hash, "next_id": next_id, "rows": rows}, index_dir)
+    return {"added": added, "removed": len(stale), "kept": len(rows) - added}
+
+
+def load_faq_store(csv_path=CSV_PATH, emb=None, index_dir=INDEX_DIR):
+    """langchain FAISS store over the memory mapped index, synced with the CSV first if it changed"""
+    sync_index(csv_path, emb, index_dir)
+    manifest = _read_manifest(index_dir)
+    index = faiss.read_index(str(Path(index_dir) / "index.faiss"), MMAP_FLAGS)
+
+    # IndexIDMap2 returns the chunk ids themselves, so they double as docstore ids
+    docs = {str(i): Document(page_content=text) for row in manifest["rows"] for i, text in row["chunks"]}
+    return FAISS(
+        embedding_function=emb,
+        index=index,
+        docstore=InMemoryDocstore(docs),
+        index_to_docstore_id={int(i): i for i in docs},
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build / update the FAQ FAISS index")
+    parser.add_argument("--csv", default=CSV_PATH)
+    parser.add_argument("--index-dir", default=str(INDEX_DIR))
+    parser.add_argument("--model", default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument("--rebuild", action="store_true", help="re-embed every row")
+    parser.add_argument("--status", action="store_true", help="only report whether the index matches the CSV")
+    args = parser.parse_args()
+
+    if args.status:
+        manifest = _read_manifest(args.index_dir)
+        if manifest is None:
+            print(f"No index in {args.index_dir}")
+        else:
+            in_sync = manifest["csv_sha256"] == file_sha256(args.csv)
+            n_chunks = sum(len(row["chunks"]) for row in manifest["rows"])
+            print(f"{len(manifest['rows'])} rows, {n_chunks} chunks, model {manifest['model']}, "
+                  f"{'in sync with' if in_sync else 'OUTDATED, run without --status to update from'} {args.csv}")
+        return
+
+    from embedding_service import get_embedding_service
+    counts = sync_index(args.csv, get_embedding_service(args.model), args.index_dir, rebuild=args.rebuild)
+    print(f"{args.index_dir}: {counts['added']} rows embedded, {counts['removed']} removed, {counts['kept']} unchanged")
+
+
+if __name__ == "__main__":
+    main()
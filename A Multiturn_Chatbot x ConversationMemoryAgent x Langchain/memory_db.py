@@ -0,0 +1,186 @@
+#Long-term memory in one SQLite file (was one pretty printed JSON file per message under memory_store/)
+#   python memory_db.py migrate                   copy memory_store/<actor>/<thread>/*.json into memory.sqlite
+#   python memory_db.py migrate --src old_store --db memory.sqlite
+#   python memory_db.py stats
+#
+# memory         append only rows (seq, id, actor_id, thread_id, role, content, created),
+#                index on (actor_id, thread_id, seq) -> listing a thread is a range scan, not a glob + json.load
+# memory_fts     FTS5 trigram index over content, filled by a trigger on insert
+# The agent writes a whole turn (user message(s) + answer) in one transaction with add_many.
+# search() keeps what search_memory did with the JSON files: the whole query as a case insensitive substring
+# ("roam" finds "roaming"), this thread first and then all of the actor's threads. With the trigram tokenizer a
+# phrase query is a substring match that uses the index; queries under 3 characters have no trigram and scan instead.
+
+import argparse
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+
+MEMORY_DB = Path("./memory.sqlite")
+MEMORY_ROOT = Path("./memory_store")  # the old JSON tree, only read by migrate
+MIGRATE_BATCH = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS memory (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    actor_id TEXT NOT NULL,
+    thread_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS memory_thread ON memory (actor_id, thread_id, seq);
+CREATE VIRTUAL TABLE IF NOT EXISTS memory_fts USING fts5(
+    content, content='memory', content_rowid='seq', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS memory_ai AFTER INSERT ON memory BEGIN
+    INSERT INTO memory_fts (rowid, content) VALUES (new.seq, new.content);
+END;
+"""
+
+
+MIN_TRIGRAM_QUERY = 3  # shorter queries cant use the trigram index
+
+
+def _phrase(query):
+    # the whole query as one FTS5 phrase, quotes doubled -> no FTS syntax gets through from user text
+    return '"' + query.replace('"', '""') + '"'
+
+
+class MemoryStore:
+    """Append only memory items keyed by actor / thread, {"id", "role", "content"} dicts like the JSON files"""
+
+    def __init__(self, path=MEMORY_DB):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")  # WAL + NORMAL: a crash can lose the last turn, never corrupt
+        # sqlite's lower() only folds ASCII, the old search used str.lower
+        self._db.create_function("py_lower", 1, str.lower, deterministic=True)
+        self._upgrade_fts()
+        self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def _upgrade_fts(self):
+        # stores made before the trigram index had a word tokenizer ("roam" didnt find "roaming") -> rebuild it
+        row = self._db.execute("SELECT sql FROM sqlite_master WHERE name = 'memory_fts'").fetchone()
+        if row is None or "trigram" in row[0]:
+            return
+        with self._db:
+            self._db.execute("DROP TABLE memory_fts")
+        self._db.executescript(SCHEMA)
+        with self._db:
+            self._db.execute("INSERT INTO memory_fts (memory_fts) VALUES ('rebuild')")
+
+    def add_many(self, actor_id, thread_id, items):
+        """[(role, content)] -> ids, one transaction for the whole batch"""
+        now = time.time()
+        rows = [(str(uuid.uuid4()), actor_id, thread_id, role, content, now) for role, content in items]
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT INTO memory (id, actor_id, thread_id, role, content, created) VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+        return [row[0] for row in rows]
+
+    def add(self, actor_id, thread_id, role, content):
+        return self.add_many(actor_id, thread_id, [(role, content)])[0]
+
+    def list_thread(self, actor_id, thread_id):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, role, content FROM memory WHERE actor_id = ? AND thread_id = ? ORDER BY seq",
+                (actor_id, thread_id),
+            ).fetchall()
+        return [{"id": i, "role": r, "content": c} for i, r, c in rows]
+
+    def _match(self, query, actor_id, thread_id, limit):
+        if len(query) >= MIN_TRIGRAM_QUERY:
+            sql = ("SELECT m.id, m.role, m.content FROM memory_fts JOIN memory m ON m.seq = memory_fts.rowid "
+                   "WHERE memory_fts MATCH ? AND m.actor_id = ?")
+            params = [_phrase(query), actor_id]
+        else:
+            sql = ("SELECT m.id, m.role, m.content FROM memory m "
+                   "WHERE instr(py_lower(m.content), ?) > 0 AND m.actor_id = ?")
+            params = [query.lower(), actor_id]
+        if thread_id is not None:
+            sql += " AND m.thread_id = ?"
+            params.append(thread_id)
+        with self._lock:
+            rows = self._db.execute(sql + " ORDER BY m.seq DESC LIMIT ?", params + [limit]).fetchall()
+        return [{"id": i, "role": r, "content": c} for i, r, c in rows]
+
+    def search(self, actor_id, thread_id, query, limit=5):
+        """Newest items containing the query (case insensitive substring), this thread first, the actor's other
+        threads if it has none"""
+        if not query.strip():
+            return []
+        return self._match(query, actor_id, thread_id, limit) or self._match(query, actor_id, None, limit)
+
+    def stats(self):
+        with self._lock:
+            items, actors, threads = self._db.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT actor_id), COUNT(DISTINCT actor_id || '/' || thread_id) FROM memory"
+            ).fetchone()
+        wal = self.path.with_name(self.path.name + "-wal")  # recent writes live there until a checkpoint
+        size = self.path.stat().st_size + (wal.stat().st_size if wal.exists() else 0)
+        return {"items": items, "actors": actors, "threads": threads, "bytes": size}
+
+    def migrate_json_tree(self, root=MEMORY_ROOT, batch=MIGRATE_BATCH):
+        """memory_store/<actor>/<thread>/<id>.json -> rows, oldest file first per thread; re-running skips done ids"""
+        copied = skipped = broken = 0
+        pending = []
+
+        def flush():
+            nonlocal copied, skipped
+            with self._lock, self._db:
+                done = self._db.executemany(
+                    "INSERT OR IGNORE INTO memory (id, actor_id, thread_id, role, content, created) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", pending
+                ).rowcount  # rows actually inserted, ignored ids and the FTS trigger dont count
+            copied += done
+            skipped += len(pending) - done
+            pending.clear()
+
+        for thread_dir in sorted(p for p in Path(root).glob("*/*") if p.is_dir()):
+            # file names are random uuids, the write time is the only order the old store had
+            for fpath in sorted(thread_dir.glob("*.json"), key=lambda p: p.stat().st_mtime):
+                try:
+                    with open(fpath, "r", encoding="utf-8") as f:
+                        item = json.load(f)
+                    row = (item.get("id") or fpath.stem, thread_dir.parent.name, thread_dir.name,
+                           item["role"], item["content"], fpath.stat().st_mtime)
+                except (OSError, ValueError, KeyError, TypeError):
+                    broken += 1
+                    continue
+                pending.append(row)
+                if len(pending) >= batch:
+                    flush()
+        if pending:
+            flush()
+        return {"copied": copied, "already_there": skipped, "unreadable": broken}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite long-term memory store")
+    parser.add_argument("command", choices=["migrate", "stats"])
+    parser.add_argument("--db", default=str(MEMORY_DB))
+    parser.add_argument("--src", default=str(MEMORY_ROOT), help="old JSON tree for migrate")
+    args = parser.parse_args()
+
+    store = MemoryStore(args.db)
+    if args.command == "migrate":
+        t0 = time.perf_counter()
+        counts = store.migrate_json_tree(args.src)
+        print(f"{args.src} -> {args.db}: {counts['copied']} items copied, {counts['already_there']} already there, "
+              f"{counts['unreadable']} unreadable files, {time.perf_counter() - t0:.1f}s")
+        print(f"The JSON files are left in place, delete {args.src} once the agent runs fine on {args.db}")
+    print(store.stats())
+
+
+if __name__ == "__main__":
+    main()
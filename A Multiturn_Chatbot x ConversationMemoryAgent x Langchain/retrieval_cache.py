@@ -0,0 +1,104 @@
+#Retrieval cache shared by the FAQ tools (search_faq, search_detailed_faq, reformulate_query)
+# In one agent turn the model often calls two or three tools with the same question. Each distinct query
+# (case / whitespace normalised, the MiniLM model is uncased) is embedded and searched once with k=FETCH_K, the
+# result goes into a bounded LRU and k=3 / k=5 calls are cut from it (exact flat search -> top 3 of the top 10
+# is the top 3). The LRU lives as long as the process, so repeats across turns are free too.
+#
+#   retriever = RetrievalCache(store)
+#   retriever.search("roaming activation", k=3) / retriever.stats() / retriever.clear()
+
+import threading
+from collections import OrderedDict
+
+FETCH_K = 10       # results kept per query, tool calls up to this k never touch the index again
+LRU_SIZE = 1024    # distinct queries kept
+
+
+def normalize_query(query):
+    return " ".join(query.lower().split())
+
+
+class RetrievalCache:
+    """store.similarity_search with the query vector + top FETCH_K results cached per normalised query"""
+
+    def __init__(self, store, fetch_k=FETCH_K, lru_size=LRU_SIZE):
+        self.store = store
+        self.fetch_k = fetch_k
+        self.lru_size = lru_size
+
+        self._lru = OrderedDict()  # normalised query -> (query vector, [(doc, score)] best first, k searched)
+        self._lock = threading.Lock()
+        self._inflight = {}  # normalised query -> lock, parallel tool calls with the same query wait for one search
+
+        self._stats = {
+            "searches": 0, "hits": 0, "misses": 0, "deepened": 0,
+            "embed_calls": 0, "index_searches": 0, "evictions": 0,
+        }
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is not None:
+                self._lru.move_to_end(key)
+            return entry
+
+    def _put(self, key, entry):
+        with self._lock:
+            self._lru[key] = entry
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def search_with_score(self, query, k=3):
+        key = normalize_query(query)
+        with self._lock:
+            self._stats["searches"] += 1
+            key_lock = self._inflight.setdefault(key, threading.Lock())
+
+        with key_lock:
+            try:
+                return self._search(key, query, k)
+            finally:
+                with self._lock:
+                    self._inflight.pop(key, None)
+
+    def _search(self, key, query, k):
+        entry = self._get(key)
+        if entry is not None and (len(entry[1]) >= k or len(entry[1]) < entry[2]):
+            # enough results cached, or last time fewer than asked for came back = that was the whole index
+            with self._lock:
+                self._stats["hits"] += 1
+            return entry[1][:k]
+
+        if entry is None:
+            vector = self.store.embedding_function.embed_query(query)
+        else:
+            vector = entry[0]  # a bigger k than cached: search again, but the embedding is reused
+        fetch = max(k, self.fetch_k)
+        results = self.store.similarity_search_with_score_by_vector(vector, k=fetch)
+        self._put(key, (vector, results, fetch))
+
+        with self._lock:
+            self._stats["misses" if entry is None else "deepened"] += 1
+            self._stats["embed_calls"] += entry is None
+            self._stats["index_searches"] += 1
+        return results[:k]
+
+    def search(self, query, k=3):
+        """Drop in for store.similarity_search(query, k)"""
+        return [doc for doc, _ in self.search_with_score(query, k)]
+
+    def clear(self):
+        """After the index changed (faq_index.sync_index), the cached results would be stale"""
+        with self._lock:
+            self._lru.clear()
+
+    def stats(self):
+        with self._lock:
+            s = dict(self._stats)
+            s["entries"] = len(self._lru)
+        s["saved_embed_calls"] = s["searches"] - s["embed_calls"]
+        s["saved_index_searches"] = s["searches"] - s["index_searches"]
+        s["hit_rate"] = s["hits"] / s["searches"] if s["searches"] else 0.0
+        return s
@@ -1,40 +1,26 @@
-import csv
 import os
-from typing import List
 from typing_extensions import TypedDict
 
-from langchain_core.documents import Document
 from langchain_core.tools import tool
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_groq import ChatGroq
-from langchain_community.vectorstores import FAISS
 
 from dotenv import load_dotenv
 from langchain.agents import create_agent
 
-_ = load_dotenv()
-
+from embedding_service import get_embedding_service
+from faq_index import load_faq_store
+from retrieval_cache import RetrievalCache
 
-def load_faq_csv(path: str) -> List[Document]:
-    docs = []
-    with open(path, "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            q = row["question"].strip()
-            a = row["answer"].strip()
-            docs.append(Document(page_content=f"Q: {q}\nA: {a}"))
-    return docs
+_ = load_dotenv()
 
 
-docs = load_faq_csv("./susnata_qna.csv")
-emb = HuggingFaceEmbeddings(
-    model_name="sentence-transformers/all-MiniLM-L6-v2",
-)
-splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=0)
-chunks = splitter.split_documents(docs)
-store = FAISS.from_documents(chunks, emb)
+# shared batched + cached embedder -> repeated queries and unchanged FAQ chunks skip the model
+emb = get_embedding_service("sentence-transformers/all-MiniLM-L6-v2")
+# index built by faq_index.py and memory mapped, only CSV rows edited since the last build get embedded
+store = load_faq_store("./susnata_qna.csv", emb)
+# one embedding + index search per distinct query, shared by all three tools, across turns (retriever.stats())
+retriever = RetrievalCache(store)
 
 
 @tool
@@ -48,7 +34,7 @@ def search_faq(query: str) -> str:
     Returns:
         Relevant FAQ entries that might answer the question
     """
-    results = store.similarity_search(query, k=3)
+    results = retriever.search(query, k=3)
 
     if not results:
         return "No relevant FAQ entries found."
@@ -73,7 +59,7 @@ def search_detailed_faq(query: str, num_results: int = 5) -> str:
     Returns:
         More comprehensive FAQ entries
     """
-    results = store.similarity_search(query, k=num_results)
+    results = retriever.search(query, k=num_results)
 
     if not results:
         return "No relevant FAQ entries found."
@@ -99,7 +85,7 @@ def reformulate_query(original_query: str, focus_aspect: str) -> str:
         A reformulated query focused on the specified aspect
     """
     reformulated = f"{focus_aspect} related to {original_query}"
-    results = store.similarity_search(reformulated, k=3)
+    results = retriever.search(reformulated, k=3)
 
     if not results:
         return f"No results found for aspect: {focus_aspect}"
@@ -1,99 +1,54 @@
 # susnata_langgraph_agent_with_memory.py
-import csv
 import os
 import json
-import uuid
 from typing import List, Tuple
 from pathlib import Path
 
-from langchain_core.documents import Document
 from langchain_core.tools import tool
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_groq import ChatGroq
-from langchain_community.vectorstores import FAISS
 
 from dotenv import load_dotenv
 from langchain.agents import create_agent
 
+from embedding_service import get_embedding_service
+from faq_index import load_faq_store
+from memory_db import MEMORY_DB, MemoryStore
+from retrieval_cache import RetrievalCache
+
 _ = load_dotenv()
 
 # ---------------------------------------------------
 # LOAD FAQ CSV → RAG KNOWLEDGE BASE
 # ---------------------------------------------------
-def load_faq_csv(path: str) -> List[Document]:
-    docs = []
-    with open(path, "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            q = row["question"].strip()
-            a = row["answer"].strip()
-            docs.append(Document(page_content=f"Q: {q}\nA: {a}"))
-    return docs
-
-docs = load_faq_csv("./susnata_qna.csv")
-
-emb = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=0)
-chunks = splitter.split_documents(docs)
-store = FAISS.from_documents(chunks, emb)
+# shared batched + cached embedder -> repeated queries and unchanged FAQ chunks skip the model
+emb = get_embedding_service("sentence-transformers/all-MiniLM-L6-v2")
+# index built by faq_index.py and memory mapped, only CSV rows edited since the last build get embedded
+store = load_faq_store("./susnata_qna.csv", emb)
+# one embedding + index search per distinct query, shared by all three tools, across turns (retriever.stats())
+retriever = RetrievalCache(store)
 
 
 # ---------------------------------------------------
 # DISK MEMORY (LONG-TERM) + CHECKPOINT (SHORT-TERM)
 # ---------------------------------------------------
-MEMORY_ROOT = Path("./memory_store")
+# long-term memory: one SQLite file, FTS5 indexed (memory_db.py, `python memory_db.py migrate` for old memory_store/)
+memory = MemoryStore(MEMORY_DB)
 CHECKPOINT_ROOT = Path("./checkpoints")
 
-MEMORY_ROOT.mkdir(parents=True, exist_ok=True)
 CHECKPOINT_ROOT.mkdir(parents=True, exist_ok=True)
 
 
-def _namespace_path(actor_id: str, thread_id: str) -> Path:
-    p = MEMORY_ROOT / actor_id / thread_id
-    p.mkdir(parents=True, exist_ok=True)
-    return p
-
-
 def save_memory_item(actor_id: str, thread_id: str, role: str, content: str):
-    ns = _namespace_path(actor_id, thread_id)
-    item_id = str(uuid.uuid4())
-    payload = {"id": item_id, "role": role, "content": content}
-    with open(ns / f"{item_id}.json", "w", encoding="utf-8") as f:
-        json.dump(payload, f, ensure_ascii=False, indent=2)
+    memory.add(actor_id, thread_id, role, content)
 
 
 def list_memory_items(actor_id: str, thread_id: str) -> List[dict]:
-    ns = _namespace_path(actor_id, thread_id)
-    items = []
-    for fpath in sorted(ns.glob("*.json")):
-        try:
-            with open(fpath, "r", encoding="utf-8") as f:
-                items.append(json.load(f))
-        except:
-            pass
-    return items
+    return memory.list_thread(actor_id, thread_id)
 
 
 def search_memory(actor_id: str, thread_id: str, query: str, limit=5):
-    q = query.lower()
-    items = list_memory_items(actor_id, thread_id)
-    matched = [it for it in items if q in it["content"].lower()]
-
-    if not matched:
-        actor_dir = MEMORY_ROOT / actor_id
-        if actor_dir.exists():
-            for fpath in sorted(actor_dir.glob("*/*.json")):
-                try:
-                    with open(fpath, "r", encoding="utf-8") as f:
-                        it = json.load(f)
-                    if q in it["content"].lower():
-                        matched.append(it)
-                except:
-                    pass
-
-    return matched[:limit]
+    return memory.search(actor_id, thread_id, query, limit)
 
 
 def save_checkpoint(actor_id: str, thread_id: str, messages: List[Tuple[str, str]]):
@@ -120,7 +75,7 @@ def load_checkpoint(actor_id: str, thread_id: str) -> List[Tuple[str, str]]:
 @tool
 def search_faq(query: str):
     """Search the FAQ knowledge base."""
-    results = store.similarity_search(query, k=3)
+    results = retriever.search(query, k=3)
     if not results:
         return "No relevant FAQ entries found."
     return "\n\n---\n\n".join(
@@ -131,7 +86,7 @@ def search_faq(query: str):
 @tool
 def search_detailed_faq(query: str, num_results: int = 5):
     """Search for more (k=N) FAQ entries."""
-    results = store.similarity_search(query, k=num_results)
+    results = retriever.search(query, k=num_results)
     if not results:
         return "No relevant FAQ entries found."
     return "\n\n---\n\n".join(
@@ -143,7 +98,7 @@ def search_detailed_faq(query: str, num_results: int = 5):
 def reformulate_query(original_query: str, focus_aspect: str):
     """Reformulate a query to focus on a specific aspect."""
     reformulated = f"{focus_aspect} related to {original_query}"
-    results = store.similarity_search(reformulated, k=3)
+    results = retriever.search(reformulated, k=3)
     if not results:
         return f"No results for aspect: {focus_aspect}"
     return "\n\n---\n\n".join(
@@ -198,11 +153,9 @@ def run_with_memory(actor_id: str, thread_id: str, session_messages: List[Tuple[
     final_messages = result.get("messages", [])
     assistant_content = final_messages[-1].content if final_messages else "No response."
 
-    for r, c in session_messages:
-        if r.lower() in ("human", "user"):
-            save_memory_item(actor_id, thread_id, "user", c)
-
-    save_memory_item(actor_id, thread_id, "assistant", assistant_content)
+    # the whole turn in one write
+    turn = [("user", c) for r, c in session_messages if r.lower() in ("human", "user")]
+    memory.add_many(actor_id, thread_id, turn + [("assistant", assistant_content)])
 
     normalized = []
     for msg in final_messages:
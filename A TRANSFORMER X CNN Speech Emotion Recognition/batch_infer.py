@@ -0,0 +1,148 @@
+# Batch / overnight scoring for the emotion model (directories or lists of clips -> CSV / Parquet)
+#   python batch_infer.py recordings/ --out results.csv
+#   python batch_infer.py a.wav b.wav more_calls/ --out results.parquet --workers 8 --batch-size 128
+#
+# Decoding + MFCCs run in a process pool (librosa is CPU bound, one worker per core by default),
+# the features are stacked into fixed (batch_size, 40, 200, 1) float32 batches and each batch is one
+# predict call. Workers keep extracting the next clips while a batch is being predicted.
+# A clip that fails to decode gets a row with the error instead of stopping the run.
+
+import argparse
+import io
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+
+from features import MAX_PAD_LEN, N_MFCC, extract_features
+
+AUDIO_EXTS = (".wav", ".flac", ".ogg", ".mp3")
+BATCH_SIZE = 64
+CHUNKSIZE = 4  # clips per pool task, amortises the pickling round trip
+
+_predict_lock = threading.Lock()  # one predict at a time when the HTTP API scores requests in parallel
+
+
+def collect_clips(inputs):
+    """Files + directories (searched recursively for AUDIO_EXTS) -> sorted, de-duplicated clip paths"""
+    clips = []
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            clips.extend(p for p in path.rglob("*") if p.suffix.lower() in AUDIO_EXTS)
+        elif path.is_file():
+            clips.append(path)
+        else:
+            raise FileNotFoundError(f"No such file or directory: {item}")
+    return sorted(set(clips))
+
+
+def _init_worker():
+    # one core per worker, BLAS / numba threads on top of the pool would just fight over the same cores
+    for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "NUMBA_NUM_THREADS"):
+        os.environ[var] = "1"
+
+
+def _extract(item):
+    """(name, path or raw bytes) -> (name, features or None, error)"""
+    name, source = item
+    try:
+        if isinstance(source, bytes):
+            source = io.BytesIO(source)
+        return name, extract_features(source).astype(np.float32), ""
+    except Exception as e:
+        message = str(e).strip().splitlines()
+        return name, None, f"{type(e).__name__}: {message[0]}" if message else type(e).__name__
+
+
+def make_pool(workers=None):
+    # spawn, not fork: the parent may already have tensorflow loaded and forking that is not safe
+    return ProcessPoolExecutor(
+        max_workers=workers or os.cpu_count(),
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+    )
+
+
+def score(model, le, items, pool, batch_size=BATCH_SIZE, progress=False):
+    """items: [(name, path or bytes)] -> one result dict per item, in input order"""
+    batch = np.zeros((batch_size, N_MFCC, MAX_PAD_LEN, 1), dtype=np.float32)
+    pending = []  # (input position, name) of the rows filled in `batch`
+    results = [None] * len(items)
+
+    def flush():
+        # always the full fixed shape -> same graph every call, the zero rows past len(pending) are ignored
+        with _predict_lock:
+            probs = np.asarray(model.predict_on_batch(batch))
+        for row, (pos, name) in enumerate(pending):
+            p = probs[row]
+            result = {"clip": name, "emotion": le.classes_[int(np.argmax(p))], "confidence": float(p.max())}
+            result.update({f"p_{label}": float(v) for label, v in zip(le.classes_, p)})
+            result["error"] = ""
+            results[pos] = result
+        pending.clear()
+        batch[:] = 0
+
+    extracted = pool.map(_extract, items, chunksize=CHUNKSIZE)
+    if progress:
+        extracted = tqdm(extracted, total=len(items), unit="clip", file=sys.stderr)
+    for pos, (name, features, error) in enumerate(extracted):
+        if features is None:
+            results[pos] = {"clip": name, "emotion": None, "confidence": None, "error": error}
+            continue
+        batch[len(pending)] = features
+        pending.append((pos, name))
+        if len(pending) == batch_size:
+            flush()
+    if pending:
+        flush()
+    return results
+
+
+def write_results(results, out):
+    df = pd.DataFrame(results)
+    df = df[[c for c in df.columns if c != "error"] + ["error"]]  # failed clips may come first
+    if Path(out).suffix.lower() == ".parquet":
+        df.to_parquet(out, index=False)  # needs pyarrow
+    else:
+        df.to_csv(out, index=False)
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score audio clips with the emotion model")
+    parser.add_argument("inputs", nargs="+", help="audio files and / or directories")
+    parser.add_argument("--out", required=True, help="results file, .csv or .parquet")
+    parser.add_argument("--workers", type=int, default=None, help="feature extraction processes, default: all cores")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--model", default=None, help="default: susnata_cnn_transformer_emotion2.h5, or a .tflite")
+    parser.add_argument("--encoder", default=None, help="default: label_encoder2.pkl (emotion_labels.json for .tflite)")
+    args = parser.parse_args()
+
+    clips = collect_clips(args.inputs)
+    if not clips:
+        raise SystemExit("No audio clips found")
+
+    # the model (and tensorflow, for a .h5) only in this process, the workers import features.py alone
+    from lite_model import load_for_inference
+    model, le = load_for_inference(args.model, args.encoder)
+
+    with make_pool(args.workers) as pool:
+        t0 = time.perf_counter()
+        results = score(model, le, [(str(p), str(p)) for p in clips], pool, args.batch_size, progress=True)
+        seconds = time.perf_counter() - t0
+
+    write_results(results, args.out)
+    failed = sum(1 for r in results if r["error"])
+    print(f"{len(results)} clips ({failed} failed) in {seconds:.1f}s, {len(results) / seconds:.1f} clips/s -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
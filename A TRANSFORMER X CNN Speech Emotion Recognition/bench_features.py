@@ -0,0 +1,98 @@
+#Per stage timing of the two feature backends in features.py, same clips through each
+#   librosa   load (decode + resampy kaiser_fast, whole clip)  mfcc  normalize
+#   fast      decode (first ~4.67 s)  resample  stft  mel (+ dB)  dct  normalize
+# Reports the median ms per stage and per clip, and the max / mean difference of the features to the librosa backend.
+# Clips longer than 200 frames are expected to differ (see features.py), they get their own line in the summary.
+#
+#   python bench_features.py clips/
+#   python bench_features.py a.wav b.flac --repeat 5
+
+import argparse
+import time
+from collections import defaultdict
+
+import librosa
+import numpy as np
+
+from batch_infer import collect_clips
+from features import (
+    HOP, MAX_PAD_LEN, N_MFCC, SR, dct_matrix, decode, extract_features, log_mel, needed_samples, normalize_pad,
+    power_spectrogram, resample,
+)
+
+
+def librosa_stages(path):
+    t = [time.perf_counter()]
+    audio, sr = librosa.load(path, res_type='kaiser_fast')
+    t.append(time.perf_counter())
+    mfcc = librosa.feature.mfcc(y=audio, sr=sr, n_mfcc=N_MFCC)
+    t.append(time.perf_counter())
+    features = normalize_pad(mfcc)
+    t.append(time.perf_counter())
+    return features, dict(zip(["load", "mfcc", "normalize"], np.diff(t)))
+
+
+def fast_stages(path):
+    # extract_features_fast, split up
+    n_samples = needed_samples()
+    t = [time.perf_counter()]
+    y, sr = decode(path, n_samples)
+    t.append(time.perf_counter())
+    y = resample(y, sr)[:n_samples]
+    t.append(time.perf_counter())
+    power = power_spectrogram(y, min(MAX_PAD_LEN, 1 + len(y) // HOP))
+    t.append(time.perf_counter())
+    S = log_mel(power)
+    t.append(time.perf_counter())
+    mfcc = dct_matrix() @ S
+    t.append(time.perf_counter())
+    features = normalize_pad(mfcc)
+    t.append(time.perf_counter())
+    return features, dict(zip(["decode", "resample", "stft", "mel", "dct", "normalize"], np.diff(t)))
+
+
+def run(stages, clips, repeat):
+    """-> features per clip, {stage: median seconds per clip}"""
+    times = defaultdict(list)
+    features = {}
+    for path in clips:
+        runs = []
+        for _ in range(repeat):
+            features[path], stage_times = stages(path)
+            runs.append(stage_times)
+        for stage in runs[0]:
+            times[stage].append(np.median([r[stage] for r in runs]))
+    return features, {stage: float(np.median(v)) for stage, v in times.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("inputs", nargs="+", help="audio files and / or directories")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per clip, the median is kept")
+    args = parser.parse_args()
+
+    clips = [str(p) for p in collect_clips(args.inputs)]
+    lengths = {p: librosa.get_duration(path=p) for p in clips}
+    for p in clips[:1]:  # warm up the numba / filter caches before timing
+        extract_features(p, backend="librosa")
+        extract_features(p, backend="fast")
+
+    reference, librosa_times = run(librosa_stages, clips, args.repeat)
+    fast, fast_times = run(fast_stages, clips, args.repeat)
+
+    for name, stage_times in (("librosa", librosa_times), ("fast", fast_times)):
+        total = sum(stage_times.values())
+        stages = "  ".join(f"{stage} {seconds * 1e3:.2f}" for stage, seconds in stage_times.items())
+        print(f"{name:<8} {total * 1e3:8.2f} ms/clip   {stages}")
+    print(f"speedup  {sum(librosa_times.values()) / sum(fast_times.values()):.1f}x")
+
+    window_s = needed_samples() / SR
+    for label, group in (("<= 200 frames", [p for p in clips if lengths[p] <= window_s]),
+                         ("> 200 frames", [p for p in clips if lengths[p] > window_s])):
+        if group:
+            diff = np.stack([np.abs(fast[p] - reference[p]) for p in group])
+            print(f"{label:<14} {len(group):>5} clips   max diff {diff.max():.2e}   mean diff {diff.mean():.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#Exported .tflite models (export_model.py) against the Keras .h5, same clips through each
+#   startup   fresh python process: imports + loading + first prediction, peak memory, tensorflow imported or not
+#   latency   median ms for one clip (batch of 1, features already extracted)
+#   parity    max probability difference and top-1 agreement with the .h5, accuracy if the clips have
+#             RAVDESS style names (03-01-05-01-02-01-12.wav, third field = emotion)
+#
+#   python bench_lite_model.py clips/
+#   python bench_lite_model.py clips/ --models emotion.tflite emotion_f16.tflite emotion_int8.tflite
+
+import argparse
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from batch_infer import collect_clips
+from features import extract_features
+from lite_model import BASE_DIR, LABELS_PATH, LITE_MODEL_PATH, load_for_inference
+
+# RAVDESS emotion codes, same mapping as the notebook
+EMOTIONS = {"01": "neutral", "02": "calm", "03": "happy", "04": "sad",
+            "05": "angry", "06": "fearful", "07": "disgust", "08": "surprised"}
+
+STARTUP = """
+import time
+t0 = time.perf_counter()
+import sys
+import numpy as np
+from lite_model import load_for_inference
+model, le = load_for_inference({model!r}, {encoder!r})
+model.predict_on_batch(np.zeros((1, 40, 200, 1), np.float32))
+seconds = time.perf_counter() - t0
+try:  # ru_maxrss would include the parent's peak from before the fork, VmHWM is this process only (linux)
+    peak_mb = int(next(l for l in open("/proc/self/status") if l.startswith("VmHWM")).split()[1]) / 1024
+except OSError:
+    peak_mb = float("nan")
+print(seconds, peak_mb, "tensorflow" in sys.modules)
+"""
+
+
+def startup(model_path, encoder_path):
+    """(seconds to first prediction, peak MB, tensorflow imported) in a new process"""
+    code = STARTUP.format(model=str(model_path), encoder=str(encoder_path))
+    out = subprocess.run([sys.executable, "-c", code], cwd=BASE_DIR, capture_output=True, text=True, check=True)
+    seconds, peak_mb, tf_loaded = out.stdout.split()[-3:]
+    return float(seconds), float(peak_mb), tf_loaded == "True"
+
+
+def latency(model, X, repeat):
+    model.predict_on_batch(X[:1])  # warm up
+    times = []
+    for _ in range(repeat):
+        for x in X:
+            t0 = time.perf_counter()
+            model.predict_on_batch(x[np.newaxis])
+            times.append(time.perf_counter() - t0)
+    return float(np.median(times))
+
+
+def true_labels(clips):
+    codes = [Path(c).stem.split("-") for c in clips]
+    if all(len(c) == 7 and c[2] in EMOTIONS for c in codes):
+        return np.array([EMOTIONS[c[2]] for c in codes])
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("inputs", nargs="+", help="audio files and / or directories")
+    parser.add_argument("--models", nargs="+", default=[str(LITE_MODEL_PATH)], help=".tflite files to compare")
+    parser.add_argument("--h5", default=str(BASE_DIR / "susnata_cnn_transformer_emotion2.h5"))
+    parser.add_argument("--encoder", default=str(BASE_DIR / "label_encoder2.pkl"))
+    parser.add_argument("--labels", default=str(LABELS_PATH))
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    clips = [str(p) for p in collect_clips(args.inputs)]
+    X = np.stack([extract_features(c).astype(np.float32) for c in clips])
+    truth = true_labels(clips)
+
+    h5_model, le = load_for_inference(args.h5, args.encoder)
+    reference = np.asarray(h5_model.predict_on_batch(X))
+    candidates = [(Path(args.h5).name, h5_model, args.h5, args.encoder)]
+    for path in args.models:
+        model, _ = load_for_inference(path, args.labels)
+        candidates.append((Path(path).name, model, path, args.labels))
+
+    print(f"{len(clips)} clips" + ("" if truth is None else ", accuracy from the RAVDESS file names"))
+    header = (f"{'model':<40} {'kB':>7} {'startup s':>9} {'peak MB':>8} {'tf':>3} {'ms/clip':>8} "
+              f"{'max diff':>9} {'top-1 =':>8}" + ("" if truth is None else f" {'accuracy':>8}"))
+    print(header)
+    print("-" * len(header))
+    for name, model, path, encoder in candidates:
+        seconds, peak_mb, tf_loaded = startup(path, encoder)
+        probs = np.asarray(model.predict_on_batch(X))
+        size = Path(path).stat().st_size / 1e3
+        line = (f"{name:<40} {size:>7.0f} {seconds:>9.2f} {peak_mb:>8.0f} {'yes' if tf_loaded else 'no':>3} "
+                f"{latency(model, X, args.repeat) * 1e3:>8.2f} {np.abs(probs - reference).max():>9.2e} "
+                f"{np.mean(probs.argmax(1) == reference.argmax(1)):>8.1%}")
+        if truth is not None:
+            line += f" {np.mean(le.classes_[probs.argmax(1)] == truth):>8.1%}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# Emotion recognition over HTTP, same batched path as batch_infer.py
+#  uvicorn emotion_api:app --port 8002
+# Swagger: http://127.0.0.1:8002/docs
+#
+#   POST /predict         multipart upload of one or more clips -> one result per clip
+#   POST /predict/paths   {"paths": [...files or dirs under data/...], "out": "results.parquet"}
+#                         -> results inline, or written to results/<out> (csv / parquet) for big overnight runs,
+#                         paths and `out` are relative names, absolute paths, .. and symlinks leading out are rejected
+# The model is loaded once, the feature extraction process pool is shared by all requests.
+
+import os
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from fastapi import FastAPI, File, HTTPException, UploadFile
+from pydantic import BaseModel, Field
+
+from batch_infer import BATCH_SIZE, collect_clips, make_pool, score, write_results
+
+WORKERS = None  # feature extraction processes, None = all cores
+MAX_UPLOAD_CLIPS = 256
+DATA_DIR = Path(__file__).resolve().parent / "data"  # the only place /predict/paths reads clips from
+RESULTS_DIR = Path(__file__).resolve().parent / "results"  # the only place /predict/paths writes to
+RESULT_SUFFIXES = {".csv", ".parquet"}
+
+model = None
+le = None
+pool = None
+
+app = FastAPI()
+
+
+def initialize_components():
+    """Loading the model and starting the worker pool once"""
+    global model, le, pool
+
+    if model is None:
+        from lite_model import load_for_inference  # .h5 by default, EMOTION_MODEL_PATH=...tflite for the lean runtime
+        model, le = load_for_inference()
+
+    if pool is None:
+        pool = make_pool(WORKERS)
+
+
+class PathsRequest(BaseModel):
+    paths: List[str] = Field(min_length=1)  # files / dirs relative to DATA_DIR
+    out: Optional[str] = None  # file name under RESULTS_DIR, results are written there instead of returned
+    batch_size: int = Field(default=BATCH_SIZE, ge=1, le=1024)
+
+
+def _batch_size(n):
+    # next power of two up to BATCH_SIZE -> a handful of input shapes, a single clip is not padded to 64 rows
+    size = 1
+    while size < min(n, BATCH_SIZE):
+        size *= 2
+    return size
+
+
+def _inside(root, name, what):
+    # client supplied -> resolved under root, never outside it
+    rel = Path(name)
+    if rel.is_absolute() or ".." in rel.parts:
+        raise HTTPException(status_code=400, detail=f"{what} must be a relative name without '..'")
+    path = (root / rel).resolve()
+    if not path.is_relative_to(root):  # a symlink inside root pointing elsewhere
+        raise HTTPException(status_code=400, detail=f"{what} must stay inside the {root.name} directory")
+    return path
+
+
+def _results_path(out):
+    # only the formats write_results knows
+    if Path(out).suffix.lower() not in RESULT_SUFFIXES:
+        raise HTTPException(status_code=400, detail="out must be a .csv or .parquet name")
+    return _inside(RESULTS_DIR, out, "out")
+
+
+def _input_clips(paths):
+    inputs = [_inside(DATA_DIR, p, "paths") for p in paths]
+    try:
+        clips = collect_clips(inputs)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Path not found")  # no detail -> doesnt probe the filesystem
+    # rglob also lists symlinked files, those have to resolve inside DATA_DIR too
+    return [p.resolve() for p in clips if p.resolve().is_relative_to(DATA_DIR)]
+
+
+@app.post("/predict")
+def predict(files: List[UploadFile] = File(...)):
+    if len(files) > MAX_UPLOAD_CLIPS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_UPLOAD_CLIPS} clips per request")
+    initialize_components()
+
+    items = [(f.filename, f.file.read()) for f in files]
+    t0 = time.perf_counter()
+    results = score(model, le, items, pool, _batch_size(len(items)))
+    return {"results": results, "seconds": round(time.perf_counter() - t0, 3)}
+
+
+@app.post("/predict/paths")
+def predict_paths(request: PathsRequest):
+    out = _results_path(request.out) if request.out else None
+    clips = _input_clips(request.paths)
+    if not clips:
+        raise HTTPException(status_code=404, detail="No audio clips found")
+    initialize_components()
+
+    t0 = time.perf_counter()
+    # clips reported relative to DATA_DIR, the server's own layout stays out of the response
+    results = score(model, le, [(str(p.relative_to(DATA_DIR)), str(p)) for p in clips], pool, request.batch_size)
+    seconds = time.perf_counter() - t0
+    for r in results:
+        r["error"] = r["error"].replace(f"{DATA_DIR}{os.sep}", "")  # decoder errors quote the full path
+    failed = sum(1 for r in results if r["error"])
+
+    if out is not None:
+        out.parent.mkdir(parents=True, exist_ok=True)
+        write_results(results, out)
+        return {"clips": len(results), "failed": failed, "seconds": round(seconds, 3),
+                "out": str(out.relative_to(RESULTS_DIR))}
+    return {"clips": len(results), "failed": failed, "seconds": round(seconds, 3), "results": results}
+
+
+@app.get("/health")
+def health():
+    return {"status": "ok", "model_loaded": model is not None}
+
+
+@app.get("/")
+def home():
+    return {"message": "Emotion recognition API running. Visit /docs"}
@@ -0,0 +1,61 @@
+# Model + feature code shared by the Streamlit app, the batch CLI (batch_infer.py) and the HTTP API (emotion_api.py)
+# (used to live inside susnata_app.py, so nothing else could load the model without starting Streamlit)
+# MFCC extraction is in features.py, which does not import tensorflow -> cheap to run in worker processes
+
+from pathlib import Path
+
+import joblib
+import tensorflow as tf
+
+from features import MAX_PAD_LEN, N_MFCC, extract_features  # re-exported for the app
+
+BASE_DIR = Path(__file__).parent
+MODEL_PATH = BASE_DIR / "susnata_cnn_transformer_emotion2.h5"
+ENCODER_PATH = BASE_DIR / "label_encoder2.pkl"
+
+
+# 💡 Defining  my custom layers again (Keras needs them when loading)
+class PositionalEmbedding(tf.keras.layers.Layer):
+    def __init__(self, max_len, d_model, **kwargs):  #  **kwargs added incase some extra attributes
+        super(PositionalEmbedding, self).__init__(**kwargs)
+        self.pos_emb = tf.keras.layers.Embedding(input_dim=max_len, output_dim=d_model)
+
+    def call(self, x):
+        positions = tf.range(start=0, limit=tf.shape(x)[1], delta=1)
+        positions = self.pos_emb(positions)
+        return x + positions
+
+
+class TransformerBlock(tf.keras.layers.Layer):
+    def __init__(self, embed_dim=32, num_heads=2, ff_dim=64, rate=0.2, **kwargs):
+        super().__init__(**kwargs)
+        self.att = tf.keras.layers.MultiHeadAttention(num_heads=num_heads, key_dim=embed_dim // num_heads)
+        self.ffn = tf.keras.Sequential([
+            tf.keras.layers.Dense(ff_dim, activation='relu'),
+            tf.keras.layers.Dense(embed_dim),
+        ])
+        self.layernorm1 = tf.keras.layers.LayerNormalization(epsilon=1e-6)
+        self.layernorm2 = tf.keras.layers.LayerNormalization(epsilon=1e-6)
+        self.dropout1 = tf.keras.layers.Dropout(rate)
+        self.dropout2 = tf.keras.layers.Dropout(rate)
+
+    def call(self, inputs, training=False):
+        attn_output = self.att(inputs, inputs)
+        attn_output = self.dropout1(attn_output, training=training)
+        out1 = self.layernorm1(inputs + attn_output)
+        ffn_output = self.ffn(out1)
+        ffn_output = self.dropout2(ffn_output, training=training)
+        return self.layernorm2(out1 + ffn_output)
+
+
+def load_model(model_path=MODEL_PATH, encoder_path=ENCODER_PATH):
+    model = tf.keras.models.load_model(
+        model_path,
+        custom_objects={
+            "PositionalEmbedding": PositionalEmbedding,
+            "TransformerBlock": TransformerBlock
+        },
+        compile=False
+    )
+    le = joblib.load(encoder_path)
+    return model, le
@@ -0,0 +1,90 @@
+# Export the Keras .h5 model to TFLite for lite_model.py (no tensorflow / custom layers needed to run it)
+#   python export_model.py                                       -> .tflite next to the .h5 + emotion_labels.json
+#   python export_model.py --quantize float16                    -> float16 weights, half the size
+#   python export_model.py --quantize dynamic                    -> int8 weights, float activations
+#   python export_model.py --quantize int8 --calibration clips/  -> int8 weights + activations, calibrated on MFCCs
+#   python export_model.py --saved-model export/emotion_savedmodel   also writes a SavedModel (TF Serving etc.)
+#
+# The converter traces the model in inference mode, so the Dropout layers are gone from the graph (not just
+# switched off), and folds the custom layers into plain ops. Input stays float32 (batch, 40, 200, 1) with a
+# dynamic batch dim, output the 8 probabilities, also for int8 (quantize / dequantize happen inside the model).
+# Check the result against the .h5 with bench_lite_model.py before shipping a quantized one.
+
+import argparse
+import json
+
+import numpy as np
+import tensorflow as tf
+
+from batch_infer import collect_clips
+from emotion_model import ENCODER_PATH, MODEL_PATH, load_model
+from features import extract_features
+from lite_model import LABELS_PATH, LITE_MODEL_PATH
+
+QUANTIZE = ("none", "float16", "dynamic", "int8")
+CALIBRATION_CLIPS = 200
+
+
+def calibration_data(inputs, limit=CALIBRATION_CLIPS):
+    """Clips -> MFCC batches of one for the int8 converter, spread over the whole list"""
+    clips = collect_clips(inputs)
+    if not clips:
+        raise ValueError("No calibration clips found")
+    picked = np.linspace(0, len(clips) - 1, min(limit, len(clips))).astype(int)
+    features = [extract_features(str(clips[i])).astype(np.float32) for i in sorted(set(picked))]
+
+    def representative_dataset():
+        for x in features:
+            yield [x[np.newaxis]]
+
+    return representative_dataset
+
+
+def export_tflite(model, quantize="none", calibration=None):
+    """Keras model -> TFLite flatbuffer bytes"""
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if quantize != "none":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantize == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantize == "int8":
+        if calibration is None:
+            raise ValueError("int8 needs calibration clips (--calibration)")
+        converter.representative_dataset = calibration
+    return converter.convert()
+
+
+def write_labels(le, path=LABELS_PATH):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"classes": [str(c) for c in le.classes_]}, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the emotion model to TFLite")
+    parser.add_argument("--model", default=str(MODEL_PATH))
+    parser.add_argument("--encoder", default=str(ENCODER_PATH))
+    parser.add_argument("--out", default=str(LITE_MODEL_PATH))
+    parser.add_argument("--labels", default=str(LABELS_PATH))
+    parser.add_argument("--quantize", choices=QUANTIZE, default="none")
+    parser.add_argument("--calibration", nargs="+", help="clips / dirs for --quantize int8")
+    parser.add_argument("--saved-model", help="also export a SavedModel to this directory")
+    args = parser.parse_args()
+    if args.quantize == "int8" and not args.calibration:
+        parser.error("--quantize int8 needs --calibration clips")
+
+    model, le = load_model(args.model, args.encoder)
+    calibration = calibration_data(args.calibration) if args.quantize == "int8" else None
+
+    flatbuffer = export_tflite(model, args.quantize, calibration)
+    with open(args.out, "wb") as f:
+        f.write(flatbuffer)
+    write_labels(le, args.labels)
+    print(f"{args.out}: {len(flatbuffer) / 1e3:.0f} kB ({args.quantize}), labels -> {args.labels}")
+
+    if args.saved_model:
+        model.export(args.saved_model)  # serving signature in inference mode, loads without the custom layers
+        print(f"SavedModel -> {args.saved_model}")
+
+
+if __name__ == "__main__":
+    main()
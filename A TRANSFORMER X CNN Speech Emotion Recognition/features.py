@@ -0,0 +1,186 @@
+# MFCC features for the emotion model, librosa + numpy only (no tensorflow)
+# so batch_infer.py worker processes stay small and start fast
+#
+# Backends, picked with EMOTION_FEATURE_BACKEND (default "auto"):
+#   librosa   the notebook code: librosa.load(res_type='kaiser_fast') of the whole clip + librosa.feature.mfcc
+#   fast      decodes only the samples the 200 frames need (~4.67 s at 22050 Hz) with soundfile, resamples them
+#             with the same kaiser_fast filter as a polyphase FIR (scipy resample_poly instead of resampy's per sample
+#             loop) and does STFT -> mel -> dB -> DCT in numpy, with the window / mel filterbank / DCT matrix /
+#             resampling filter built once per process.
+#   auto      fast for clips that fit in the 200 frames, librosa for longer ones (length read from the file header)
+# For clips up to 4.67 s both give the same features (float32 rounding, see bench_features.py).
+# Longer clips: librosa computed the top_db floor and the per-coefficient mean / std over the whole clip and then
+# kept the first 200 frames, the fast backend only ever sees those 200 frames -> floor + normalisation come from
+# them alone (same as stream_emotions.py windows), up to ~0.3 off. That is why auto leaves long clips on librosa;
+# set "fast" to opt into the cheaper features for them too.
+
+import os
+from functools import lru_cache
+from math import gcd
+
+import librosa
+import numpy as np
+import resampy.filters
+import scipy.fft
+import scipy.signal
+import soundfile as sf
+
+N_MFCC = 40
+MAX_PAD_LEN = 200  # frames, the model input is (40, 200, 1)
+
+SR = 22050  # librosa.load default, what the model was trained on
+N_FFT = 2048
+HOP = 512
+N_MELS = 128
+TOP_DB = 80.0
+
+FEATURE_BACKEND = os.environ.get("EMOTION_FEATURE_BACKEND", "auto")  # "auto" | "fast" | "librosa"
+BACKENDS = ("auto", "fast", "librosa")
+
+
+#  Feature extraction function same as notebook
+def extract_features_librosa(file_path, max_pad_len=MAX_PAD_LEN):
+    audio, sr = librosa.load(file_path, res_type='kaiser_fast')
+    mfcc = librosa.feature.mfcc(y=audio, sr=sr, n_mfcc=N_MFCC)
+    return normalize_pad(mfcc, max_pad_len)
+
+
+def normalize_pad(mfcc, max_pad_len=MAX_PAD_LEN):
+    """(n_mfcc, frames) -> (n_mfcc, max_pad_len, 1), per-coefficient mean / std then zero pad or cut"""
+    mfcc = (mfcc - np.mean(mfcc, axis=1, keepdims=True)) / (np.std(mfcc, axis=1, keepdims=True) + 1e-6)
+    if mfcc.shape[1] < max_pad_len:
+        mfcc = np.pad(mfcc, ((0, 0), (0, max_pad_len - mfcc.shape[1])), mode='constant')
+    else:
+        mfcc = mfcc[:, :max_pad_len]
+    return mfcc[..., np.newaxis]
+
+
+# ---- cached per process ----
+
+@lru_cache(maxsize=None)
+def hann_window():
+    return scipy.signal.get_window("hann", N_FFT).astype(np.float32)  # periodic, what librosa.stft uses
+
+
+@lru_cache(maxsize=None)
+def mel_basis(sr=SR):
+    return librosa.filters.mel(sr=sr, n_fft=N_FFT, n_mels=N_MELS).astype(np.float32)  # (n_mels, 1 + n_fft // 2)
+
+
+@lru_cache(maxsize=None)
+def dct_matrix(n_mfcc=N_MFCC):
+    # rows of the orthonormal DCT-II, dct_matrix() @ S == scipy.fft.dct(S, axis=0, norm="ortho")[:n_mfcc]
+    return scipy.fft.dct(np.eye(N_MELS, dtype=np.float32), axis=0, type=2, norm="ortho")[:n_mfcc]
+
+
+@lru_cache(maxsize=None)
+def resample_filter(sr_orig, sr_new=SR):
+    """resampy's kaiser_fast filter as polyphase FIR taps -> (up, down, taps)
+
+    resampy walks the output samples and reads its filter table at the fractional offset of each one. For a
+    rational ratio up / down those offsets repeat with period `up`, so the same weights laid out on the
+    up-sampled grid give an FIR that resample_poly applies in C. Weights copied including resampy's table indexing,
+    the output matches resampy.resample(..., filter='kaiser_fast') to float32 rounding.
+    """
+    g = gcd(sr_orig, sr_new)
+    up, down = sr_new // g, sr_orig // g
+    table, num_table, _ = resampy.filters.get_filter("kaiser_fast")
+    ratio = sr_new / sr_orig
+    scale = min(1.0, ratio)
+    table = table * scale
+    delta = np.diff(table, append=table[-1])
+    step = int(scale * num_table)
+
+    def wing(i, r):
+        # weight of the input i samples before (plus r / up) the output position, resampy's table lookup
+        index = (r / up) * scale * num_table
+        offset = index.astype(int)
+        valid = i < (len(table) - offset) // step
+        pos = np.where(valid, offset + i * step, 0)
+        return np.where(valid, table[pos] + (index - offset) * delta[pos], 0.0)
+
+    m = np.arange((len(table) // step + 1) * up + 1)
+    left = wing(m // up, m % up)  # inputs at or before the output time
+    right = wing((m[1:] - 1) // up, (m[1:] - 1) % up + 1)  # inputs after it, resampy uses frac = scale - frac
+    return up, down, np.concatenate([right[::-1], left]).astype(np.float32)
+
+
+# ---- fast backend stages ----
+
+def needed_samples(max_pad_len=MAX_PAD_LEN):
+    # samples at SR that frames 0 .. max_pad_len - 1 read (center=True, frame t covers t * HOP +- N_FFT / 2)
+    return (max_pad_len - 1) * HOP + N_FFT // 2
+
+
+def fits_window(source, max_pad_len=MAX_PAD_LEN):
+    """Whole clip within max_pad_len frames -> fast and librosa features agree, only reads the header"""
+    with sf.SoundFile(source) as f:
+        n_samples = int(np.ceil(f.frames * SR / f.samplerate))  # librosa.resample's output length
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return 1 + n_samples // HOP <= max_pad_len
+
+
+def decode(source, n_samples=None):
+    """Path or file-like -> (mono float32, native sr), n_samples: only decode that many samples' worth (at SR)"""
+    with sf.SoundFile(source) as f:
+        sr = f.samplerate
+        frames = -1
+        if n_samples is not None and sr != SR:
+            up, down, taps = resample_filter(sr)
+            frames = -(-n_samples * down // up) + len(taps) // (2 * up) + 2  # + half the filter, in input samples
+        elif n_samples is not None:
+            frames = n_samples
+        y = f.read(frames, dtype="float32", always_2d=True)
+    return y.mean(axis=1), sr  # same downmix as librosa.to_mono
+
+
+def resample(y, sr_orig, sr_new=SR):
+    if sr_orig == sr_new:
+        return y
+    up, down, taps = resample_filter(sr_orig, sr_new)
+    n_out = int(len(y) * sr_new / sr_orig)  # resampy's output length
+    # resample_poly scales the taps by up, which undoes the zeros it stuffs between the inputs
+    return scipy.signal.resample_poly(y, up, down, window=taps / up)[:n_out].astype(np.float32, copy=False)
+
+
+def power_spectrogram(y, n_frames):
+    """(samples,) -> (n_frames, 1 + n_fft // 2) |STFT|^2, librosa.stft framing (center=True, zero padding)"""
+    y = np.pad(y, (N_FFT // 2, N_FFT // 2))
+    frames = np.lib.stride_tricks.sliding_window_view(y, N_FFT)[::HOP][:n_frames]
+    spec = scipy.fft.rfft(frames * hann_window(), axis=1)
+    return spec.real ** 2 + spec.imag ** 2
+
+
+def log_mel(power, sr=SR):
+    """(n_frames, 1 + n_fft // 2) -> (n_mels, n_frames) dB, top_db floor relative to the loudest bin"""
+    S = 10.0 * np.log10(np.maximum(mel_basis(sr) @ power.T, 1e-10))
+    return np.maximum(S, S.max() - TOP_DB)
+
+
+def extract_features_fast(file_path, max_pad_len=MAX_PAD_LEN):
+    n_samples = needed_samples(max_pad_len)
+    y, sr = decode(file_path, n_samples)
+    y = resample(y, sr)[:n_samples]
+    n_frames = min(max_pad_len, 1 + len(y) // HOP)  # librosa's centred frame count, capped at what is kept
+    mfcc = dct_matrix() @ log_mel(power_spectrogram(y, n_frames))
+    return normalize_pad(mfcc, max_pad_len)
+
+
+def extract_features(file_path, max_pad_len=MAX_PAD_LEN, backend=None):
+    """Path or file-like -> (40, max_pad_len, 1) normalised MFCCs"""
+    backend = backend or FEATURE_BACKEND
+    if backend == "librosa":
+        return extract_features_librosa(file_path, max_pad_len)
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown feature backend {backend!r}, expected one of {BACKENDS}")
+    try:
+        if backend == "auto" and not fits_window(file_path, max_pad_len):
+            # longer than the model window: librosa normalises over the whole clip, keep those features
+            return extract_features_librosa(file_path, max_pad_len)
+        return extract_features_fast(file_path, max_pad_len)
+    except sf.LibsndfileError:
+        # formats libsndfile cant decode (older builds and mp3, ...) -> librosa's audioread fallback
+        if hasattr(file_path, "seek"):
+            file_path.seek(0)
+        return extract_features_librosa(file_path, max_pad_len)
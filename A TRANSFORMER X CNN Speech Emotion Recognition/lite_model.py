@@ -0,0 +1,82 @@
+# Lean runtime for the exported model (export_model.py -> .tflite + labels json)
+# no tensorflow import, no PositionalEmbedding / TransformerBlock definitions, no sklearn / joblib for the labels:
+# the interpreter comes from ai-edge-litert (pip install ai-edge-litert, a few MB), tflite_runtime on older
+# setups, and tf.lite only as a last resort so it still runs wherever the .h5 did.
+#
+# LiteModel / Labels mimic the bits of the Keras model and LabelEncoder the app, batch_infer.py, emotion_api.py and
+# stream_emotions.py use (predict, predict_on_batch, classes_, inverse_transform), so load_for_inference can hand
+# either one to them.
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+BASE_DIR = Path(__file__).parent
+LITE_MODEL_PATH = BASE_DIR / "susnata_cnn_transformer_emotion2.tflite"
+LABELS_PATH = BASE_DIR / "emotion_labels.json"
+
+# .h5 (default, needs tensorflow) or .tflite, for the app and the API
+MODEL_PATH = os.environ.get("EMOTION_MODEL_PATH")
+
+
+def _interpreter_class():
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+
+class Labels:
+    """Label list from the json export_model.py writes, in the LabelEncoder's order"""
+
+    def __init__(self, classes):
+        self.classes_ = np.asarray(classes)
+
+    def inverse_transform(self, indices):
+        return self.classes_[np.asarray(indices)]
+
+
+class LiteModel:
+    """TFLite interpreter behind predict / predict_on_batch, input (batch, 40, 200, 1) float32 -> probabilities"""
+
+    def __init__(self, model_path=LITE_MODEL_PATH, num_threads=None):
+        self.interpreter = _interpreter_class()(model_path=str(model_path), num_threads=num_threads)
+        self._input = self.interpreter.get_input_details()[0]["index"]
+        self._output = self.interpreter.get_output_details()[0]["index"]
+        self._batch = None
+
+    def predict_on_batch(self, x):
+        x = np.ascontiguousarray(x, dtype=np.float32)
+        if len(x) != self._batch:
+            # exported with a dynamic batch dim, re-plan only when the batch size changes
+            self.interpreter.resize_tensor_input(self._input, list(x.shape))
+            self.interpreter.allocate_tensors()
+            self._batch = len(x)
+        self.interpreter.set_tensor(self._input, x)
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self._output).copy()
+
+    def predict(self, x, verbose=0):
+        return self.predict_on_batch(x)
+
+
+def load_model(model_path=LITE_MODEL_PATH, labels_path=LABELS_PATH, num_threads=None):
+    with open(labels_path, encoding="utf-8") as f:
+        labels = Labels(json.load(f)["classes"])
+    return LiteModel(model_path, num_threads), labels
+
+
+def load_for_inference(model_path=None, encoder_path=None):
+    """.tflite -> lean loader (encoder_path = labels json), anything else -> the Keras .h5 path with tensorflow"""
+    model_path = model_path or MODEL_PATH
+    if model_path and Path(model_path).suffix == ".tflite":
+        return load_model(model_path, encoder_path or LABELS_PATH)
+    from emotion_model import ENCODER_PATH, MODEL_PATH as H5_PATH, load_model as load_keras_model
+    return load_keras_model(model_path or H5_PATH, encoder_path or ENCODER_PATH)
@@ -0,0 +1,161 @@
+# Emotion timeline over long recordings (calls, meetings), in constant memory
+#   python stream_emotions.py long_call.wav --out timeline.csv
+#   python stream_emotions.py long_call.flac --hop-s 1 --out timeline.csv
+#
+# extract_features keeps only the first 200 MFCC frames (~4.6 s) of a clip. Here the audio is decoded block by
+# block, resampled to 22050 Hz on the fly and turned into mel frames once. Every window of 200 frames
+# (hop_frames apart, overlapping) reuses the frames it shares with the previous window and only redoes the cheap
+# part per window (dB floor + DCT + normalisation, which depend on the whole window, same as a clip of that length).
+# Each window goes through the model as soon as its last frame arrives, so the timeline streams out while the
+# file is still being read. Memory = one decode block + 200 mel frames, whatever the length of the recording.
+
+import argparse
+import csv
+import sys
+
+import librosa
+import numpy as np
+import soundfile as sf
+import soxr
+
+from features import HOP, MAX_PAD_LEN, N_FFT, N_MELS, SR, TOP_DB, dct_matrix, normalize_pad
+
+HOP_FRAMES = 100  # window step, 100 frames = ~2.3 s -> 50% overlap
+BLOCK_S = 2.0  # seconds decoded per read
+
+
+class MelStream:
+    """Audio pushed in any block sizes -> log-mel frames (dB, not floored), same framing as librosa center=True"""
+
+    def __init__(self, sr=SR):
+        self.sr = sr
+        # center=True pads n_fft // 2 zeros on both ends (pad_mode "constant")
+        self._buf = np.zeros(N_FFT // 2, dtype=np.float32)
+
+    def push(self, y):
+        buf = np.concatenate([self._buf, np.asarray(y, dtype=np.float32)])
+        if len(buf) < N_FFT:
+            self._buf = buf
+            return np.empty((0, N_MELS), dtype=np.float32)
+        n = 1 + (len(buf) - N_FFT) // HOP
+        mel = librosa.feature.melspectrogram(
+            y=buf[:(n - 1) * HOP + N_FFT], sr=self.sr, n_fft=N_FFT, hop_length=HOP, n_mels=N_MELS, center=False
+        )
+        self._buf = buf[n * HOP:]  # the next frame starts here
+        return librosa.power_to_db(mel, top_db=None).T
+
+    def flush(self):
+        return self.push(np.zeros(N_FFT // 2, dtype=np.float32))
+
+
+def window_features(db_frames, max_pad_len=MAX_PAD_LEN):
+    """(frames, n_mels) dB -> (n_mfcc, max_pad_len, 1), what extract_features gives for audio of that length"""
+    S = np.maximum(db_frames, db_frames.max() - TOP_DB).T  # top_db floor relative to this window's max
+    return normalize_pad(dct_matrix() @ S, max_pad_len).astype(np.float32)
+
+
+class EmotionTracker:
+    """push(audio at SR) -> timeline entries for every window completed by that audio, finish() for the tail"""
+
+    def __init__(self, model, le, window_frames=MAX_PAD_LEN, hop_frames=HOP_FRAMES):
+        if not 0 < hop_frames <= window_frames:
+            raise ValueError(f"hop_frames must be in 1..{window_frames}, got {hop_frames}")
+        self.model = model
+        self.le = le
+        self.window = window_frames
+        self.hop = hop_frames
+        self.mel = MelStream()
+        self._frames = np.empty((0, N_MELS), dtype=np.float32)  # last `window` frames only
+        self.total = 0  # frames seen so far
+        self._next_end = window_frames  # frame count at which the next window is complete
+        self._last_end = 0
+
+    def _predict(self, start, frames):
+        probs = np.asarray(self.model.predict_on_batch(window_features(frames)[np.newaxis]))[0]
+        self._last_end = start + len(frames)
+        entry = {
+            "start_s": round(start * HOP / SR, 3),
+            "end_s": round(self._last_end * HOP / SR, 3),
+            "emotion": self.le.classes_[int(np.argmax(probs))],
+            "confidence": float(probs.max()),
+        }
+        entry.update({f"p_{label}": float(p) for label, p in zip(self.le.classes_, probs)})
+        return entry
+
+    def _consume(self, new):
+        pos = 0
+        while pos < len(new):
+            # append only up to the next window boundary, so a big block cant scroll a window out of the buffer
+            take = min(self._next_end - self.total, len(new) - pos)
+            self._frames = np.concatenate([self._frames, new[pos:pos + take]])[-self.window:]
+            self.total += take
+            pos += take
+            if self.total == self._next_end:
+                yield self._predict(self.total - self.window, self._frames)
+                self._next_end += self.hop
+
+    def push(self, y):
+        yield from self._consume(self.mel.push(y))
+
+    def finish(self):
+        yield from self._consume(self.mel.flush())
+        if self.total > self._last_end:
+            # recording shorter than one window -> padded like extract_features, else the last full window
+            n = min(self.total, self.window)
+            yield self._predict(self.total - n, self._frames[-n:])
+
+
+def read_blocks(path, block_s=BLOCK_S, sr=SR):
+    """Mono float32 blocks at sr, decoded + resampled incrementally"""
+    with sf.SoundFile(path) as f:
+        resampler = soxr.ResampleStream(f.samplerate, sr, 1, dtype="float32") if f.samplerate != sr else None
+        blocksize = int(block_s * f.samplerate)
+        while True:
+            block = f.read(blocksize, dtype="float32", always_2d=True)
+            last = len(block) < blocksize
+            y = block.mean(axis=1)
+            if resampler is not None:
+                y = resampler.resample_chunk(y, last=last)
+            if len(y):
+                yield y
+            if last:
+                break
+
+
+def track_file(model, le, path, hop_frames=HOP_FRAMES, block_s=BLOCK_S):
+    """Timeline entries for a whole file, yielded as the windows complete"""
+    tracker = EmotionTracker(model, le, hop_frames=hop_frames)
+    for y in read_blocks(path, block_s):
+        yield from tracker.push(y)
+    yield from tracker.finish()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Emotion timeline of a long recording")
+    parser.add_argument("audio")
+    parser.add_argument("--out", help="timeline csv, default: stdout")
+    parser.add_argument("--hop-s", type=float, default=HOP_FRAMES * HOP / SR, help="seconds between windows")
+    parser.add_argument("--model", default=None, help="default: susnata_cnn_transformer_emotion2.h5, or a .tflite")
+    parser.add_argument("--encoder", default=None, help="default: label_encoder2.pkl (emotion_labels.json for .tflite)")
+    args = parser.parse_args()
+
+    from lite_model import load_for_inference
+    model, le = load_for_inference(args.model, args.encoder)
+    hop_frames = max(1, min(MAX_PAD_LEN, round(args.hop_s * SR / HOP)))
+
+    out = open(args.out, "w", newline="", encoding="utf-8") if args.out else sys.stdout
+    try:
+        writer = None
+        for entry in track_file(model, le, args.audio, hop_frames):
+            if writer is None:
+                writer = csv.DictWriter(out, fieldnames=list(entry))
+                writer.writeheader()
+            writer.writerow(entry)
+            out.flush()  # rows show up while the file is still being processed
+    finally:
+        if args.out:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,95 @@
+import os
+from pathlib import Path
+
 import joblib
 import numpy as np
 import pandas as pd
 
+from booster_backend import make_predictor
+from feature_encoder import (
+    INPUT_COLS, NOMINAL_COLS, NUMERIC_COLS, PLAN_MAP, SMOKING_MAP, FeatureEncoder, load_cols_to_scale
+)
+
+ARTIFACTS_DIR = Path(__file__).parent / "artifacts"  # works from any cwd (uvicorn, streamlit, notebooks)
+
 # Loading model and scaler
-model = joblib.load("artifacts/xgb_model.joblib")
-scaler_data = joblib.load("artifacts/scaler_with_columns.joblib")
+model = joblib.load(ARTIFACTS_DIR / "xgb_model.joblib")
+scaler_data = joblib.load(ARTIFACTS_DIR / "scaler_with_columns.joblib")
 
 scaler = scaler_data["scaler"]
-cols_to_scale = scaler_data["cols_to_scale}"] if "cols_to_scale}" in scaler_data else None # there was a small typo while saving name hence a extra}
+cols_to_scale = load_cols_to_scale(scaler_data)
 
 # Inference  model feature names
 FEATURES = getattr(model, "feature_names_in_", None)
 if FEATURES is None:
     raise ValueError("Model does not contain feature_names_in_. You must save features during training.")
-
-# Category maps
-PLAN_MAP = {"Bronze": 1, "Silver": 2, "Gold": 3}
-
-SMOKING_MAP = {
-    "Not Smoking": "No Smoking",
-    "Does Not Smoke": "No Smoking",
-    "Smoking=0": "No Smoking",
-    "Smoking": "Smoking",
-    "No Smoking": "No Smoking"
-}
-
-NOMINAL_COLS = [
-    "gender", "region", "marital_status",
-    "bmi_category", "smoking_status", "employment_status"
-]
+FEATURES = list(FEATURES)
+
+# encoding plan compiled once, raises ArtifactMismatch if model / scaler / columns disagree
+encoder = FeatureEncoder(FEATURES, scaler, cols_to_scale)
+
+# "booster" -> inplace_predict on the raw booster (checked against model.predict at load), "sklearn" -> model.predict
+PREDICT_BACKEND = os.getenv("PREMIUM_PREDICT_BACKEND", "booster")
+predictor = make_predictor(model, PREDICT_BACKEND, len(FEATURES))
+
+BATCH_CHUNK = 65536  # rows encoded + scaled + predicted at a time, keeps the float32 buffer ~5 MB
+
+
+def _factorize(values):
+    """(int codes, distinct values), -1 for missing"""
+    if hasattr(values, "dictionary_encode"):  # pyarrow ChunkedArray
+        encoded = values.combine_chunks().dictionary_encode()
+        codes = encoded.indices.fill_null(-1).to_numpy(zero_copy_only=False)
+        return codes, encoded.dictionary.to_pylist()
+    codes, uniques = pd.factorize(values)
+    return codes, list(uniques)
+
+
+def _columns(data):
+    """Raw input columns of a pandas DataFrame, a pyarrow Table or a {column: list} dict, prepared for the encoder"""
+    is_arrow = hasattr(data, "column_names")
+    names = data.column_names if is_arrow else list(data.keys())
+    missing = [c for c in INPUT_COLS if c not in names]
+    if missing:
+        raise ValueError(f"Missing input columns: {missing}")
+
+    def column(c):
+        values = data.column(c) if is_arrow else data[c]
+        return values if hasattr(values, "to_numpy") else np.asarray(values)
+
+    cols = {}
+    for c in NUMERIC_COLS:
+        values = column(c)
+        cols[c] = values.to_numpy() if is_arrow else np.asarray(values, dtype=np.float64)
+    for c in ["insurance_plan"] + NOMINAL_COLS:
+        cols[c] = _factorize(column(c))
+    return encoder.prepare_columns(cols)
+
+
+def encode_batch(data):
+    """DataFrame / Arrow table -> float32 feature matrix (rows, len(FEATURES)) ready for model.predict"""
+    cols = _columns(data)
+    n = len(cols["age"])
+    out = np.empty((n, len(FEATURES)), dtype=np.float32)
+    for start in range(0, n, BATCH_CHUNK):
+        stop = min(start + BATCH_CHUNK, n)
+        encoder.encode(cols, start, stop, out[start:stop])
+    return out
+
+
+def predict_premium_batch(data, chunk_size=BATCH_CHUNK):
+    """Premiums for every row of a DataFrame / pyarrow Table with the same columns as prepare_input's arguments
+    Encodes into one preallocated buffer and scales + predicts chunk by chunk -> np.ndarray of float"""
+    cols = _columns(data)
+    n = len(cols["age"])
+    predictions = np.empty(n, dtype=np.float64)
+    buffer = np.empty((min(chunk_size, n), len(FEATURES)), dtype=np.float32)
+
+    for start in range(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+        X = encoder.encode(cols, start, stop, buffer[:stop - start])
+        predictions[start:stop] = predictor.predict(X)
+    return predictions
 
 
 def prepare_input(
@@ -45,48 +106,23 @@ def prepare_input(
     smoking_status,
     employment_status
 ):
-    # Normalize category values
-    plan_val = PLAN_MAP.get(insurance_plan, 2)  # default Silver
-    smoking_val = SMOKING_MAP.get(smoking_status, smoking_status)
-
-    data = {
+    X = encoder.encode_row({
         "age": age,
         "number_of_dependants": number_of_dependants,
         "income_lakhs": income_lakhs,
-        "insurance_plan": plan_val,
+        "insurance_plan": insurance_plan,
         "genetical_risk": genetical_risk,
         "normalized_risk_score": normalized_risk_score,
         "gender": gender,
         "region": region,
         "marital_status": marital_status,
         "bmi_category": bmi_category,
-        "smoking_status": smoking_val,
+        "smoking_status": smoking_status,
         "employment_status": employment_status
-    }
-
-    df = pd.DataFrame([data])
-
-    # One hot encoding
-    df = pd.get_dummies(df, columns=NOMINAL_COLS, drop_first=True, dtype=int)
-
-    # Handling scaler columns
-    if cols_to_scale:
-        for col in cols_to_scale:
-            if col not in df.columns:
-                df[col] = 0
-        df[cols_to_scale] = scaler.transform(df[cols_to_scale])
-
-    # Align with model features
-    for col in FEATURES:
-        if col not in df.columns:
-            df[col] = 0
-
-    df = df[FEATURES]
-
-    return df
+    })
+    return pd.DataFrame(X, columns=FEATURES)
 
 
 def predict_premium(**kwargs):
-    input_df = prepare_input(**kwargs)
-    prediction = model.predict(input_df)[0]
-    return float(prediction)
\ No newline at end of file
+    prediction = predictor.predict(encoder.encode_row(kwargs))[0]
+    return float(prediction)
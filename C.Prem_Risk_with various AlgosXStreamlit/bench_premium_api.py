@@ -0,0 +1,144 @@
+#Latency / throughput benchmark for premium_api.py
+#   single  N concurrent clients posting one row each to /predict_premium -> req/s, p50/p95/p99, avg micro batch size
+#   batch   /predict_premium/batch with growing row counts -> rows/s
+#
+#   python bench_premium_api.py                                  # starts the API in this process
+#   python bench_premium_api.py --max-batch-size 1               # same load with micro-batching off, to compare
+#   python bench_premium_api.py --url http://localhost:9000      # against a running uvicorn premium_api:app
+# In-process mode shares the GIL with the client threads -> compare runs with each other, not with production.
+
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+import uvicorn
+
+API_PORT = 9001
+
+PLANS = ["Bronze", "Silver", "Gold"]
+CATEGORIES = {
+    "gender": ["Male", "Female"],
+    "region": ["Northeast", "Northwest", "Southeast", "Southwest"],
+    "marital_status": ["Married", "Unmarried"],
+    "bmi_category": ["Normal", "Obesity", "Overweight", "Underweight"],
+    "smoking_status": ["No Smoking", "Occasional", "Regular"],
+    "employment_status": ["Freelancer", "Salaried", "Self-Employed"],
+}
+
+
+def make_rows(n, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for _ in range(n):
+        row = {
+            "age": int(rng.integers(18, 72)),
+            "number_of_dependants": int(rng.integers(0, 6)),
+            "income_lakhs": round(float(rng.uniform(1, 100)), 2),
+            "insurance_plan": PLANS[rng.integers(len(PLANS))],
+            "genetical_risk": float(rng.integers(0, 6)),
+            "normalized_risk_score": round(float(rng.uniform(0, 1)), 3),
+        }
+        for col, values in CATEGORIES.items():
+            row[col] = values[rng.integers(len(values))]
+        rows.append(row)
+    return rows
+
+
+def start_api(port, max_batch_size, max_wait_ms):
+    import premium_api
+    premium_api.batcher.max_batch_size = max_batch_size
+    premium_api.batcher.max_wait = max_wait_ms / 1000
+    server = uvicorn.Server(uvicorn.Config(premium_api.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise SystemExit(f"API server could not start on port {port}")
+        time.sleep(0.05)
+    return server
+
+
+def percentiles(values):
+    arr = np.array(values)
+    if len(arr) == 0:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0}
+    return {p: float(np.percentile(arr, int(p[1:]))) for p in ("p50", "p95", "p99")}
+
+
+def run_single(base, rows, concurrency):
+    """Each client thread keeps its own connection and posts rows one at a time"""
+    local = threading.local()
+    latencies, errors = [], []
+
+    def call(row):
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        t0 = time.perf_counter()
+        resp = local.session.post(f"{base}/predict_premium", json=row)
+        ms = (time.perf_counter() - t0) * 1000
+        if resp.status_code == 200:
+            latencies.append(ms)
+        else:
+            errors.append(resp.text)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(call, rows))
+    return time.perf_counter() - t0, latencies, errors
+
+
+def run_batch(base, rows):
+    t0 = time.perf_counter()
+    resp = requests.post(f"{base}/predict_premium/batch", json={"rows": rows})
+    resp.raise_for_status()
+    return time.perf_counter() - t0, resp.json()["ms"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", help="running API, default: start one in this process")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=2000, help="single requests per concurrency level")
+    parser.add_argument("--batch-rows", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--max-batch-size", type=int, default=None, help="in-process only, 1 = no micro-batching")
+    parser.add_argument("--max-wait-ms", type=float, default=None, help="in-process only")
+    args = parser.parse_args()
+
+    base = args.url
+    if base is None:
+        import premium_api
+        start_api(
+            API_PORT,
+            args.max_batch_size or premium_api.MAX_BATCH_SIZE,
+            premium_api.MAX_WAIT_MS if args.max_wait_ms is None else args.max_wait_ms,
+        )
+        base = f"http://127.0.0.1:{API_PORT}"
+
+    rows = make_rows(max([args.requests] + args.batch_rows))
+    # warm up: first predict pays for xgboost / pandas lazy init
+    requests.post(f"{base}/predict_premium", json=rows[0]).raise_for_status()
+
+    print(f"single row /predict_premium, {args.requests} requests per level")
+    for concurrency in args.concurrency:
+        before = requests.get(f"{base}/health").json()["micro_batching"]
+        wall, latencies, errors = run_single(base, rows[:args.requests], concurrency)
+        after = requests.get(f"{base}/health").json()["micro_batching"]
+        batches = after["batches"] - before["batches"]
+        avg_batch = (after["requests"] - before["requests"]) / batches if batches else 0.0
+        lat = percentiles(latencies)
+        print(f"  c={concurrency:<4} {len(latencies) / wall:8.0f} req/s  "
+              f"p50 {lat['p50']:.2f}  p95 {lat['p95']:.2f}  p99 {lat['p99']:.2f} ms  "
+              f"avg batch {avg_batch:.1f}  errors {len(errors)}")
+
+    print("\n/predict_premium/batch")
+    for n in args.batch_rows:
+        wall, server_ms = run_batch(base, rows[:n])
+        print(f"  rows={n:<7} {n / wall:10.0f} rows/s end to end  {wall * 1000:9.1f} ms  "
+              f"(server {server_ms:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#Prediction backends for the premium model, same encoded rows through each path
+#   sklearn-df   model.predict(DataFrame)   what predict_premium did before the encoder
+#   sklearn      model.predict(float32 ndarray)
+#   booster      booster.inplace_predict(float32 ndarray), booster_backend.BoosterPredictor
+# Reports time per call, rows/s and the max difference to sklearn-df for each batch size.
+#
+#   python bench_premium_backends.py
+#   python bench_premium_backends.py --batch-sizes 1 64 10000 100000 --seconds 2
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from bench_premium_api import make_rows
+from booster_backend import BoosterPredictor, SklearnPredictor
+from PredictionHelper_Premium import FEATURES, encode_batch, model
+
+
+def time_calls(fn, X, seconds):
+    """(median seconds per call, calls), repeats until `seconds` of work or 10k calls"""
+    fn(X)  # warm up
+    times = []
+    budget_end = time.perf_counter() + seconds
+    while time.perf_counter() < budget_end and len(times) < 10_000:
+        t0 = time.perf_counter()
+        fn(X)
+        times.append(time.perf_counter() - t0)
+    return float(np.median(times)), len(times)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 64, 10000])
+    parser.add_argument("--seconds", type=float, default=1.0, help="time budget per backend and batch size")
+    args = parser.parse_args()
+
+    sklearn = SklearnPredictor(model)
+    booster = BoosterPredictor(model)
+    backends = {
+        "sklearn-df": lambda X: model.predict(pd.DataFrame(X, columns=FEATURES)),
+        "sklearn": sklearn.predict,
+        "booster": booster.predict,
+    }
+
+    header = f"{'batch':>7} {'backend':<11} {'us/call':>10} {'rows/s':>12} {'speedup':>8} {'max diff':>9}"
+    print(header)
+    print("-" * len(header))
+    for n in args.batch_sizes:
+        X = encode_batch(pd.DataFrame(make_rows(n, seed=n)))
+        reference = backends["sklearn-df"](X)
+        base = None
+        for name, fn in backends.items():
+            per_call, _ = time_calls(fn, X, args.seconds)
+            base = base or per_call
+            diff = float(np.max(np.abs(fn(X) - reference)))
+            print(f"{n:>7} {name:<11} {per_call * 1e6:>10.1f} {n / per_call:>12.0f} "
+                  f"{base / per_call:>7.1f}x {diff:>9.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# Fast inference path for the premium XGBoost model
+# model.predict on the sklearn wrapper re-fetches the booster, re-resolves the iteration range and validates
+# feature names on every call. BoosterPredictor does that once at load and then calls
+# booster.inplace_predict straight on the encoder's contiguous float32 matrix.
+#
+#   backend "booster" -> BoosterPredictor (default), "sklearn" -> the wrapper's own predict
+# make_predictor() checks the booster against the wrapper on a fixed sample at load and falls back to sklearn
+# (with a warning) if they disagree. bench_premium_backends.py compares the two at batch sizes 1 / 64 / 10k.
+
+import warnings
+
+import numpy as np
+
+BACKENDS = ("booster", "sklearn")
+PARITY_ROWS = 512
+PARITY_TOLERANCE = 1e-4  # relative, both paths run the same trees on the same float32 input -> normally exact
+
+
+class SklearnPredictor:
+    """The wrapper's predict on the encoded matrix, the reference path"""
+
+    name = "sklearn"
+
+    def __init__(self, model):
+        self.model = model
+
+    def predict(self, X):
+        return self.model.predict(X)
+
+
+class BoosterPredictor:
+    """booster.inplace_predict with everything the wrapper works out per call resolved once"""
+
+    name = "booster"
+
+    def __init__(self, model):
+        self.booster = model.get_booster()
+        self.missing = model.missing
+        # same trees the wrapper uses: best iteration when trained with early stopping, otherwise all rounds
+        try:
+            self.iteration_range = (0, model.best_iteration + 1)
+        except AttributeError:
+            self.iteration_range = (0, 0)
+
+    def predict(self, X):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        return self.booster.inplace_predict(
+            X,
+            iteration_range=self.iteration_range,
+            missing=self.missing,
+            validate_features=False,  # column order is guaranteed by the encoder
+        )
+
+
+def parity_sample(n_features, rows=PARITY_ROWS, seed=0):
+    """Scaled numeric + one hot like values, plus all zeros / all ones rows"""
+    rng = np.random.default_rng(seed)
+    X = rng.random((rows, n_features)).astype(np.float32)
+    X[: rows // 2] = X[: rows // 2].round()
+    X[0] = 0
+    X[1] = 1
+    return X
+
+
+def check_parity(reference, candidate, X):
+    """Max relative difference between two predictors on X"""
+    expected = reference.predict(X)
+    got = candidate.predict(X)
+    return float(np.max(np.abs(got - expected) / np.maximum(np.abs(expected), 1.0)))
+
+
+def make_predictor(model, backend="booster", n_features=None):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown prediction backend {backend!r}, expected one of {BACKENDS}")
+    reference = SklearnPredictor(model)
+    if backend == "sklearn":
+        return reference
+
+    predictor = BoosterPredictor(model)
+    n_features = n_features or model.n_features_in_
+    diff = check_parity(reference, predictor, parity_sample(n_features))
+    if diff > PARITY_TOLERANCE:
+        warnings.warn(f"Booster predictions differ from model.predict by {diff:.2e}, using the sklearn path")
+        return reference
+    return predictor
@@ -0,0 +1,166 @@
+# Feature encoding plan for the premium model, compiled once from the artifacts
+# Everything prepare_input used to work out per call (which dummy columns exist, where each scaled column sits,
+# which columns need zeros) is resolved at load time into:
+#   numeric field  -> column index + the scaler's affine x * mul + add for that column (1, 0 when not scaled)
+#   raw category   -> column index (dict lookup, unknown / base category -> no column)
+#   insurance plan -> ordinal value
+# so encoding a row / a batch is a handful of array writes. Artifacts that disagree raise at load time.
+
+import numpy as np
+
+PLAN_MAP = {"Bronze": 1, "Silver": 2, "Gold": 3}
+DEFAULT_PLAN = "Silver"
+
+SMOKING_MAP = {
+    "Not Smoking": "No Smoking",
+    "Does Not Smoke": "No Smoking",
+    "Smoking=0": "No Smoking",
+    "Smoking": "Smoking",
+    "No Smoking": "No Smoking"
+}
+
+NUMERIC_COLS = [
+    "age", "number_of_dependants", "income_lakhs",
+    "genetical_risk", "normalized_risk_score"
+]
+
+NOMINAL_COLS = [
+    "gender", "region", "marital_status",
+    "bmi_category", "smoking_status", "employment_status"
+]
+
+INPUT_COLS = NUMERIC_COLS + ["insurance_plan"] + NOMINAL_COLS
+
+
+class ArtifactMismatch(ValueError):
+    """Model, scaler and column list do not describe the same features"""
+
+
+def load_cols_to_scale(scaler_data):
+    # the training notebook saved the key with a typo ("cols_to_scale}"), accept both spellings
+    for key in ("cols_to_scale", "cols_to_scale}"):
+        if key in scaler_data:
+            return list(scaler_data[key])
+    raise ArtifactMismatch(f"Scaler artifact has no cols_to_scale entry, keys: {sorted(scaler_data)}")
+
+
+def _affine(scaler):
+    """scaler.transform(X) as X * mul + add, per scaler column"""
+    if hasattr(scaler, "data_min_"):  # MinMaxScaler: X * scale_ + min_
+        return np.asarray(scaler.scale_, dtype=np.float64), np.asarray(scaler.min_, dtype=np.float64)
+    if hasattr(scaler, "with_mean"):  # StandardScaler: (X - mean_) / scale_, each part only if enabled
+        n = scaler.n_features_in_
+        mean = scaler.mean_ if scaler.with_mean and scaler.mean_ is not None else np.zeros(n)
+        scale = scaler.scale_ if scaler.with_std and scaler.scale_ is not None else np.ones(n)
+        mean, scale = np.asarray(mean, dtype=np.float64), np.asarray(scale, dtype=np.float64)
+        return 1 / scale, -mean / scale
+    raise ArtifactMismatch(f"Unsupported scaler {type(scaler).__name__}, expected MinMaxScaler or StandardScaler")
+
+
+class FeatureEncoder:
+    """Raw premium inputs -> model matrix in feature_names_in_ order"""
+
+    def __init__(self, features, scaler, cols_to_scale):
+        self.features = [str(f) for f in features]
+        self.index = {name: i for i, name in enumerate(self.features)}
+        n = len(self.features)
+
+        self._check_scaler(scaler, cols_to_scale)
+
+        # fields we get as plain numbers (insurance_plan after the ordinal map)
+        self.numeric = {}
+        for col in NUMERIC_COLS + ["insurance_plan"]:
+            if col not in self.index:
+                raise ArtifactMismatch(f"Model has no {col!r} feature, model features: {self.features}")
+            self.numeric[col] = self.index[col]
+
+        # scaler folded into per column multiplier / offset, unscaled columns keep 1 / 0
+        # (scaled columns the model does not use, like income_level, just drop out)
+        self.mul = np.ones(n, dtype=np.float64)
+        self.add = np.zeros(n, dtype=np.float64)
+        mul, add = _affine(scaler)
+        for j, col in enumerate(cols_to_scale):
+            if col in self.index:
+                self.mul[self.index[col]] = mul[j]
+                self.add[self.index[col]] = add[j]
+
+        # {nominal col: {raw value: column index}}, training used get_dummies(drop_first=True)
+        # -> the first category of each column has no column and encodes as all zeros, like unknown values
+        self.categories = {col: {} for col in NOMINAL_COLS}
+        for name, i in self.index.items():
+            if name in self.numeric:
+                continue
+            col = next((c for c in NOMINAL_COLS if name.startswith(c + "_")), None)
+            if col is None:
+                raise ArtifactMismatch(f"Model feature {name!r} is neither an input field nor a known one hot column")
+            self.categories[col][name[len(col) + 1:]] = i
+        # raw spellings of the smoking categories, same cleanup as training
+        for raw, clean in SMOKING_MAP.items():
+            if clean in self.categories["smoking_status"]:
+                self.categories["smoking_status"][raw] = self.categories["smoking_status"][clean]
+
+        self.plans = {name: float(val) for name, val in PLAN_MAP.items()}
+        self.default_plan = self.plans[DEFAULT_PLAN]
+
+    @staticmethod
+    def _check_scaler(scaler, cols_to_scale):
+        n_in = getattr(scaler, "n_features_in_", None)
+        if n_in is not None and n_in != len(cols_to_scale):
+            raise ArtifactMismatch(
+                f"Scaler was fitted on {n_in} columns but cols_to_scale lists {len(cols_to_scale)}: {cols_to_scale}"
+            )
+        names = getattr(scaler, "feature_names_in_", None)
+        if names is not None and list(names) != list(cols_to_scale):
+            raise ArtifactMismatch(f"Scaler columns {list(names)} != cols_to_scale {list(cols_to_scale)}")
+
+    # batch
+
+    def prepare_columns(self, cols):
+        """{field: raw values} -> {field: float array} for numeric fields + {nominal: column index array (-1 = none)}
+        categories go through (codes, distinct values) from factorize(), so each distinct value is looked up once"""
+        prepared = {col: np.asarray(cols[col], dtype=np.float64) for col in NUMERIC_COLS}
+
+        codes, uniques = cols["insurance_plan"]
+        # last entry is picked by code -1 (missing) -> default plan
+        lookup = np.array([self.plans.get(u, self.default_plan) for u in uniques] + [self.default_plan])
+        prepared["insurance_plan"] = lookup[codes]
+
+        for col in NOMINAL_COLS:
+            codes, uniques = cols[col]
+            vocab = self.categories[col]
+            lookup = np.array([vocab.get(u, -1) for u in uniques] + [-1], dtype=np.intp)
+            prepared[col] = lookup[codes]
+        return prepared
+
+    def encode(self, prepared, start, stop, out):
+        """Rows start:stop of prepare_columns() output -> out (rows, n features), scaled, in model order"""
+        out[:] = 0
+        for col, i in self.numeric.items():
+            out[:, i] = prepared[col][start:stop] * self.mul[i] + self.add[i]
+
+        rows = np.arange(stop - start)
+        for col in NOMINAL_COLS:
+            idx = prepared[col][start:stop]
+            hit = idx >= 0
+            out[rows[hit], idx[hit]] = 1
+        return out
+
+    # single row
+
+    def encode_row(self, fields, out=None):
+        """One row of raw fields (dict) -> (1, n features) float32, no pandas"""
+        if out is None:
+            out = np.zeros((1, len(self.features)), dtype=np.float32)
+        else:
+            out[:] = 0
+        row = out[0]
+        for col in NUMERIC_COLS:
+            i = self.numeric[col]
+            row[i] = float(fields[col]) * self.mul[i] + self.add[i]
+        i = self.numeric["insurance_plan"]
+        row[i] = self.plans.get(fields["insurance_plan"], self.default_plan) * self.mul[i] + self.add[i]
+        for col in NOMINAL_COLS:
+            i = self.categories[col].get(fields[col])
+            if i is not None:
+                row[i] = 1
+        return out
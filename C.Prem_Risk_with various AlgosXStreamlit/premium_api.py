@@ -0,0 +1,147 @@
+# Premium prediction service, the API streamlit_app.py talks to
+#  uvicorn premium_api:app --port 9000
+# Swagger: http://127.0.0.1:9000/docs
+#
+# Model + scaler are loaded once, when PredictionHelper_Premium is imported at startup.
+# Concurrent /predict_premium calls are micro-batched: requests that queue up while a prediction is running
+# (up to MAX_BATCH_SIZE) go through one predict_premium_batch call -> one model.predict for the whole group.
+# /predict_premium/batch scores a list of rows directly, bench_premium_api.py measures both.
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Literal
+
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel, Field
+
+from PredictionHelper_Premium import FEATURES, INPUT_COLS, predict_premium_batch
+
+MAX_BATCH_SIZE = 256  # rows per model.predict for single requests
+# extra wait for company after the first request of a batch, 0 = batches are just whatever queued up
+# while the previous model.predict ran (no added latency when idle, bench_premium_api.py --max-wait-ms to compare)
+MAX_WAIT_MS = 0
+MAX_BATCH_ROWS = 100_000  # per /predict_premium/batch call
+
+# model.predict runs here, never on the event loop (xgboost uses its own threads inside one call)
+predict_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="premium-predict")
+
+app = FastAPI()
+
+
+class PremiumRequest(BaseModel):
+    age: int = Field(ge=0, le=120)
+    number_of_dependants: int = Field(ge=0, le=20)
+    income_lakhs: float = Field(ge=0)
+    insurance_plan: Literal["Bronze", "Silver", "Gold"]
+    genetical_risk: float = Field(ge=0)
+    normalized_risk_score: float = Field(ge=0, le=1)
+    # categories the model never saw score like the base category (all one hot columns 0)
+    gender: str = Field(max_length=50)
+    region: str = Field(max_length=50)
+    marital_status: str = Field(max_length=50)
+    bmi_category: str = Field(max_length=50)
+    smoking_status: str = Field(max_length=50)
+    employment_status: str = Field(max_length=50)
+
+
+class BatchRequest(BaseModel):
+    rows: List[PremiumRequest] = Field(min_length=1, max_length=MAX_BATCH_ROWS)
+
+
+def _score(rows):
+    """[PremiumRequest] -> premiums, columns straight from the models (no DataFrame, no per row dicts)"""
+    return predict_premium_batch({col: [getattr(r, col) for r in rows] for col in INPUT_COLS})
+
+
+class MicroBatcher:
+    """Groups concurrent single predictions into one predict_premium_batch call"""
+
+    def __init__(self, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = None
+        self._worker = None
+        self.stats = {"requests": 0, "batches": 0, "max_batch_size": 0}
+
+    async def predict(self, row):
+        # worker starts with the first request, on the server's own event loop
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((row, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            # whatever queued up while the previous batch was predicting joins right away
+            while len(batch) < self.max_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            rows = [row for row, _ in batch]
+            try:
+                predictions = await loop.run_in_executor(predict_pool, _score, rows)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future), prediction in zip(batch, predictions):
+                if not future.done():  # client may have gone away
+                    future.set_result(float(prediction))
+
+            self.stats["requests"] += len(batch)
+            self.stats["batches"] += 1
+            self.stats["max_batch_size"] = max(self.stats["max_batch_size"], len(batch))
+
+
+batcher = MicroBatcher()
+
+
+@app.post("/predict_premium")
+async def predict(request: PremiumRequest):
+    try:
+        premium = await batcher.predict(request)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"predicted_premium": premium}
+
+
+@app.post("/predict_premium/batch")
+async def predict_batch(request: BatchRequest):
+    t0 = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    try:
+        predictions = await loop.run_in_executor(predict_pool, _score, request.rows)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {
+        "predicted_premiums": predictions.tolist(),
+        "rows": len(predictions),
+        "ms": round((time.perf_counter() - t0) * 1000, 2),
+    }
+
+
+@app.get("/health")
+def health():
+    stats = dict(batcher.stats)
+    stats["avg_batch_size"] = round(stats["requests"] / stats["batches"], 2) if stats["batches"] else 0.0
+    return {"status": "ok", "features": len(FEATURES), "micro_batching": stats}
+
+
+@app.get("/")
+def home():
+    return {"message": "Premium prediction API running. Visit /docs"}
@@ -1,4 +1,5 @@
 # streamlit run streamlit_app.py
+# needs the API running first: uvicorn premium_api:app --port 9000
 import streamlit as st
 import requests
 